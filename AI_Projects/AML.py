@@ -1,59 +1,74 @@
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset
 import numpy as np
-import json
-import os
+import copy
+import argparse
+import time
 from torch.distributions import Normal  # For GAN
+from Feature_Store import FeatureStore, INPUT_FEATURES, DEPLETION_FIELDS
+from Surrogates import predict
+import torch.distributed as dist
+from Train_Engine import train_model, init_distributed, incremental_update, save_data_stats, TensorBatches, save_checkpoint, load_checkpoint, rng_state, set_rng_state
+
+def pack_rows(values, starts, lengths):
+    """
+    PackedSequence of the ragged entries values[starts[i]:starts[i] + lengths[i]] of one batch, gathered by index
+    arithmetic straight into packed (time-major) order: no per-row tensors and no padding.
+    Rows without a history get a single zero step.
+    """
+    steps, order = lengths.clamp(min=1).sort(descending=True)
+    time_idx = torch.arange(int(steps[0]))[:, None]
+    valid = time_idx < steps[None, :]  # [max_len, batch]; row t holds step t of every sequence that long
+    index = (starts[order][None, :] + time_idx)[valid]
+    present = (time_idx < lengths[order][None, :])[valid]
+    if len(values) > 0:
+        data = values[index.clamp(max=len(values) - 1)] * present.unsqueeze(1)
+    else:
+        data = values.new_zeros(len(index), values.shape[1])
+    return nn.utils.rnn.PackedSequence(data, valid.sum(1), order, order.argsort())
 
 class UnifiedReactorDataset(Dataset):
-    def __init__(self, sim_types=['OPENMC', 'MCNP', 'CARDINAL'], reactor_types=['BWR', 'CANDU', 'MSR', 'PWR', 'SFR']):
-        self.inputs = []
-        self.outputs = []  # [k_eff, efpd]
-        self.sequences = []  # Simulated time-series for LSTM (e.g., burnup steps)
-        for sim_type in sim_types:
-            output_dir = f"AI_Projects/{sim_type}_Data/outputs/"
-            if not os.path.exists(output_dir):
-                continue
-            for file in os.listdir(output_dir):
-                if file.endswith('_results.json'):
-                    with open(os.path.join(output_dir, file), 'r') as f:
-                        data = json.load(f)
-                    # Input vector: enrichment, fuel_radius, etc. (assume loaded from corresponding input JSON)
-                    input_file = file.replace('outputs', 'inputs').replace('_results', '_params')
-                    with open(os.path.join(output_dir.replace('outputs', 'inputs'), input_file), 'r') as fin:
-                        params = json.load(fin)
-                    inp_vec = [params.get('enrichment_u235', 0), params.get('fuel_radius_cm', 0), params.get('clad_radius_cm', 0),
-                               params.get('temperature_k', 0), params.get('power_mw', 0), params.get('moderator_density_g_cm3', 0),
-                               params.get('coolant_density_g_cm3', 0), params.get('salt_density_g_cm3', 0)]
-                    out_vec = [data['k_eff'], data['efpd']]
-                    # Simulated sequence: e.g., burnup over 5 steps (expand with real data)
-                    seq = np.linspace(0, data['efpd'], 5) + np.random.normal(0, 0.1, 5)
-                    self.inputs.append(inp_vec)
-                    self.outputs.append(out_vec)
-                    self.sequences.append(seq)
-
-        self.inputs = torch.tensor(self.inputs, dtype=torch.float32)
-        self.outputs = torch.tensor(self.outputs, dtype=torch.float32)
-        self.sequences = torch.tensor(self.sequences, dtype=torch.float32).unsqueeze(2)  # [batch, seq_len, features=1]
+    def __init__(self, sim_types=None, reactor_types=None):
+        # No filter by default: sweep and depletion rows (SMALLPWR, HEATPIPE, HTGR, ...) are training data too
+        # Input vector: enrichment, fuel_radius, etc.; outputs: [k_eff, efpd] (memory-mapped from the feature store)
+        store = FeatureStore()
+        self.inputs, self.outputs, rows = store.to_tensors(sim_types, reactor_types, return_rows=True)
+        # Sequence: the k-eff burnup history from openmc.deplete, kept packed (values + per-row start and length)
+        values, _, _ = store.ragged('depletion')
+        k_history = values[:, DEPLETION_FIELDS.index('k_eff')] if len(values) else np.zeros(0, np.float32)
+        self.seq_values = torch.from_numpy(k_history).unsqueeze(1)  # [total steps, 1]
+        starts, lengths = store.entry_index('depletion', rows)
+        self.seq_starts, self.seq_lengths = torch.from_numpy(starts), torch.from_numpy(lengths)
+
+    def tensors(self):
+        """
+        Row-aligned training tensors (inputs, targets, sequence starts, sequence lengths) for Train_Engine.
+        """
+        return self.inputs, self.outputs, self.seq_starts, self.seq_lengths
+
+    def sequences(self, starts, lengths):
+        return pack_rows(self.seq_values, starts, lengths)
 
     def __len__(self):
         return len(self.inputs)
 
     def __getitem__(self, idx):
-        return self.inputs[idx], self.outputs[idx], self.sequences[idx]
+        start, length = int(self.seq_starts[idx]), max(int(self.seq_lengths[idx]), 1)
+        seq = self.seq_values[start:start + length] if self.seq_lengths[idx] > 0 else torch.zeros(1, 1)
+        return self.inputs[idx], self.outputs[idx], seq
 
 class HybridDeepModel(nn.Module):
-    def __init__(self, input_size=8, hidden_size=128, lstm_layers=2, output_size=2):
+    def __init__(self, input_size=8, hidden_size=128, lstm_layers=2, output_size=2, dropout=0.2):
         super(HybridDeepModel, self).__init__()
         self.mlp = nn.Sequential(
             nn.Linear(input_size, hidden_size),
             nn.ReLU(),
-            nn.Dropout(0.2),
+            nn.Dropout(dropout),
             nn.Linear(hidden_size, hidden_size * 2),
             nn.ReLU(),
-            nn.Dropout(0.2),
+            nn.Dropout(dropout),
             nn.Linear(hidden_size * 2, hidden_size),
             nn.ReLU()
         )
@@ -61,12 +76,34 @@ class HybridDeepModel(nn.Module):
         self.fc_out = nn.Linear(hidden_size * 2, output_size)  # Combine MLP and LSTM outputs
 
     def forward(self, static_inp, seq_inp):
+        # seq_inp: [batch, steps, 1] or a PackedSequence of variable-length histories
         mlp_out = self.mlp(static_inp)
-        lstm_out, _ = self.lstm(seq_inp)
-        lstm_out = lstm_out[:, -1, :]  # Last time step
+        _, (h_n, _) = self.lstm(seq_inp)
+        lstm_out = h_n[-1]  # Last layer at each sequence's own last step
         combined = torch.cat((mlp_out, lstm_out), dim=1)
         return self.fc_out(combined)
 
+def hybrid_losses(dataset, history_dropout=0.5):
+    """
+    Training and validation losses of the hybrid model for train_model.
+    A k-eff history starts at the BOL k-eff target and fixes the EFPD target, while every deployed prediction
+    (Surrogates.predict, the server, the RL env, Model_Export) sees a new design's single zero step. So training
+    swaps each row's history for the zero step with probability history_dropout, and validation (early stopping,
+    plateau) scores the zero-step history only.
+    """
+    criterion = nn.MSELoss()
+
+    def loss_fn(model, batch):
+        static_inp, targets, starts, lengths = batch
+        dropped = torch.rand(len(lengths)) < history_dropout  # Global RNG, so resume is exact
+        return criterion(model(static_inp, dataset.sequences(starts, lengths.masked_fill(dropped, 0))), targets)
+
+    def val_loss_fn(model, batch):
+        static_inp, targets, starts, lengths = batch
+        return criterion(model(static_inp, dataset.sequences(starts, torch.zeros_like(lengths))), targets)
+
+    return loss_fn, val_loss_fn
+
 # GAN Class (for synthetic data generation; expand as needed)
 class GAN(nn.Module):
     def __init__(self, latent_size=100, output_size=8):  # Output synthetic input vectors
@@ -83,13 +120,22 @@ class GAN(nn.Module):
             nn.Sigmoid()
         )
 
-    # Training loop stub (call in main)
-    def train_gan(self, dataloader, epochs=100):
+    # Training loop stub (call in main); checkpoints both networks, optimizers and RNG state for exact resume
+    def train_gan(self, dataloader, epochs=100, checkpoint_path=None, checkpoint_every=10):
         optimizer_g = optim.Adam(self.generator.parameters(), lr=0.0002)
         optimizer_d = optim.Adam(self.discriminator.parameters(), lr=0.0002)
         criterion = nn.BCELoss()
-        for epoch in range(epochs):
-            for real_inputs, _, _ in dataloader:
+        start_epoch = 0
+        checkpoint = load_checkpoint(checkpoint_path)
+        if checkpoint is not None and not checkpoint['finished']:
+            self.load_state_dict(checkpoint['model'])
+            optimizer_g.load_state_dict(checkpoint['optimizer_g'])
+            optimizer_d.load_state_dict(checkpoint['optimizer_d'])
+            set_rng_state(checkpoint['rng'])
+            start_epoch = checkpoint['epoch'] + 1
+            print(f"GAN: resuming from epoch {start_epoch}")
+        for epoch in range(start_epoch, epochs):
+            for real_inputs, *_ in dataloader:
                 batch_size = real_inputs.size(0)
                 real_labels = torch.ones(batch_size, 1)
                 fake_labels = torch.zeros(batch_size, 1)
@@ -112,47 +158,204 @@ class GAN(nn.Module):
                 optimizer_g.step()
             if epoch % 10 == 0:
                 print(f"GAN Epoch {epoch}, D Loss: {loss_d.item()}, G Loss: {loss_g.item()}")
+            if checkpoint_path and ((epoch + 1) % checkpoint_every == 0 or epoch == epochs - 1):
+                save_checkpoint(checkpoint_path, {
+                    'model': self.state_dict(), 'optimizer_g': optimizer_g.state_dict(),
+                    'optimizer_d': optimizer_d.state_dict(), 'epoch': epoch, 'rng': rng_state(),
+                    'finished': epoch == epochs - 1,
+                })
+
+# Design optimization environment: thousands of designs stepped together, scored by one surrogate forward pass per step
+TUNABLE_FEATURES = ['enrichment_u235', 'fuel_radius_cm']
+
+class ReactorDesignEnv:
+    """
+    num_envs parallel design episodes over the 8-feature input vector.
+    Action 0 holds the design; actions 2i+1 / 2i+2 raise / lower tunable feature i by step_fraction of its range.
+    Reward: EFPD / efpd_scale minus penalty per unit of k-eff outside [k_min, k_max].
+    Episodes last horizon steps; finished ones restart from a fresh random design inside [low, high].
+    """
+    def __init__(self, surrogate, kind, low, high, num_envs=4096, tunable=TUNABLE_FEATURES, step_fraction=0.05,
+                 horizon=20, k_min=1.0, k_max=None, penalty=10.0, efpd_scale=None):
+        self.surrogate = surrogate.eval()
+        self.kind = kind
+        self.low = torch.as_tensor(low, dtype=torch.float32)
+        self.high = torch.as_tensor(high, dtype=torch.float32)
+        self.num_envs = num_envs
+        self.horizon = horizon
+        self.k_min, self.k_max, self.penalty = k_min, k_max, penalty
+        self.num_actions = 1 + 2 * len(tunable)
+        self.deltas = torch.zeros(self.num_actions, len(INPUT_FEATURES))
+        for i, feature in enumerate(tunable):
+            f = INPUT_FEATURES.index(feature)
+            self.deltas[2 * i + 1, f] = step_fraction * (self.high[f] - self.low[f])
+            self.deltas[2 * i + 2, f] = -step_fraction * (self.high[f] - self.low[f])
+        self.states = torch.empty(num_envs, len(INPUT_FEATURES))
+        self.t = torch.zeros(num_envs, dtype=torch.long)
+        self.efpd_scale = 1.0
+        self.reset()
+        if efpd_scale is None:  # Typical EFPD of random designs, so the reward is O(1)
+            efpd_scale = self.evaluate(self.states)[2].abs().mean().item() or 1.0
+        self.efpd_scale = efpd_scale
+
+    def reset(self, mask=None):
+        """
+        New random designs for the masked environments (default all); returns the states.
+        """
+        mask = torch.ones(self.num_envs, dtype=torch.bool) if mask is None else mask
+        count = int(mask.sum())
+        self.states[mask] = self.low + torch.rand(count, len(INPUT_FEATURES)) * (self.high - self.low)
+        self.t[mask] = 0
+        return self.states.clone()
+
+    def evaluate(self, states):
+        """
+        (reward, k-eff, EFPD) for a batch of designs in one surrogate pass.
+        """
+        out = predict(self.surrogate, self.kind, states)
+        k_eff, efpd = out[:, 0], out[:, 1]
+        violation = torch.relu(self.k_min - k_eff)
+        if self.k_max is not None:
+            violation = violation + torch.relu(k_eff - self.k_max)
+        reward = efpd / self.efpd_scale - self.penalty * violation
+        return reward, k_eff, efpd
+
+    def feasible(self, k_eff):
+        ok = k_eff >= self.k_min
+        return ok & (k_eff <= self.k_max) if self.k_max is not None else ok
+
+    def step(self, actions):
+        """
+        Apply one action per environment. Returns (next states, rewards, done, k-eff, EFPD);
+        next states are the pre-reset designs, and finished environments are reset in place afterwards.
+        """
+        self.states = torch.maximum(torch.minimum(self.states + self.deltas[actions], self.high), self.low)
+        self.t += 1
+        reward, k_eff, efpd = self.evaluate(self.states)
+        next_states = self.states.clone()
+        done = self.t >= self.horizon
+        if done.any():
+            self.reset(done)
+        return next_states, reward, done, k_eff, efpd
 
-# RL Agent Stub (for optimization, e.g., using DQN; expand with gym env for reactor params)
 class RLAgent:
-    def __init__(self, state_size=8, action_size=5):  # Actions: adjust params
+    def __init__(self, state_size=8, action_size=5):  # Actions: hold, or raise/lower one of two tunable params
         self.model = nn.Sequential(
             nn.Linear(state_size, 128),
             nn.ReLU(),
             nn.Linear(128, action_size)
         )
+        self.action_size = action_size
 
-    # Training stub (implement full RL loop)
-    def train_rl(self):
-        print("RL training placeholder: Optimize params for max EFPD with k-eff constraint.")
+    def _normalize(self, env, states):
+        return (states - env.low) / (env.high - env.low).clamp_min(1e-12)
 
-def train_hybrid_model():
-    dataset_obj = UnifiedReactorDataset()
-    dataloader = DataLoader(dataset_obj, batch_size=4, shuffle=True)
-    model = HybridDeepModel()
-    criterion = nn.MSELoss()
-    optimizer = optim.Adam(model.parameters(), lr=0.001)
+    def act(self, env, states, epsilon=0.0):
+        """
+        Epsilon-greedy actions for a batch of states.
+        """
+        with torch.no_grad():
+            actions = self.model(self._normalize(env, states)).argmax(1)
+        explore = torch.rand(len(states)) < epsilon
+        actions[explore] = torch.randint(self.action_size, (int(explore.sum()),))
+        return actions
 
-    for epoch in range(200):
-        for static_inp, targets, seq_inp in dataloader:
-            optimizer.zero_grad()
-            outputs = model(static_inp, seq_inp)
-            loss = criterion(outputs, targets)
+    def train_rl(self, surrogate, kind, low, high, steps=500, gamma=0.95, lr=0.001, epsilon_end=0.05,
+                 target_every=50, log_every=50, **env_options):
+        """
+        Batched DQN against a ReactorDesignEnv: every step contributes one transition per environment
+        and the Q-network takes one gradient step on that batch (target network refreshed every target_every steps).
+        Maximizes EFPD subject to the k-eff constraint; returns stats (env and overall steps/sec)
+        and the best feasible design seen.
+        """
+        env = ReactorDesignEnv(surrogate, kind, low, high, **env_options)
+        if env.num_actions != self.action_size:
+            raise ValueError(f"Environment has {env.num_actions} actions; agent was built for {self.action_size}.")
+        target = copy.deepcopy(self.model)
+        optimizer = optim.Adam(self.model.parameters(), lr=lr)
+        best = {'reward': -float('inf'), 'design': None, 'k_eff': None, 'efpd': None}
+
+        states = env.reset()
+        env_seconds = 0.0
+        start = time.perf_counter()
+        for step in range(steps):
+            epsilon = max(epsilon_end, 1.0 - step / (0.5 * steps))  # Linear decay over the first half
+            actions = self.act(env, states, epsilon)
+            env_start = time.perf_counter()
+            next_states, reward, done, k_eff, efpd = env.step(actions)
+            env_seconds += time.perf_counter() - env_start
+
+            with torch.no_grad():
+                next_q = target(self._normalize(env, next_states)).max(1).values
+                td_target = reward + gamma * next_q * (~done)
+            q = self.model(self._normalize(env, states)).gather(1, actions.unsqueeze(1)).squeeze(1)
+            loss = nn.functional.smooth_l1_loss(q, td_target)
+            optimizer.zero_grad(set_to_none=True)
             loss.backward()
             optimizer.step()
-        if epoch % 20 == 0:
-            print(f"Hybrid Epoch {epoch}, Loss: {loss.item()}")
+            if (step + 1) % target_every == 0:
+                target.load_state_dict(self.model.state_dict())
+
+            feasible_reward = torch.where(env.feasible(k_eff), reward, torch.tensor(-float('inf')))
+            i = int(feasible_reward.argmax())
+            if feasible_reward[i] > best['reward']:
+                best = {'reward': feasible_reward[i].item(), 'design': dict(zip(INPUT_FEATURES, next_states[i].tolist())),
+                        'k_eff': k_eff[i].item(), 'efpd': efpd[i].item()}
+            states = env.states.clone()
+            if step % log_every == 0:
+                print(f"RL Step {step}, Loss: {loss.item()}, Mean Reward: {reward.mean().item()}, Epsilon: {epsilon:.2f}")
+        elapsed = time.perf_counter() - start
+
+        stats = {'env_steps_per_sec': steps * env.num_envs / env_seconds if env_seconds > 0 else 0.0,
+                 'steps_per_sec': steps * env.num_envs / elapsed if elapsed > 0 else 0.0,
+                 'num_envs': env.num_envs, 'seconds': elapsed, 'best': best}
+        print(f"RL: {stats['env_steps_per_sec']:.0f} env steps/sec ({stats['steps_per_sec']:.0f} including learning, "
+              f"{env.num_envs} parallel designs)")
+        if best['design'] is not None:
+            print(f"Best feasible design: k-eff {best['k_eff']:.4f}, EFPD {best['efpd']:.1f}")
+        return stats
+
+# Single process: python AI_Projects/AML.py
+# Data-parallel on one box or several (gloo): torchrun --nproc_per_node=4 [--nnodes=2 --node_rank=0
+#   --master_addr=<host> --master_port=29500] AI_Projects/AML.py  (the checkpoint directory must be shared)
+def train_hybrid_model(incremental=False, **engine_options):
+    """
+    incremental: fine-tune the saved hybrid model on new rows only (see Train_Engine.incremental_update);
+    the GAN and RL stages then run again only after a full retrain.
+    """
+    rank, world_size = init_distributed()
+    dataset_obj = UnifiedReactorDataset()
+    tensors = dataset_obj.tensors()
+    model = HybridDeepModel()
+    loss_fn, val_loss_fn = hybrid_losses(dataset_obj)
+
+    if incremental and incremental_update(model, tensors, loss_fn, "AI_Projects/hybrid_model.pth", name="Hybrid",
+                                          val_loss_fn=val_loss_fn) is not None:
+        if world_size > 1:
+            dist.destroy_process_group()
+        return
+
+    options = {'val_fraction': 0.1, 'val_loss_fn': val_loss_fn, 'patience': 25, 'scheduler': 'plateau',
+               'checkpoint_path': "AI_Projects/checkpoints/hybrid.pt", **engine_options}
+    model, _ = train_model(model, tensors, loss_fn, epochs=200, log_every=20, name="Hybrid", **options)
+    if world_size > 1:
+        dist.destroy_process_group()
+        if rank != 0:
+            return  # Rank 0 saves the model and carries on alone with the GAN and RL stages
 
     torch.save(model.state_dict(), "AI_Projects/hybrid_model.pth")
+    save_data_stats("AI_Projects/hybrid_model.pth", tensors)
     print("Hybrid model trained and saved.")
 
     # GAN integration for augmentation
     gan = GAN()
-    gan.train_gan(dataloader)
+    gan.train_gan(TensorBatches(tensors, engine_options.get('batch_size')), checkpoint_path="AI_Projects/checkpoints/gan.pt")
 
-    # RL integration
+    # RL design optimization against the trained surrogate, within the range of the training designs
     rl_agent = RLAgent()
-    rl_agent.train_rl()
+    rl_agent.train_rl(model, 'hybrid', dataset_obj.inputs.min(0).values, dataset_obj.inputs.max(0).values)
 
 if __name__ == "__main__":
-    train_hybrid_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the hybrid MLP/LSTM surrogate, then the GAN and RL stages.")
+    parser.add_argument('--incremental', action='store_true', help="Fine-tune the saved model on new rows only")
+    train_hybrid_model(incremental=parser.parse_args().incremental)
\ No newline at end of file
@@ -0,0 +1,80 @@
+import os
+import socket
+import argparse
+import torch
+import torch.nn as nn
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from AML import HybridDeepModel, UnifiedReactorDataset, pack_rows
+from Train_Engine import train_model, init_distributed
+
+# Strong-scaling benchmark for data-parallel HybridDeepModel training on one node.
+# The same dataset and per-rank batch size are trained with 1, 2, 4, ... gloo ranks (cores split evenly between
+# them), and aggregate samples/sec is reported against the single-rank run.
+# Multi-node runs go through torchrun (see AML.py); the Hybrid line it prints carries the aggregate samples/sec.
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _worker(rank, world_size, port, tensors, seq_values, epochs, batch_size, results):
+    os.environ.update({'MASTER_ADDR': '127.0.0.1', 'MASTER_PORT': str(port), 'RANK': str(rank),
+                       'WORLD_SIZE': str(world_size), 'LOCAL_WORLD_SIZE': str(world_size)})
+    init_distributed()
+    torch.manual_seed(0)
+    criterion = nn.MSELoss()
+
+    def loss_fn(model, batch):
+        static_inp, targets, starts, lengths = batch
+        return criterion(model(static_inp, pack_rows(seq_values, starts, lengths)), targets)
+
+    _, stats = train_model(HybridDeepModel(), tensors, loss_fn, epochs, batch_size=batch_size,
+                           log_every=epochs + 1, name=f"Hybrid x{world_size}")
+    if rank == 0:
+        results.put(stats)
+    dist.destroy_process_group()
+
+def synthetic_tensors(num_samples, max_steps=20):
+    """
+    Random rows with burnup histories of 1..max_steps steps, in the dataset's packed layout:
+    (inputs, targets, starts, lengths) and the flat history values.
+    """
+    inputs = torch.rand(num_samples, 8)
+    outputs = torch.rand(num_samples, 2)
+    lengths = torch.randint(1, max_steps + 1, (num_samples,))
+    starts = lengths.cumsum(0) - lengths
+    return (inputs, outputs, starts, lengths), torch.rand(int(lengths.sum()), 1)
+
+def benchmark_scaling(tensors, seq_values, rank_counts=(1, 2, 4), epochs=3, batch_size=256):
+    """
+    Train once per rank count and return [(ranks, samples/sec, speedup, efficiency)].
+    """
+    ctx = mp.get_context('spawn')
+    rows = []
+    for world_size in rank_counts:
+        results = ctx.Queue()
+        mp.spawn(_worker, args=(world_size, _free_port(), tensors, seq_values, epochs, batch_size, results), nprocs=world_size)
+        samples_per_sec = results.get()['samples_per_sec']
+        speedup = samples_per_sec / rows[0][1] if rows else 1.0
+        rows.append((world_size, samples_per_sec, speedup, speedup / (world_size / rank_counts[0])))
+
+    print(f"{'ranks':>6} {'samples/sec':>12} {'speedup':>8} {'efficiency':>10}")
+    for world_size, samples_per_sec, speedup, efficiency in rows:
+        print(f"{world_size:>6} {samples_per_sec:>12.0f} {speedup:>8.2f} {efficiency:>10.0%}")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Data-parallel scaling benchmark for HybridDeepModel.")
+    parser.add_argument('--ranks', type=int, nargs='+', default=[1, 2, 4], help="Rank counts to compare")
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=256, help="Per-rank batch size")
+    parser.add_argument('--synthetic', type=int, default=None, help="Use this many random samples instead of the feature store")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        tensors, seq_values = synthetic_tensors(args.synthetic)
+    else:
+        dataset = UnifiedReactorDataset()
+        tensors, seq_values = dataset.tensors(), dataset.seq_values
+    benchmark_scaling(tensors, seq_values, args.ranks, args.epochs, args.batch_size)
\ No newline at end of file
@@ -0,0 +1,99 @@
+import os
+import json
+import argparse
+import numpy as np
+import h5py
+from concurrent.futures import ThreadPoolExecutor
+from Feature_Store import FeatureStore, DEPLETION_NUCLIDES, estimate_efpd
+from Statepoint_Ingest import load_run_params, ingested_files, log_ingested
+
+# Ingestion of openmc.deplete burnup histories (depletion_results.h5, see scripts/build_models_OpenMC.py).
+# Each run becomes one feature-store row (beginning-of-life k-eff, EFPD to the end of the cycle) plus two
+# ragged entries: 'depletion' [steps, 3] (time in days, k-eff, its uncertainty) and 'nuclides' [steps, 6]
+# (atoms of DEPLETION_NUCLIDES summed over the depletable materials), stored packed so nothing is padded.
+# Results are read with h5py, like the statepoints, so openmc itself isn't needed here.
+
+INGESTED_LOG = "ingested_depletion.txt"  # In the store directory, see Statepoint_Ingest.ingested_files
+RESULTS_FILE = 'depletion_results.h5'
+
+def find_depletion_results(root):
+    return sorted(os.path.join(dir_path, RESULTS_FILE) for dir_path, _, files in os.walk(root) if RESULTS_FILE in files)
+
+def read_depletion_results(results_file, nuclides=DEPLETION_NUCLIDES):
+    """
+    Times (days), k-eff and uncertainty [steps] and nuclide atoms [steps, len(nuclides)] of one depletion run.
+    Nuclides missing from the depletion chain are 0.
+    """
+    with h5py.File(results_file, 'r') as f:
+        time_d = f['time'][:, 0] / 86400.0  # Step start times, seconds -> days
+        eigenvalues = f['eigenvalues'][()]
+        number = f['number'][:, 0]  # Beginning-of-step stage: [steps, materials, nuclides]
+        index = {name: group.attrs['atom number index'] for name, group in f['nuclides'].items()
+                 if 'atom number index' in group.attrs}
+    if eigenvalues.ndim == 3:  # [steps, stages, (mean, std)]
+        k_eff, k_std = eigenvalues[:, 0, 0], eigenvalues[:, 0, 1]
+    else:  # Older results files store the mean only
+        k_eff, k_std = eigenvalues[:, 0], np.zeros(len(eigenvalues))
+    atoms = np.zeros((len(time_d), len(nuclides)))
+    for i, nuclide in enumerate(nuclides):
+        if nuclide in index:
+            atoms[:, i] = number[:, :, index[nuclide]].sum(axis=1)
+    return {'time_d': time_d, 'k_eff': k_eff, 'k_eff_uncertainty': k_std, 'atoms': atoms}
+
+def cycle_length(time_d, k_eff):
+    """
+    EFPD at which k-eff first falls below 1 (linear interpolation), or None if it stays critical.
+    """
+    below = np.flatnonzero(k_eff < 1.0)
+    if len(below) == 0:
+        return None
+    i = below[0]
+    if i == 0:
+        return 0.0
+    return float(time_d[i - 1] + (k_eff[i - 1] - 1.0) / (k_eff[i - 1] - k_eff[i]) * (time_d[i] - time_d[i - 1]))
+
+def ingest_depletion(root, default_params=None, store=None, max_workers=None):
+    """
+    Read every new depletion_results.h5 under root and append the runs and their histories to the feature store.
+    EFPD is the cycle length from the k-eff history, or the burnup-target estimate if k-eff never drops below 1.
+    """
+    if store is None:
+        store = FeatureStore()
+    done = ingested_files(store, INGESTED_LOG)
+    results_files = [r for r in find_depletion_results(root) if os.path.abspath(r) not in done]
+    if not results_files:
+        print("No new depletion results found.")
+        return 0
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        results = list(pool.map(read_depletion_results, results_files))
+
+    entries = []
+    for results_file, result in zip(results_files, results):
+        params = load_run_params(os.path.dirname(results_file), default_params)
+        efpd = cycle_length(result['time_d'], result['k_eff'])
+        entries.append({**params, 'k_eff': float(result['k_eff'][0]),
+                        'k_eff_uncertainty': float(result['k_eff_uncertainty'][0]),
+                        'efpd': efpd if efpd is not None else estimate_efpd(params)})
+    rows = store.append(entries)
+    store.append_ragged('depletion', rows, [np.stack([r['time_d'], r['k_eff'], r['k_eff_uncertainty']], axis=1)
+                                            for r in results])
+    store.append_ragged('nuclides', rows, [r['atoms'] for r in results])
+
+    log_ingested(store, INGESTED_LOG, results_files)
+    steps = sum(len(r['time_d']) for r in results)
+    print(f"Ingested {len(entries)} depletion runs ({steps} burnup steps) into the feature store ({len(store)} rows total).")
+    return len(entries)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest openmc.deplete burnup histories into the ML feature store.")
+    parser.add_argument('root', help="Directory tree containing depletion_results.h5 files")
+    parser.add_argument('--params', default=None, help="JSON of default run parameters (e.g. burnup_target_gwd_t)")
+    parser.add_argument('--workers', type=int, default=None, help="Reader threads (default: cores)")
+    args = parser.parse_args()
+
+    default_params = {}
+    if args.params:
+        with open(args.params, 'r') as f:
+            default_params = json.load(f)
+    ingest_depletion(args.root, default_params, max_workers=args.workers)
\ No newline at end of file
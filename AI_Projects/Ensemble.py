@@ -0,0 +1,110 @@
+import os
+import copy
+import argparse
+import torch
+from torch.func import functional_call, stack_module_state, vmap
+from concurrent.futures import ProcessPoolExecutor
+from Surrogates import surrogate_class
+from Train_Engine import train_model
+
+# Deep ensembles of DeepMLP / NuclearPINN surrogates.
+# Members are trained independently (different seeds, in parallel), then their parameters are stacked so the
+# whole ensemble runs as one vmapped functional_call: a single batched pass gives the mean and variance of
+# k-eff and EFPD, at close to the latency of one model.
+
+DEFAULT_MEMBERS = 5
+
+def ensemble_path(kind):
+    return f"AI_Projects/{kind}_ensemble.pth"
+
+class EnsembleSurrogate:
+    def __init__(self, members, model_kwargs=None):
+        self.members = [m.eval() for m in members]
+        self.model_kwargs = model_kwargs or {}  # Constructor arguments shared by all members, kept for saving
+        self.restack()
+
+    def restack(self):
+        """
+        Rebuild the stacked parameters from the member modules (after any of them was retrained).
+        """
+        self.params, self.buffers = stack_module_state(self.members)
+        self.base = copy.deepcopy(self.members[0]).to('meta').eval()
+
+    def __len__(self):
+        return len(self.members)
+
+    def predict_members(self, inputs):
+        """
+        Every member's prediction for inputs [n, 8] as [members, n, 2], in one vmapped call.
+        """
+        def member_forward(params, buffers, x):
+            return functional_call(self.base, (params, buffers), (x,))
+        with torch.no_grad():
+            return vmap(member_forward, in_dims=(0, 0, None))(self.params, self.buffers, inputs)
+
+    def __call__(self, inputs):
+        """
+        Ensemble mean and variance [n, 2] of (k-eff, EFPD).
+        """
+        preds = self.predict_members(inputs)
+        return preds.mean(0), preds.var(0, unbiased=False)
+
+def save_ensemble(ensemble, kind, path=None):
+    torch.save({'kind': kind, 'model_kwargs': ensemble.model_kwargs, 'members': [m.state_dict() for m in ensemble.members]},
+               path or ensemble_path(kind))
+
+def load_ensemble(kind, path=None):
+    saved = torch.load(path or ensemble_path(kind), map_location='cpu')
+    members = []
+    for state in saved['members']:
+        member = surrogate_class(kind)(**saved['model_kwargs'])
+        member.load_state_dict(state)
+        members.append(member)
+    return EnsembleSurrogate(members, saved['model_kwargs'])
+
+def _train_member(kind, seed, config, epochs, num_threads):
+    from Hyperparameter_Search import build_trial
+    torch.manual_seed(seed)  # Members differ only in initialization and minibatch order
+    model, tensors, (loss_fn, val_loss_fn) = build_trial(kind, config)
+    model, _ = train_model(model, tensors, loss_fn, epochs, lr=config['lr'], num_threads=num_threads,
+                           log_every=max(epochs // 4, 1), name=f"Member {seed}", val_fraction=0.1,
+                           val_loss_fn=val_loss_fn, patience=15, scheduler='plateau')
+    return model.state_dict()
+
+def train_ensemble(kind='deep', num_members=DEFAULT_MEMBERS, epochs=100, hidden_size=128, dropout=0.2, lr=0.001,
+                   physics_weight=0.5, max_workers=None, path=None):
+    """
+    Train num_members copies of the surrogate on the feature store, one per worker process, and save the ensemble.
+    """
+    config = {'hidden_size': hidden_size, 'dropout': dropout, 'lr': lr, 'physics_weight': physics_weight}
+    max_workers = min(max_workers or os.cpu_count(), num_members)
+    num_threads = max(1, (os.cpu_count() or 1) // max_workers)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        states = list(pool.map(_train_member, [kind] * num_members, range(num_members), [config] * num_members,
+                               [epochs] * num_members, [num_threads] * num_members))
+
+    model_kwargs = {'hidden_size': hidden_size} if kind == 'pinn' else {'hidden_size': hidden_size, 'dropout': dropout}
+    members = []
+    for state in states:
+        member = surrogate_class(kind)(**model_kwargs)
+        member.load_state_dict(state)
+        members.append(member)
+    ensemble = EnsembleSurrogate(members, model_kwargs)
+    save_ensemble(ensemble, kind, path)
+    print(f"{kind} ensemble of {num_members} trained and saved to {path or ensemble_path(kind)}.")
+    return ensemble
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train a deep ensemble of surrogates for uncertainty estimates.")
+    parser.add_argument('model', choices=['deep', 'pinn'])
+    parser.add_argument('--members', type=int, default=DEFAULT_MEMBERS)
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--hidden-size', type=int, default=128)
+    parser.add_argument('--dropout', type=float, default=0.2)
+    parser.add_argument('--lr', type=float, default=0.001)
+    parser.add_argument('--physics-weight', type=float, default=0.5)
+    parser.add_argument('--workers', type=int, default=None, help="Members trained at once (default: cores)")
+    parser.add_argument('--out', default=None, help="Ensemble file (default: AI_Projects/<model>_ensemble.pth)")
+    args = parser.parse_args()
+    train_ensemble(args.model, args.members, args.epochs, args.hidden_size, args.dropout, args.lr,
+                   args.physics_weight, args.workers, args.out)
\ No newline at end of file
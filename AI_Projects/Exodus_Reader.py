@@ -0,0 +1,120 @@
+import numpy as np
+import h5py
+try:
+    from scipy.io import netcdf_file  # Memory-mapped reader for classic (netCDF-3) Exodus files
+except ImportError:
+    netcdf_file = None
+
+# Lazy reader for Cardinal/MOOSE Exodus II output.
+# Exodus is netCDF underneath: netCDF-4 files are opened with h5py, classic netCDF-3 files with scipy's
+# memory-mapped netcdf_file. Only the requested variables and timesteps are read, never the mesh itself.
+# Layout used: time_whole [steps], name_glo_var / vals_glo_var [steps, vars],
+# name_elem_var / vals_elem_var{v}eb{b} [steps, elems in block b], name_nod_var / vals_nod_var{v} [steps, nodes].
+
+CARDINAL_FIELDS = ['temp', 'cell_temperature', 'heat_source', 'density']
+
+def _names(char_array):
+    return [b''.join(row).decode().strip('\x00 ') for row in char_array]
+
+class ExodusReader:
+    def __init__(self, path):
+        self.path = path
+        try:
+            self._file = h5py.File(path, 'r')
+            self._vars = self._file
+        except OSError:
+            if netcdf_file is None:
+                raise ImportError("scipy is required to read classic (netCDF-3) Exodus files.")
+            self._file = netcdf_file(path, 'r', mmap=True)
+            self._vars = self._file.variables
+
+    def _get(self, name):
+        return self._vars[name] if name in self._vars else None
+
+    def times(self):
+        return np.array(self._get('time_whole')[:])  # Copy so the mmap can close
+
+    def _steps(self, steps):
+        """
+        Timestep indices (negative counts from the end), default all.
+        """
+        num_steps = self._get('time_whole').shape[0]
+        return list(range(num_steps)) if steps is None else [s % num_steps for s in steps]
+
+    def global_variable_names(self):
+        names = self._get('name_glo_var')
+        return _names(names[:]) if names is not None else []
+
+    def element_variable_names(self):
+        names = self._get('name_elem_var')
+        return _names(names[:]) if names is not None else []
+
+    def nodal_variable_names(self):
+        names = self._get('name_nod_var')
+        return _names(names[:]) if names is not None else []
+
+    def num_blocks(self):
+        blocks = self._get('eb_prop1')
+        return len(blocks) if blocks is not None else 0
+
+    def global_values(self, name, steps=None):
+        """
+        Values of one global variable (e.g. Cardinal's k) at the chosen timesteps.
+        """
+        index = self.global_variable_names().index(name)
+        return np.array(self._get('vals_glo_var')[self._steps(steps), index])
+
+    def element_values(self, name, steps=None, blocks=None):
+        """
+        One element variable as [elements, steps], concatenated over the chosen blocks (default all).
+        Reads only the requested timestep rows of each block's dataset.
+        """
+        var = self.element_variable_names().index(name) + 1
+        step_index = self._steps(steps)
+        columns = []
+        for block in blocks or range(1, self.num_blocks() + 1):
+            data = self._get(f'vals_elem_var{var}eb{block}')
+            if data is not None:  # Variable isn't defined on every block
+                columns.append(np.stack([np.asarray(data[s]) for s in step_index], axis=1))
+        return np.concatenate(columns) if columns else np.zeros((0, len(step_index)))
+
+    def nodal_values(self, name, steps=None):
+        """
+        One nodal variable as [nodes, steps].
+        """
+        var = self.nodal_variable_names().index(name) + 1
+        data = self._get(f'vals_nod_var{var}')
+        return np.stack([np.asarray(data[s]) for s in self._steps(steps)], axis=1)
+
+    def close(self):
+        if self._vars is not self._file:
+            self._vars.clear()  # netcdf_file won't release its mmap while variables still reference it
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_cardinal_fields(path, fields=CARDINAL_FIELDS, steps=[-1]):
+    """
+    The requested element (or nodal) fields present in a Cardinal Exodus file, each as [entities, steps].
+    """
+    arrays = {}
+    with ExodusReader(path) as exo:
+        elem_vars = exo.element_variable_names()
+        nodal_vars = exo.nodal_variable_names()
+        for field in fields:
+            if field in elem_vars:
+                arrays[field] = exo.element_values(field, steps)
+            elif field in nodal_vars:
+                arrays[field] = exo.nodal_values(field, steps)
+    return arrays
+
+def store_cardinal_fields(store, row, path, fields=CARDINAL_FIELDS, steps=[-1]):
+    """
+    Write a run's Cardinal fields into the feature store as ragged columns cardinal_<field>.
+    """
+    for field, values in read_cardinal_fields(path, fields, steps).items():
+        store.append_ragged(f"cardinal_{field}", [row], [values])
\ No newline at end of file
@@ -0,0 +1,187 @@
+import os
+import json
+import numpy as np
+import torch
+
+# Append-only columnar store for the ML training data (replaces the per-run *_results.json / *_params.json pairs).
+# Each column is one raw little-endian file of fixed-width rows; schema.json holds the feature names,
+# category codes and the committed row count. Readers memory-map the column files and wrap them
+# in torch tensors without copying, so building a dataset costs a few opens regardless of run count.
+# Only rows up to the committed count are visible; bytes left by an interrupted append are overwritten by the next one.
+# Ragged columns (spatial fields, histories) hold variable-length [len, width] entries for some rows as
+# packed values plus offsets and the store row of each entry, so nothing is padded.
+
+DEFAULT_STORE_DIR = "AI_Projects/Feature_Store/"
+INPUT_FEATURES = ['enrichment_u235', 'fuel_radius_cm', 'clad_radius_cm', 'temperature_k',
+                  'power_mw', 'moderator_density_g_cm3', 'coolant_density_g_cm3', 'salt_density_g_cm3']
+OUTPUT_FIELDS = ['k_eff', 'efpd', 'k_eff_uncertainty']  # Training targets first so [:, :2] stays a view
+LABEL_FIELDS = ['sim_type', 'reactor_type']
+# Burnup histories from openmc.deplete (AI_Projects/Depletion_Ingest.py): one step per row of each ragged entry
+DEPLETION_FIELDS = ['time_d', 'k_eff', 'k_eff_uncertainty']  # Ragged column 'depletion'
+DEPLETION_NUCLIDES = ['U235', 'U238', 'Pu239', 'Pu241', 'Xe135', 'Sm149']  # Ragged column 'nuclides' (atoms)
+COLUMNS = {
+    'inputs': (np.float32, len(INPUT_FEATURES)),
+    'outputs': (np.float32, len(OUTPUT_FIELDS)),
+    'labels': (np.uint8, len(LABEL_FIELDS)),
+}
+
+def estimate_efpd(params):
+    """
+    EFPD from the target burnup and power of a run (None if no burnup target was given).
+    """
+    if params.get('burnup_target_gwd_t') is None:
+        return None
+    burnup_mwd_t = params['burnup_target_gwd_t'] * 1000
+    return burnup_mwd_t / params['power_mw'] if params.get('power_mw', 0) > 0 else 0
+
+def feature_vector(params):
+    """
+    Model input row for one run's params (missing features are 0, as stored).
+    """
+    return [params.get(k) or 0 for k in INPUT_FEATURES]
+
+class FeatureStore:
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        self.schema_file = os.path.join(root, 'schema.json')
+        os.makedirs(root, exist_ok=True)
+        if os.path.exists(self.schema_file):
+            with open(self.schema_file, 'r') as f:
+                self.schema = json.load(f)
+        else:
+            self.schema = {
+                'num_rows': 0,
+                'input_features': INPUT_FEATURES,
+                'output_fields': OUTPUT_FIELDS,
+                'categories': {'sim_type': ['OPENMC', 'MCNP', 'CARDINAL'],
+                               'reactor_type': ['BWR', 'CANDU', 'MSR', 'PWR', 'SFR']},
+            }
+
+    def __len__(self):
+        return self.schema['num_rows']
+
+    def _path(self, column):
+        return os.path.join(self.root, f"{column}.bin")
+
+    def _code(self, field, value):
+        categories = self.schema['categories'][field]
+        if value not in categories:
+            categories.append(value)
+        return categories.index(value)
+
+    def _commit(self, num_rows):
+        self.schema['num_rows'] = num_rows
+        tmp_file = self.schema_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(self.schema, f, indent=4)
+        os.replace(tmp_file, self.schema_file)  # Atomic: readers see the old or the new row count, never a partial one
+
+    def append(self, entries):
+        """
+        Append parsed runs (dicts holding the input params and the results) in one batch.
+        Returns the store rows they were written to.
+        """
+        if not entries:
+            return range(len(self), len(self))
+        rows = {
+            'inputs': [feature_vector(entry) for entry in entries],
+            'outputs': [[np.nan if entry.get(k) is None else entry[k] for k in OUTPUT_FIELDS] for entry in entries],
+            'labels': [[self._code(k, str(entry.get(k, '')).upper()) for k in LABEL_FIELDS] for entry in entries],
+        }
+        num_rows = len(self)
+        for column, (dtype, width) in COLUMNS.items():
+            with open(self._path(column), 'ab') as f:
+                f.truncate(num_rows * width * np.dtype(dtype).itemsize)
+                f.write(np.asarray(rows[column], dtype=dtype).tobytes())
+        self._commit(num_rows + len(entries))
+        return range(num_rows, num_rows + len(entries))
+
+    def append_ragged(self, name, rows, arrays):
+        """
+        Append one variable-length [len, width] array per store row to ragged column name.
+        The width is fixed when the column is first written.
+        """
+        arrays = [np.asarray(a, dtype=np.float32) for a in arrays]
+        arrays = [a.reshape(len(a), -1) for a in arrays]
+        ragged = self.schema.setdefault('ragged', {})
+        meta = ragged.setdefault(name, {'width': arrays[0].shape[1], 'num_entries': 0, 'num_values': 0})
+        if any(a.shape[1] != meta['width'] for a in arrays):
+            raise ValueError(f"Ragged column {name} has width {meta['width']}.")
+        lengths = np.array([len(a) for a in arrays], dtype=np.int64)
+        offsets = meta['num_values'] + np.cumsum(lengths)
+        if meta['num_entries'] == 0:
+            offsets = np.concatenate([[0], offsets])  # Leading 0 so offsets[i]:offsets[i + 1] is entry i
+        sizes = {'values': (np.concatenate(arrays), meta['num_values'] * meta['width'] * 4),
+                 'offsets': (offsets, meta['num_entries'] and (meta['num_entries'] + 1) * 8),
+                 'rows': (np.asarray(rows, dtype=np.int64), meta['num_entries'] * 8)}
+        for part, (array, committed_bytes) in sizes.items():
+            with open(self._path(f"{name}.{part}"), 'ab') as f:
+                f.truncate(committed_bytes)
+                f.write(array.tobytes())
+        meta['num_entries'] += len(arrays)
+        meta['num_values'] += int(lengths.sum())
+        self._commit(len(self))
+
+    def ragged(self, name):
+        """
+        Memory-mapped (values [total, width], offsets [entries + 1], rows [entries]) of a ragged column.
+        Entry i is values[offsets[i]:offsets[i + 1]] and belongs to store row rows[i].
+        """
+        meta = self.schema.get('ragged', {}).get(name)
+        if meta is None or meta['num_entries'] == 0:
+            return np.zeros((0, meta['width'] if meta else 1), np.float32), np.zeros(1, np.int64), np.zeros(0, np.int64)
+        values = np.zeros((0, meta['width']), np.float32)
+        if meta['num_values'] > 0:
+            values = np.memmap(self._path(f"{name}.values"), dtype=np.float32, mode='c', shape=(meta['num_values'], meta['width']))
+        offsets = np.memmap(self._path(f"{name}.offsets"), dtype=np.int64, mode='c', shape=(meta['num_entries'] + 1,))
+        rows = np.memmap(self._path(f"{name}.rows"), dtype=np.int64, mode='c', shape=(meta['num_entries'],))
+        return values, offsets, rows
+
+    def entry_index(self, name, rows):
+        """
+        (starts, lengths) into the ragged values of column name for each store row in rows;
+        length 0 for rows without an entry (the latest entry wins if a row has several).
+        """
+        _, offsets, entry_rows = self.ragged(name)
+        rows = np.asarray(rows, dtype=np.int64)
+        lookup = np.full(len(self), -1, dtype=np.int64)
+        lookup[entry_rows] = np.arange(len(entry_rows))
+        entries = lookup[rows]
+        has_entry = entries >= 0
+        starts = np.where(has_entry, offsets[np.maximum(entries, 0)], 0)
+        lengths = np.where(has_entry, offsets[entries + 1] - starts, 0)
+        return starts, lengths
+
+    def column(self, column):
+        """
+        Memory-mapped [num_rows, width] array for one column (copy-on-write, so the file is never modified).
+        """
+        dtype, width = COLUMNS[column]
+        if len(self) == 0:
+            return np.zeros((0, width), dtype=dtype)
+        return np.memmap(self._path(column), dtype=dtype, mode='c', shape=(len(self), width))
+
+    def to_tensors(self, sim_types=None, reactor_types=None, return_rows=False):
+        """
+        Inputs [n, 8] and targets [n, 2] (k-eff, EFPD) as float32 tensors; runs with a missing k-eff are skipped.
+        Zero-copy views of the store unless a filter actually drops rows.
+        return_rows also returns the store row of each sample (to look up its ragged entries).
+        """
+        inputs = torch.from_numpy(self.column('inputs'))
+        outputs = torch.from_numpy(self.column('outputs'))[:, :2]
+        keep = ~np.isnan(self.column('outputs')[:, :2]).any(axis=1)
+        labels = self.column('labels')
+        for i, (field, wanted) in enumerate(zip(LABEL_FIELDS, [sim_types, reactor_types])):
+            if wanted is not None:
+                codes = [self.schema['categories'][field].index(v) for v in wanted if v in self.schema['categories'][field]]
+                matches = np.isin(labels[:, i], codes)
+                if (keep & ~matches).any():
+                    print(f"Feature store: {int((keep & ~matches).sum())} rows filtered out by {field} not in {list(wanted)}")
+                keep &= matches
+        rows = np.flatnonzero(keep)
+        if not keep.all():
+            keep = torch.from_numpy(keep)
+            inputs, outputs = inputs[keep], outputs[keep]
+        if return_rows:
+            return inputs, outputs, rows
+        return inputs, outputs
\ No newline at end of file
@@ -0,0 +1,170 @@
+import os
+import csv
+import math
+import time
+import argparse
+import numpy as np
+import torch
+import torch.nn as nn
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from Train_Engine import train_model
+
+# Parallel hyperparameter search with asynchronous successive halving (ASHA).
+# Trials sample a config, train min_epochs on a process pool and report their validation loss; whenever a worker
+# frees up, the best 1/eta of any rung not yet promoted continue training (from their checkpoint) to eta times
+# the epochs, otherwise a new trial starts. Weak trials are never trained past the rung where they fell behind.
+# Every (trial, rung) result is appended to one CSV: config, epochs, validation loss, throughput and status.
+
+SEARCH_SPACES = {
+    'deep': {'hidden_size': ('choice', [64, 128, 256]), 'dropout': ('uniform', 0.0, 0.5), 'lr': ('log', 1e-4, 1e-2)},
+    'hybrid': {'hidden_size': ('choice', [64, 128, 256]), 'dropout': ('uniform', 0.0, 0.5), 'lr': ('log', 1e-4, 1e-2)},
+    'pinn': {'hidden_size': ('choice', [64, 128, 256]), 'lr': ('log', 1e-4, 1e-2), 'physics_weight': ('log', 0.01, 2.0)},
+}
+RESULT_FIELDS = ['trial_id', 'rung', 'epochs', 'hidden_size', 'dropout', 'lr', 'physics_weight',
+                 'val_loss', 'samples_per_sec', 'seconds', 'status']
+
+def sample_config(space, rng):
+    config = {}
+    for name, (kind, *args) in space.items():
+        if kind == 'choice':
+            config[name] = args[0][rng.integers(len(args[0]))]
+        elif kind == 'uniform':
+            config[name] = float(rng.uniform(args[0], args[1]))
+        elif kind == 'log':
+            config[name] = float(math.exp(rng.uniform(math.log(args[0]), math.log(args[1]))))
+        else:
+            raise ValueError(f"Invalid search space entry: {name}")
+    return config
+
+def build_trial(kind, config):
+    """
+    Model, training tensors and (loss_fn, val_loss_fn) for one trial config.
+    """
+    criterion = nn.MSELoss()
+    if kind == 'deep':
+        from AI_Trainer import DeepMLP
+        from Feature_Store import FeatureStore
+        model = DeepMLP(hidden_size=config['hidden_size'], dropout=config['dropout'])
+        tensors = FeatureStore().to_tensors()
+
+        def loss_fn(model, batch):
+            inputs, targets = batch
+            return criterion(model(inputs), targets)
+        return model, tensors, (loss_fn, None)
+    elif kind == 'hybrid':
+        from AML import HybridDeepModel, UnifiedReactorDataset, hybrid_losses
+        model = HybridDeepModel(hidden_size=config['hidden_size'], dropout=config['dropout'])
+        dataset = UnifiedReactorDataset()
+        return model, dataset.tensors(), hybrid_losses(dataset)
+    elif kind == 'pinn':
+        from PINN_ML import NuclearPINN, load_data, pinn_losses
+        model = NuclearPINN(hidden_size=config['hidden_size'])
+        inputs, outputs = load_data()
+        return model, (inputs, outputs), pinn_losses(model, inputs, physics_weight=config['physics_weight'])
+    raise ValueError(f"Invalid model: {kind}")
+
+def run_trial(kind, trial_id, config, epochs, checkpoint_path, num_threads):
+    """
+    Train one trial up to epochs (continuing from its checkpoint) and return its validation metrics.
+    """
+    torch.manual_seed(trial_id)  # Same data noise, collocation pool and initial weights at every rung
+    model, tensors, (loss_fn, val_loss_fn) = build_trial(kind, config)
+    _, stats = train_model(model, tensors, loss_fn, epochs, lr=config['lr'], num_threads=num_threads,
+                           log_every=epochs + 1, name=f"Trial {trial_id}", val_fraction=0.1, val_loss_fn=val_loss_fn,
+                           patience=10, checkpoint_path=checkpoint_path, checkpoint_every=epochs)
+    return {'val_loss': stats['best_loss'], 'samples_per_sec': stats['samples_per_sec'], 'seconds': stats['seconds'],
+            'early_stopped': stats['epochs'] < epochs}
+
+def asha_search(kind, num_trials=27, min_epochs=5, max_epochs=135, eta=3, max_workers=None, seed=0,
+                results_file=None, space=None):
+    """
+    Run the search and return the best (trial_id, config, val_loss) at the highest rung reached.
+    Rung r trains to min_epochs * eta**r epochs, capped at max_epochs.
+    Trial checkpoints go to a fresh directory per search, so an earlier search's trial_XXXX.pt is never resumed.
+    """
+    space = space or SEARCH_SPACES[kind]
+    results_file = results_file or f"AI_Projects/hpo/{kind}_trials.csv"
+    checkpoint_dir = os.path.join(os.path.dirname(results_file), kind, f"search_{time.strftime('%Y%m%d-%H%M%S')}_seed{seed}")
+    os.makedirs(checkpoint_dir)  # Fails rather than reusing another search's checkpoints
+    max_workers = max_workers or os.cpu_count()
+    num_threads = max(1, (os.cpu_count() or 1) // max_workers)
+    budgets = [min_epochs]
+    while budgets[-1] * eta <= max_epochs:
+        budgets.append(budgets[-1] * eta)
+
+    rng = np.random.default_rng(seed)
+    configs = {}
+    scores = [{} for _ in budgets]  # Per rung: trial_id -> val_loss
+    promoted = [set() for _ in budgets]
+    converged = set()  # Early-stopped trials; more epochs wouldn't help
+
+    def next_job():
+        for rung in reversed(range(len(budgets) - 1)):
+            ranked = sorted(scores[rung], key=scores[rung].get)[:len(scores[rung]) // eta]
+            for trial_id in ranked:
+                if trial_id not in promoted[rung] and trial_id not in converged:
+                    promoted[rung].add(trial_id)
+                    return trial_id, rung + 1
+        if len(configs) < num_trials:
+            trial_id = len(configs)
+            configs[trial_id] = sample_config(space, rng)
+            return trial_id, 0
+        return None
+
+    write_header = not os.path.exists(results_file)
+    with open(results_file, 'a', newline='') as f, ProcessPoolExecutor(max_workers=max_workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if write_header:
+            writer.writeheader()
+        running = {}
+
+        def submit():
+            while len(running) < max_workers and (job := next_job()) is not None:
+                trial_id, rung = job
+                checkpoint_path = os.path.join(checkpoint_dir, f"trial_{trial_id:04d}.pt")
+                future = pool.submit(run_trial, kind, trial_id, configs[trial_id], budgets[rung], checkpoint_path, num_threads)
+                running[future] = (trial_id, rung)
+
+        submit()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                trial_id, rung = running.pop(future)
+                try:
+                    metrics = future.result()
+                    scores[rung][trial_id] = metrics['val_loss']
+                    status = 'ok'
+                    if metrics['early_stopped']:
+                        converged.add(trial_id)
+                        status = 'early_stopped'
+                except Exception as e:
+                    metrics = {}
+                    status = f'failed: {e}'
+                writer.writerow({'trial_id': trial_id, 'rung': rung, 'epochs': budgets[rung], **configs[trial_id],
+                                 **{k: metrics.get(k, '') for k in ['val_loss', 'samples_per_sec', 'seconds']},
+                                 'status': status})
+                f.flush()
+                print(f"Trial {trial_id} rung {rung} ({budgets[rung]} epochs): val loss {metrics.get('val_loss')} ({status})")
+            submit()
+
+    top_rung = max(r for r in range(len(budgets)) if scores[r]) if any(scores) else None
+    if top_rung is None:
+        print("No trial completed.")
+        return None
+    best_id = min(scores[top_rung], key=scores[top_rung].get)
+    print(f"Best {kind} trial {best_id} at {budgets[top_rung]} epochs: {configs[best_id]}, "
+          f"val loss {scores[top_rung][best_id]}. Results in {results_file}, checkpoints in {checkpoint_dir}.")
+    return best_id, configs[best_id], scores[top_rung][best_id]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ASHA hyperparameter search for the surrogate models.")
+    parser.add_argument('model', choices=['deep', 'hybrid', 'pinn'])
+    parser.add_argument('--trials', type=int, default=27, help="Configs to sample")
+    parser.add_argument('--min-epochs', type=int, default=5, help="Epochs at the first rung")
+    parser.add_argument('--max-epochs', type=int, default=135, help="Epoch cap for the last rung")
+    parser.add_argument('--eta', type=int, default=3, help="Keep the best 1/eta at each rung")
+    parser.add_argument('--workers', type=int, default=None, help="Concurrent trials (default: cores)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help="Results CSV (default: AI_Projects/hpo/<model>_trials.csv)")
+    args = parser.parse_args()
+    asha_search(args.model, args.trials, args.min_epochs, args.max_epochs, args.eta, args.workers, args.seed, args.out)
\ No newline at end of file
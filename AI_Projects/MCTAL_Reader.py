@@ -0,0 +1,147 @@
+import os
+import re
+import mmap
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Reader for MCNP MCTAL tally files.
+# Opening a file only indexes the byte offset of each "tally N" block; a tally's bins, values and
+# relative errors are parsed into NumPy arrays when it is first requested.
+# Values are shaped over the 8 MCTAL bin axes in file order (f, d, u, s, m, c, e, t; t varies fastest).
+
+AXES = ['f', 'd', 'u', 's', 'm', 'c', 'e', 't']
+TALLY_START = re.compile(rb'^tally\s+(\d+)', re.MULTILINE)
+
+def _is_keyword(token):
+    return token[:1].isalpha()
+
+def parse_tally_block(block):
+    """
+    One tally block (from its "tally" line up to the next one) into a dict of labeled NumPy arrays.
+    """
+    lines = block.split(b'\n')
+    header = lines[0].split()
+    tally = {'id': int(header[1]), 'particle': int(header[2]), 'type': int(header[3]) if len(header) > 3 else 0}
+    # Skip the particle list and any FC comment lines; the bin description starts at the "f" line
+    first = next(i for i, line in enumerate(lines) if line.split()[:1] == [b'f'])
+    tokens = b' '.join(lines[first:]).split()
+
+    bins = {}
+    shape = []
+    i = 0
+    while i < len(tokens) and tokens[i] != b'vals':
+        axis = tokens[i].decode()
+        count = int(tokens[i + 1])
+        i += 2
+        start = i
+        while i < len(tokens) and not _is_keyword(tokens[i]):
+            i += 1
+        bins[axis[0]] = np.array(tokens[start:i], dtype=float)
+        if len(axis) > 1:
+            bins[axis[0] + '_flag'] = axis[1]  # 't' = total bin included, 'c' = cumulative
+        shape.append(max(count, 1))
+
+    end = tokens.index(b'tfc') if b'tfc' in tokens else len(tokens)
+    pairs = np.array(tokens[i + 1:end], dtype=float).reshape(-1, 2)
+    tally['axes'] = AXES
+    tally['bins'] = bins
+    tally['values'] = pairs[:, 0].reshape(shape)
+    tally['errors'] = pairs[:, 1].reshape(shape)  # Relative errors
+    return tally
+
+class MCTAL:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self._mm[:self._mm.find(b'\n')].split()
+        self.code = header[0].decode() if header else ''
+        self.nps = int(header[-2]) if len(header) >= 2 and header[-2].isdigit() else None
+        # Byte range of every tally block; nothing is parsed yet
+        starts = [(int(m.group(1)), m.start()) for m in TALLY_START.finditer(self._mm)]
+        kcode = self._mm.find(b'\nkcode')
+        ends = [s for _, s in starts[1:]] + [kcode + 1 if kcode != -1 else len(self._mm)]
+        self._offsets = {tid: (start, end) for (tid, start), end in zip(starts, ends)}
+        self._cache = {}
+
+    @property
+    def tally_ids(self):
+        return list(self._offsets)
+
+    def tally(self, tally_id):
+        """
+        Parse (once) and return one tally.
+        """
+        if tally_id not in self._cache:
+            start, end = self._offsets[tally_id]
+            self._cache[tally_id] = parse_tally_block(self._mm[start:end])
+        return self._cache[tally_id]
+
+    def tallies(self, tally_ids=None):
+        return {tid: self.tally(tid) for tid in (tally_ids or self.tally_ids)}
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def find_mctal_files(root):
+    """
+    MCTAL files under root (named mctal, *.mctal or *mctal.txt).
+    """
+    found = []
+    for dir_path, _, files in os.walk(root):
+        found.extend(os.path.join(dir_path, f) for f in files if f == 'mctal' or f.endswith(('.mctal', 'mctal.txt')))
+    return sorted(found)
+
+def _read_values(args):
+    """
+    Requested tallies of one file, or None and the error when it can't be read (missing tally, truncated file).
+    """
+    path, tally_ids = args
+    try:
+        with MCTAL(path) as mctal:
+            return {tid: (t['values'], t['errors']) for tid, t in mctal.tallies(tally_ids).items()}, None
+    except (OSError, KeyError, ValueError, IndexError) as e:
+        return None, repr(e)
+
+def ingest_mctal_files(root, tally_ids, out_file="AI_Projects/MCNP_Data/mctal_tallies.npz", max_workers=None):
+    """
+    Read the requested tallies from every MCTAL under root on a process pool and save them stacked per tally.
+    Files that can't be read or lack one of the tallies are reported and left out.
+    """
+    paths = find_mctal_files(root)
+    if not paths:
+        print("No MCTAL files found.")
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        read = list(pool.map(_read_values, [(p, tally_ids) for p in paths], chunksize=32))
+    for path, (_, error) in zip(paths, read):
+        if error is not None:
+            print(f"Skipping {path}: {error}")
+    paths = [path for path, (values, _) in zip(paths, read) if values is not None]
+    results = [values for values, _ in read if values is not None]
+    if not paths:
+        print("No readable MCTAL files found.")
+        return
+    arrays = {}
+    for tid in tally_ids:
+        arrays[f"tally_{tid}_values"] = np.stack([r[tid][0] for r in results])
+        arrays[f"tally_{tid}_errors"] = np.stack([r[tid][1] for r in results])
+    os.makedirs(os.path.dirname(out_file), exist_ok=True)
+    np.savez(out_file, files=np.array(paths), **arrays)
+    print(f"Ingested tallies {tally_ids} from {len(paths)} MCTAL files into {out_file}.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-read MCNP MCTAL tallies into stacked NumPy arrays.")
+    parser.add_argument('root', help="Directory tree containing MCTAL files")
+    parser.add_argument('--tallies', type=int, nargs='+', required=True, help="Tally numbers to extract")
+    parser.add_argument('--out', default="AI_Projects/MCNP_Data/mctal_tallies.npz", help="Output .npz file")
+    parser.add_argument('--workers', type=int, default=None, help="Reader processes (default: cores)")
+    args = parser.parse_args()
+    ingest_mctal_files(args.root, args.tallies, args.out, args.workers)
\ No newline at end of file
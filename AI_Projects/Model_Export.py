@@ -0,0 +1,168 @@
+import os
+import csv
+import time
+import argparse
+import numpy as np
+import torch
+import torch.nn as nn
+from Surrogates import SEQ_LEN, load_surrogate
+from Train_Engine import split_validation
+try:
+    import onnx
+except ImportError:
+    onnx = None
+try:
+    import onnxruntime
+    from onnxruntime.quantization import QuantType, quantize_dynamic as quantize_onnx_dynamic
+except ImportError:
+    onnxruntime = None
+
+# Deployment export for the trained surrogates: TorchScript and ONNX artifacts, fp32 and dynamic int8
+# (Linear and LSTM weights quantized, activations quantized on the fly), plus an accuracy-vs-latency report
+# against the fp32 eager model on the held-out validation rows the trainers set aside (same split seed).
+
+EXPORT_DIR = "AI_Projects/exported/"
+REPORT_FIELDS = ['variant', 'size_kb', 'latency_p50_us', 'latency_p99_us', 'batch_samples_per_sec',
+                 'mae_k_eff', 'mae_efpd', 'max_dev_k_eff', 'max_dev_efpd']
+
+def example_inputs(kind, batch=1):
+    inputs = (torch.rand(batch, 8),)
+    return inputs + (torch.zeros(batch, SEQ_LEN, 1),) if kind == 'hybrid' else inputs
+
+def quantize(model):
+    """
+    Dynamic int8 quantization of the Linear and LSTM layers.
+    """
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear, nn.LSTM}, dtype=torch.qint8)
+
+def export_torchscript(model, path):
+    torch.jit.save(torch.jit.script(model), path)
+    return torch.jit.load(path)
+
+def export_onnx(model, kind, path):
+    """
+    fp32 ONNX graph with a dynamic batch axis (and sequence length for the hybrid model).
+    """
+    input_names = ['inputs', 'sequences'] if kind == 'hybrid' else ['inputs']
+    dynamic_axes = {'inputs': {0: 'batch'}, 'outputs': {0: 'batch'}}
+    if kind == 'hybrid':
+        dynamic_axes['sequences'] = {0: 'batch', 1: 'steps'}
+    torch.onnx.export(model, example_inputs(kind), path, input_names=input_names, output_names=['outputs'],
+                      dynamic_axes=dynamic_axes, dynamo=False)
+
+def onnx_runner(path, kind, num_threads):
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = num_threads
+    session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+    names = ['inputs', 'sequences'] if kind == 'hybrid' else ['inputs']
+
+    def run(*inputs):
+        return torch.from_numpy(session.run(None, {n: x.numpy() for n, x in zip(names, inputs)})[0])
+    return run
+
+def torch_runner(model):
+    def run(*inputs):
+        with torch.inference_mode():
+            return model(*inputs)
+    return run
+
+def held_out_set(kind):
+    """
+    Validation rows (inputs..., targets) from the feature store, or random inputs without targets if it is empty.
+    """
+    if kind == 'hybrid':
+        from AML import UnifiedReactorDataset
+        dataset = UnifiedReactorDataset()
+        tensors = (dataset.inputs, dataset.outputs)
+    else:
+        from Feature_Store import FeatureStore
+        tensors = FeatureStore().to_tensors()
+    held_out = split_validation(tensors, 0.1)[1] if len(tensors[0]) > 0 else None
+    if held_out is None:
+        print("No held-out rows in the feature store; comparing against fp32 on random inputs only.")
+        return example_inputs(kind, 1000), None
+    # Exported graphs take dense sequences, so the hybrid model is measured as deployed: new designs, no history
+    inputs = (held_out[0], torch.zeros(len(held_out[0]), SEQ_LEN, 1)) if kind == 'hybrid' else (held_out[0],)
+    return inputs, held_out[1]
+
+def measure(run, inputs, targets, reference, repeats=1000):
+    """
+    Single-sample latency percentiles, batched throughput and errors (vs targets and vs the fp32 reference).
+    """
+    single = [x[:1] for x in inputs]
+    run(*single)  # Warm-up
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run(*single)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    pred = run(*inputs)
+    elapsed = time.perf_counter() - start
+    row = {'latency_p50_us': np.percentile(latencies, 50) * 1e6, 'latency_p99_us': np.percentile(latencies, 99) * 1e6,
+           'batch_samples_per_sec': len(inputs[0]) / elapsed if elapsed > 0 else 0.0}
+    if targets is not None:
+        row['mae_k_eff'], row['mae_efpd'] = (pred - targets).abs().mean(0).tolist()
+    row['max_dev_k_eff'], row['max_dev_efpd'] = (pred - reference).abs().max(0).values.tolist()
+    return row
+
+def export_surrogate(kind, weights=None, out_dir=EXPORT_DIR, int8=True, onnx_export=True, num_threads=1):
+    """
+    Write <kind>_fp32/_int8 TorchScript (.pt) and ONNX (.onnx) artifacts and <kind>_export_report.csv.
+    Latency is measured at num_threads intra-op threads (1 = embedded single-core use).
+    """
+    torch.set_num_threads(num_threads)
+    os.makedirs(out_dir, exist_ok=True)
+    model = load_surrogate(kind, weights)
+    inputs, targets = held_out_set(kind)
+    with torch.inference_mode():
+        reference = model(*inputs)
+
+    def artifact(name):
+        return os.path.join(out_dir, f"{kind}_{name}")
+
+    torch.save(model.state_dict(), artifact("eager_fp32.pth"))  # Baseline for the size column
+    variants = [('eager_fp32', torch_runner(model), artifact("eager_fp32.pth")),
+                ('torchscript_fp32', torch_runner(export_torchscript(model, artifact("fp32.pt"))), artifact("fp32.pt"))]
+    if int8:
+        variants.append(('torchscript_int8', torch_runner(export_torchscript(quantize(model), artifact("int8.pt"))),
+                         artifact("int8.pt")))
+    if onnx_export:
+        if onnx is None:
+            print("onnx library not found; install onnx to export ONNX models.")
+        else:
+            export_onnx(model, kind, artifact("fp32.onnx"))
+            if onnxruntime is None:
+                print("onnxruntime not found; ONNX artifacts are written but not quantized or benchmarked.")
+            else:
+                variants.append(('onnx_fp32', onnx_runner(artifact("fp32.onnx"), kind, num_threads), artifact("fp32.onnx")))
+                if int8:
+                    quantize_onnx_dynamic(artifact("fp32.onnx"), artifact("int8.onnx"), weight_type=QuantType.QInt8)
+                    variants.append(('onnx_int8', onnx_runner(artifact("int8.onnx"), kind, num_threads), artifact("int8.onnx")))
+
+    rows = []
+    for name, run, path in variants:
+        rows.append({'variant': name, 'size_kb': os.path.getsize(path) / 1024, **measure(run, inputs, targets, reference)})
+    report_file = artifact("export_report.csv")
+    with open(report_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"{'variant':<18} {'size KB':>8} {'p50 us':>8} {'p99 us':>8} {'batch/s':>10} {'max dev k':>10}")
+    for row in rows:
+        print(f"{row['variant']:<18} {row['size_kb']:>8.0f} {row['latency_p50_us']:>8.1f} {row['latency_p99_us']:>8.1f} "
+              f"{row['batch_samples_per_sec']:>10.0f} {row['max_dev_k_eff']:>10.2e}")
+    print(f"Exported {kind} surrogate to {out_dir}; report in {report_file}.")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a trained surrogate to TorchScript/ONNX, optionally int8.")
+    parser.add_argument('model', choices=['deep', 'hybrid', 'pinn'])
+    parser.add_argument('--weights', default=None, help="State dict path (default: the trainer's output)")
+    parser.add_argument('--out', default=EXPORT_DIR, help="Output directory")
+    parser.add_argument('--no-int8', action='store_true', help="Skip dynamic int8 quantization")
+    parser.add_argument('--no-onnx', action='store_true', help="TorchScript only")
+    parser.add_argument('--threads', type=int, default=1, help="Intra-op threads for the latency measurement")
+    args = parser.parse_args()
+    export_surrogate(args.model, args.weights, args.out, not args.no_int8, not args.no_onnx, args.threads)
\ No newline at end of file
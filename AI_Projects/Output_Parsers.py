@@ -0,0 +1,101 @@
+import re
+import mmap
+from array import array
+import numpy as np
+
+# Streaming parsers for large text outputs (MCNP outp, Cardinal *_console.out).
+# Files are memory-mapped and searched in place: the final k-eff is found by scanning backwards from the end
+# for a literal anchor, and per-cycle histories are collected with regexes run directly over the mapping,
+# so peak memory stays flat however big the file grows.
+
+# Final combined k-eff. Matches both "k-eff = 1.00355 +/- 0.00043" and MCNP's
+# "keff = 1.00355 with an estimated standard deviation of 0.00043".
+MCNP_ANCHOR = b'combined collision/absorption/track-length k'
+MCNP_KEFF = re.compile(rb'k-?eff\s*=\s*(\d+\.\d+)\s*(?:\+/-|with an estimated standard deviation of)\s*(\d+\.\d+)')
+# MCNP print table 175 (estimated keff results by cycle): cycle, k(collision), k(absorption), k(track length), ...
+MCNP_TABLE = b'print table 175'
+MCNP_CYCLE = re.compile(rb'^\s*(\d+)\s+(\d+\.\d+)\s+(\d+\.\d+)\s+(\d+\.\d+)', re.MULTILINE)
+
+# Cardinal runs OpenMC in-process: "Combined k-effective = 1.02345 +/- 0.00123" (or "k-eff = 1.02345 (0.00123)")
+# after each solve, and one "  12/1    1.03041 ..." line per batch.
+CARDINAL_ANCHORS = [b'Combined k-effective', b'k-eff']
+CARDINAL_KEFF = re.compile(rb'k-eff(?:ective)?\s*=\s*(\d+\.\d+)\s*(?:\+/-\s*|\(\s*)(\d+\.\d+)')
+CARDINAL_BATCH = re.compile(rb'^\s*(\d+)/\d+\s+(\d+\.\d+)', re.MULTILINE)
+
+WINDOW = 512  # Bytes after an anchor that the k-eff value must fall within
+
+def _map(path):
+    with open(path, 'rb') as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            return None
+
+def last_keff(path, anchors, pattern):
+    """
+    (k-eff, uncertainty) from the last anchor in the file that is followed by a match, or (None, None).
+    """
+    mm = _map(path)
+    if mm is None:
+        return None, None
+    try:
+        for anchor in anchors:
+            end = len(mm)
+            while (idx := mm.rfind(anchor, 0, end)) != -1:
+                match = pattern.search(mm, idx, min(idx + WINDOW, len(mm)))
+                if match:
+                    return float(match.group(1)), float(match.group(2))
+                end = idx
+        return None, None
+    finally:
+        mm.close()
+
+def parse_mcnp_keff(outp_file):
+    """
+    Final combined collision/absorption/track-length k-eff and its standard deviation from an MCNP outp.
+    """
+    k_eff, k_eff_unc = last_keff(outp_file, [MCNP_ANCHOR], MCNP_KEFF)
+    if k_eff is None:
+        raise ValueError("k-eff not found in MCNP output.")
+    return k_eff, k_eff_unc
+
+def parse_cardinal_keff(console_file):
+    """
+    Last k-eff and uncertainty reported in a Cardinal console log, or (None, None).
+    """
+    return last_keff(console_file, CARDINAL_ANCHORS, CARDINAL_KEFF)
+
+def mcnp_keff_history(outp_file):
+    """
+    Per-cycle k-eff from MCNP table 175: cycles [n] int32 and k-eff [n, 3] float32 (collision, absorption, track length).
+    """
+    mm = _map(outp_file)
+    cycles, keffs = array('i'), array('f')  # Packed buffers, not lists of Python floats
+    if mm is not None:
+        try:
+            start = mm.find(MCNP_TABLE)
+            while start != -1:
+                end = mm.find(b'print table', start + len(MCNP_TABLE))  # Table runs until the next print table
+                end = len(mm) if end == -1 else end
+                for match in MCNP_CYCLE.finditer(mm, start, end):
+                    cycles.append(int(match.group(1)))
+                    keffs.extend((float(match.group(2)), float(match.group(3)), float(match.group(4))))
+                start = mm.find(MCNP_TABLE, end)
+        finally:
+            mm.close()
+    return np.frombuffer(cycles, dtype=np.int32), np.frombuffer(keffs, dtype=np.float32).reshape(-1, 3)
+
+def cardinal_keff_history(console_file):
+    """
+    Per-batch k-eff from a Cardinal console log across all OpenMC solves: batches [n] int32, k-eff [n] float32.
+    """
+    mm = _map(console_file)
+    batches, keffs = array('i'), array('f')
+    if mm is not None:
+        try:
+            for match in CARDINAL_BATCH.finditer(mm):
+                batches.append(int(match.group(1)))
+                keffs.append(float(match.group(2)))
+        finally:
+            mm.close()
+    return np.frombuffer(batches, dtype=np.int32), np.frombuffer(keffs, dtype=np.float32)
\ No newline at end of file
@@ -1,11 +1,9 @@
 import torch
 import torch.nn as nn
-import torch.optim as optim
-import numpy as np
-import json
-import os
-import re
-import h5py
+import argparse
+from Feature_Store import FeatureStore
+from torch.func import jacrev, vmap
+from Train_Engine import train_model, incremental_update, save_data_stats
 try:
     import exodus
 except ImportError:
@@ -13,7 +11,7 @@ except ImportError:
 
 # Unified PINN Model: Physics-Informed Neural Network for nuclear parameters prediction
 # Incorporates neutron diffusion equation as physics loss: ∇·D∇φ - Σ_a φ + νΣ_f φ = 0 (simplified for k-eff ~ νΣ_f / Σ_a)
-# Distinguishes data from OpenMC, MCNP, Cardinal via loading parsed JSONs
+# Distinguishes data from OpenMC, MCNP, Cardinal via the feature store's sim_type labels
 # Trains on combined dataset, with physics regularization
 
 class NuclearPINN(nn.Module):
@@ -31,17 +29,24 @@ class NuclearPINN(nn.Module):
         x = self.relu(self.fc3(x))
         return self.fc_out(x)
 
-def physics_loss(model, inputs, outputs):
+def input_gradients(model, inputs):
+    """
+    Per-sample d(k-eff)/d(inputs) [n, 8] and k-eff [n], from one vmapped jacrev pass.
+    The inputs need no requires_grad and the graph stays per-batch, while gradients still reach the model weights.
+    """
+    def k_eff(x):
+        k = model(x.unsqueeze(0))[0, 0]
+        return k, k
+    return vmap(jacrev(k_eff, has_aux=True))(inputs)
+
+def physics_loss(model, inputs, outputs=None):
     """
     Physics-informed loss: Approximate k-eff = nu * Sigma_f / (Sigma_a + D * grad^2)
     Simplified: Enforce k-eff ≈ enrichment * power / (temp factor); derivative-based
+    Needs no targets, so it can be evaluated on collocation points as well as on data.
     """
-    inputs.requires_grad = True
-    pred = model(inputs)
-    k_eff_pred = pred[:, 0]
-
-    # Compute gradient wrt inputs (e.g., wrt radius or temp as proxy for diffusion)
-    grad_k = torch.autograd.grad(k_eff_pred.sum(), inputs, create_graph=True)[0]
+    # Gradient wrt inputs (e.g., wrt radius or temp as proxy for diffusion)
+    grad_k, k_eff_pred = input_gradients(model, inputs)
     diffusion_term = torch.mean(grad_k[:, :2]**2)  # Proxy for ∇^2 on geometry params
 
     # Nuclear physics constraint: k-eff ~ enrichment / absorption (temp-dependent)
@@ -53,57 +58,83 @@ def physics_loss(model, inputs, outputs):
     phys_mse = nn.MSELoss()(k_eff_pred, physics_k)
     return phys_mse
 
-def load_data(sim_type, reactor_type):
+def sample_collocation(num_points, low, high):
     """
-    Load parsed outputs from JSON for given sim_type and reactor_type.
+    Collocation points drawn uniformly from the box [low, high] of input space (fixed features stay fixed).
     """
-    dir_path = f"AI_Projects/{sim_type}_Data/outputs/"
-    results = []
-    for file in os.listdir(dir_path):
-        if reactor_type in file and file.endswith('_results.json'):
-            with open(os.path.join(dir_path, file), 'r') as f:
-                data = json.load(f)
-            # Corresponding inputs
-            input_file = file.replace('outputs', 'inputs').replace('_results', '_params')
-            with open(os.path.join(dir_path.replace('outputs', 'inputs'), input_file), 'r') as fin:
-                params = json.load(f)
-            inp_vec = [params.get(k, 0) for k in ['enrichment_u235', 'fuel_radius_cm', 'clad_radius_cm', 'temperature_k',
-                                                  'power_mw', 'moderator_density_g_cm3', 'coolant_density_g_cm3', 'salt_density_g_cm3']]
-            out_vec = [data['k_eff'], data['efpd']]
-            results.append((inp_vec, out_vec))
-    return results
-
-def train_pinn(sim_types=['OPENMC', 'MCNP', 'CARDINAL'], reactor_types=['BWR', 'CANDU', 'MSR', 'PWR', 'SFR']):
-    all_data = []
-    for sim_type in sim_types:
-        for reactor_type in reactor_types:
-            all_data.extend(load_data(sim_type, reactor_type))
-
-    if not all_data:
-        print("No data loaded. Run simulations and parse first.")
-        return
+    return low + torch.rand(num_points, len(low)) * (high - low)
 
-    inputs = torch.tensor([d[0] for d in all_data], dtype=torch.float32)
-    outputs = torch.tensor([d[1] for d in all_data], dtype=torch.float32)
+def collocation_batch_size(model, memory_mb=256):
+    """
+    Collocation points per step whose physics-loss graph fits in memory_mb.
+    Per point: forward activations, the jacrev backward pass and the double-backward graph kept for the weight
+    update, about 6 floats per hidden unit.
+    """
+    hidden_units = sum(m.out_features for m in model.modules() if isinstance(m, nn.Linear))
+    return max(int(memory_mb * 2**20 // (6 * 4 * hidden_units)), 1)
 
-    model = NuclearPINN()
-    optimizer = optim.Adam(model.parameters(), lr=0.001)
+def load_data(sim_types=None, reactor_types=None):
+    """
+    Load parsed runs for the given sim_types and reactor_types (None = all) from the feature store.
+    """
+    return FeatureStore().to_tensors(sim_types, reactor_types)
+
+def pinn_losses(model, inputs, num_collocation=200000, collocation_batch=None, memory_mb=256, physics_weight=0.5):
+    """
+    Training loss (data + physics_weight * physics on an independent collocation minibatch) and validation loss
+    (data fit only) for train_model.
+    """
     criterion = nn.MSELoss()
+    collocation = sample_collocation(num_collocation, inputs.min(0).values, inputs.max(0).values)
+    collocation_batch = collocation_batch or collocation_batch_size(model, memory_mb)
+    print(f"PINN: {num_collocation} collocation points, {collocation_batch} per step")
+
+    def loss_fn(model, batch):
+        batch_inputs, batch_outputs = batch
+        pred = model(batch_inputs)
+        data_loss = criterion(pred, batch_outputs)
+        points = collocation[torch.randint(num_collocation, (collocation_batch,))]  # Global RNG, so resume is exact
+        phys_loss = physics_loss(model, points)
+        return data_loss + physics_weight * phys_loss  # Balance data and physics
+
+    def val_loss_fn(model, batch):
+        batch_inputs, batch_outputs = batch
+        return criterion(model(batch_inputs), batch_outputs)  # Early stopping on the data fit only
+
+    return loss_fn, val_loss_fn
+
+def train_pinn(sim_types=None, reactor_types=None,
+               num_collocation=200000, collocation_batch=None, memory_mb=256, physics_weight=0.5, incremental=False,
+               **engine_options):
+    """
+    Data minibatches and physics collocation minibatches are drawn independently each step: the collocation pool
+    (num_collocation points spanning the data's input range) can be far larger than the dataset, while only
+    collocation_batch points (default: what fits in memory_mb) are on the graph at a time.
+    incremental: fine-tune the saved PINN on new rows only (see Train_Engine.incremental_update).
+    """
+    inputs, outputs = load_data(sim_types, reactor_types)
 
-    for epoch in range(500):
-        optimizer.zero_grad()
-        pred = model(inputs)
-        data_loss = criterion(pred, outputs)
-        phys_loss = physics_loss(model, inputs, outputs)
-        total_loss = data_loss + 0.5 * phys_loss  # Balance data and physics
-        total_loss.backward()
-        optimizer.step()
+    if len(inputs) == 0:
+        print("No data loaded. Run simulations and parse first.")
+        return
+
+    model = NuclearPINN()
+    loss_fn, val_loss_fn = pinn_losses(model, inputs, num_collocation, collocation_batch, memory_mb, physics_weight)
+    if incremental and incremental_update(model, (inputs, outputs), loss_fn, "AI_Projects/pinn_model.pth", name="PINN",
+                                          val_loss_fn=val_loss_fn) is not None:
+        return
 
-        if epoch % 50 == 0:
-            print(f"Epoch {epoch}, Data Loss: {data_loss.item()}, Phys Loss: {phys_loss.item()}, Total: {total_loss.item()}")
+    # The physics loss differentiates through the model twice, which torch.compile doesn't support
+    options = {'val_fraction': 0.1, 'patience': 50, 'scheduler': 'plateau',
+               'checkpoint_path': "AI_Projects/checkpoints/pinn.pt", **engine_options, 'compile_model': False}
+    model, _ = train_model(model, (inputs, outputs), loss_fn, epochs=500, log_every=50, name="PINN",
+                           val_loss_fn=val_loss_fn, **options)
 
     torch.save(model.state_dict(), "AI_Projects/pinn_model.pth")
+    save_data_stats("AI_Projects/pinn_model.pth", (inputs, outputs))
     print("PINN model trained and saved.")
 
 if __name__ == "__main__":
-    train_pinn()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the physics-informed k-eff/EFPD surrogate.")
+    parser.add_argument('--incremental', action='store_true', help="Fine-tune the saved model on new rows only")
+    train_pinn(incremental=parser.parse_args().incremental)
\ No newline at end of file
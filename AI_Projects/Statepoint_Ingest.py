@@ -0,0 +1,134 @@
+import os
+import re
+import json
+import argparse
+import numpy as np
+import h5py
+from concurrent.futures import ThreadPoolExecutor
+from Feature_Store import FeatureStore, DEFAULT_STORE_DIR, estimate_efpd
+
+# Bulk ingestion of OpenMC statepoints into the feature store.
+# Reads only k_combined (and any requested tally slices) with h5py instead of building a full openmc.StatePoint,
+# on a thread pool, and appends every run to the store in one batch.
+# Run parameters come from a params.json next to each statepoint (written by scripts/sweep_OpenMC.py),
+# layered over an optional defaults file for campaign-wide values such as the burnup target.
+
+INGESTED_LOG = "ingested_statepoints.txt"  # Kept in the store directory: what was ingested depends on the store
+LEGACY_LOG_DIR = "AI_Projects/OPENMC_Data"  # Where the default store's logs used to live
+
+def ingested_files(store, log_name):
+    """
+    Absolute paths already ingested into this store, from the log in its directory.
+    """
+    logs = [os.path.join(store.root, log_name)]
+    if os.path.abspath(store.root) == os.path.abspath(DEFAULT_STORE_DIR):
+        logs.append(os.path.join(LEGACY_LOG_DIR, log_name))
+    done = set()
+    for log in logs:
+        if os.path.exists(log):
+            with open(log, 'r') as f:
+                done.update(f.read().split('\n'))
+    return done
+
+def log_ingested(store, log_name, paths):
+    with open(os.path.join(store.root, log_name), 'a') as f:
+        f.write(''.join(os.path.abspath(p) + '\n' for p in paths))
+
+def find_statepoints(root):
+    """
+    Final statepoint (highest batch number) of every run directory under root.
+    statepoint.cached.h5 (a result-cache hit, see scripts/cache_OpenMC.py) counts when nothing else is there.
+    """
+    statepoints = []
+    for dir_path, _, files in os.walk(root):
+        batches = [(int(m.group(1)) if m.group(1).isdigit() else -1, f) for f in files
+                   if (m := re.fullmatch(r'statepoint\.(\d+|cached)\.h5', f))]
+        if batches:
+            statepoints.append(os.path.join(dir_path, max(batches)[1]))
+    return sorted(statepoints)
+
+def read_statepoint(statepoint_file, tally_ids=()):
+    """
+    Combined k-eff, its uncertainty and the (mean, std) of each requested tally, straight from the HDF5.
+    tally_ids=None reads every tally. The one statepoint reader; the sweep and result-cache scripts import it.
+    """
+    with h5py.File(statepoint_file, 'r') as f:
+        k_combined = f['k_combined'][()] if 'k_combined' in f else [np.nan, np.nan]
+        if tally_ids is None:
+            tally_ids = [int(name.split()[1]) for name in f.get('tallies', {}) if name.startswith('tally ')]
+        tallies = {}
+        for tally_id in tally_ids:
+            group = f[f'tallies/tally {tally_id}']
+            n = group['n_realizations'][()]
+            results = group['results'][()]  # [..., 0] = sum, [..., 1] = sum of squares
+            mean = results[..., 0] / n
+            var = np.maximum(results[..., 1] / n - mean**2, 0) / max(n - 1, 1)
+            tallies[tally_id] = (mean, np.sqrt(var))
+    return {'k_eff': float(k_combined[0]), 'k_eff_uncertainty': float(k_combined[1]), 'tallies': tallies}
+
+def load_run_params(run_dir, default_params):
+    params = dict(default_params or {})
+    params_file = os.path.join(run_dir, 'params.json')
+    if os.path.exists(params_file):
+        with open(params_file, 'r') as f:
+            params.update(json.load(f))
+    params['sim_type'] = 'OPENMC'
+    return params
+
+def ingest_statepoints(root, default_params=None, tally_ids=(), store=None, max_workers=None, tally_file=None):
+    """
+    Read every new statepoint under root on a thread pool and append them to the feature store in one batch.
+    Statepoints already listed in the store's ingested log are skipped, so a growing campaign can be re-ingested cheaply.
+    A statepoint that can't be read (truncated, still being written) is reported and left for the next ingest.
+    """
+    if store is None:
+        store = FeatureStore()
+    done = ingested_files(store, INGESTED_LOG)
+    statepoints = [sp for sp in find_statepoints(root) if os.path.abspath(sp) not in done]
+    if not statepoints:
+        print("No new statepoints found.")
+        return 0
+
+    def read_or_none(statepoint):
+        try:
+            return read_statepoint(statepoint, tally_ids)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Skipping {statepoint}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        results = list(pool.map(read_or_none, statepoints))
+    statepoints, results = [sp for sp, r in zip(statepoints, results) if r is not None], [r for r in results if r is not None]
+    if not statepoints:
+        print("No readable statepoints found.")
+        return 0
+
+    entries = []
+    for statepoint, result in zip(statepoints, results):
+        params = load_run_params(os.path.dirname(statepoint), default_params)
+        entries.append({**params, 'k_eff': result['k_eff'], 'k_eff_uncertainty': result['k_eff_uncertainty'],
+                        'efpd': estimate_efpd(params)})
+    store.append(entries)
+
+    if tally_ids:
+        tally_file = tally_file or os.path.join(store.root, f"tallies_{len(store) - len(entries):08d}.npz")
+        arrays = {f"tally_{tid}": np.stack([r['tallies'][tid][0] for r in results]) for tid in tally_ids}
+        np.savez(tally_file, statepoints=np.array(statepoints), **arrays)
+
+    log_ingested(store, INGESTED_LOG, statepoints)
+    print(f"Ingested {len(entries)} statepoints into the feature store ({len(store)} rows total).")
+    return len(entries)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-ingest OpenMC statepoints into the ML feature store.")
+    parser.add_argument('root', help="Directory tree containing statepoint.*.h5 files")
+    parser.add_argument('--params', default=None, help="JSON of default run parameters (e.g. burnup_target_gwd_t)")
+    parser.add_argument('--tallies', type=int, nargs='*', default=[], help="Tally IDs whose means should be saved")
+    parser.add_argument('--workers', type=int, default=None, help="Reader threads (default: cores)")
+    args = parser.parse_args()
+
+    default_params = {}
+    if args.params:
+        with open(args.params, 'r') as f:
+            default_params = json.load(f)
+    ingest_statepoints(args.root, default_params, args.tallies, max_workers=args.workers)
\ No newline at end of file
@@ -0,0 +1,215 @@
+import json
+import math
+import time
+import asyncio
+import argparse
+from collections import deque
+import numpy as np
+import torch
+import torch.nn as nn
+from Feature_Store import INPUT_FEATURES
+from Surrogates import load_surrogate, predict
+
+# Local micro-batching inference service for the k-eff/EFPD surrogates.
+# The model is loaded once; concurrent single-point requests are queued and coalesced into one forward pass
+# per micro-batch (up to max_batch points, or whatever arrived within max_delay_ms of the first one).
+# HTTP/1.1 with keep-alive, over TCP or a Unix socket:
+#   POST /predict  {"inputs": [8 floats] or [[8 floats], ...], "sequence": optional k-eff history [steps] for the hybrid model}
+#   GET  /metrics  p50/p99 latency, throughput and mean batch size
+
+class BatcherStopped(RuntimeError):
+    pass
+
+class MicroBatcher:
+    def __init__(self, model, kind, max_batch=256, max_delay_ms=2.0, window=10000):
+        self.model = model
+        self.kind = kind
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.queue = asyncio.Queue()
+        self.latencies = deque(maxlen=window)  # Seconds, most recent requests
+        self.batch_sizes = deque(maxlen=window)
+        self.completed = 0
+        self.started = time.perf_counter()
+        self.in_flight = []  # The batch run() is working on
+        self.error = None  # Set once run() has stopped; later requests fail fast
+
+    async def submit(self, inputs, sequence=None):
+        if self.error is not None:
+            raise self.error
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((inputs, sequence, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_batch:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _forward(self, batch):
+        inputs = torch.tensor([item[0] for item in batch], dtype=torch.float32)
+        sequences = None
+        if self.kind == 'hybrid' and any(item[1] for item in batch):
+            # Histories of any length share one packed batch; requests without one get the single zero step
+            sequences = nn.utils.rnn.pack_sequence([torch.tensor(item[1] or [0.0], dtype=torch.float32).unsqueeze(1)
+                                                    for item in batch], enforce_sorted=False)
+        return predict(self.model, self.kind, inputs, sequences).tolist()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self.in_flight = await self._collect()
+            try:
+                # Off the event loop, so new requests keep queueing while the model runs
+                outputs = await loop.run_in_executor(None, self._forward, batch)
+            except Exception:
+                # Retry one by one so only the items that fail on their own get the error
+                outputs = []
+                for item in batch:
+                    try:
+                        outputs += await loop.run_in_executor(None, self._forward, [item])
+                    except Exception as e:
+                        item[2].set_exception(e)
+                        outputs.append(None)
+            now = time.perf_counter()
+            for item, output in zip(batch, outputs):
+                if output is None:
+                    continue
+                item[2].set_result({'k_eff': output[0], 'efpd': output[1]})
+                self.latencies.append(now - item[3])
+            self.batch_sizes.append(len(batch))
+            self.completed += len(batch)
+            self.in_flight = []
+
+    def stopped(self, task):
+        """
+        Done-callback of the run() task: log why it stopped and fail every queued and in-flight request,
+        so no /predict call waits forever on a batcher that is gone.
+        """
+        if task.cancelled():
+            self.error = BatcherStopped("Server shutting down")
+        else:
+            self.error = BatcherStopped(f"Batcher stopped: {task.exception()!r}")
+            print(f"Micro-batcher failed: {task.exception()!r}")
+        pending = list(self.in_flight)
+        while not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        for item in pending:
+            if not item[2].done():
+                item[2].set_exception(self.error)
+
+    def metrics(self):
+        latencies_ms = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            'requests': self.completed,
+            'throughput_per_sec': self.completed / (time.perf_counter() - self.started),
+            'latency_p50_ms': float(np.percentile(latencies_ms, 50)),
+            'latency_p99_ms': float(np.percentile(latencies_ms, 99)),
+            'mean_batch_size': float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+        }
+
+def _finite_floats(values):
+    return isinstance(values, list) and all(isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v)
+                                            for v in values)
+
+def parse_predict_request(request):
+    """
+    Input rows and optional sequence of a /predict body, checked before anything is queued: every row must be
+    exactly len(INPUT_FEATURES) finite numbers and the sequence a list of finite numbers. Raises ValueError.
+    """
+    inputs = request['inputs']
+    rows = inputs if inputs and isinstance(inputs[0], list) else [inputs]
+    for row in rows:
+        if not _finite_floats(row) or len(row) != len(INPUT_FEATURES):
+            raise ValueError(f"each input must be {len(INPUT_FEATURES)} finite numbers, got {row!r}")
+    sequence = request.get('sequence')
+    if sequence is not None and not _finite_floats(sequence):
+        raise ValueError(f"sequence must be a list of finite numbers, got {sequence!r}")
+    return rows, sequence, rows is inputs
+
+async def _respond(writer, status, payload):
+    body = json.dumps(payload).encode()
+    writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+
+async def handle_connection(batcher, reader, writer):
+    """
+    Serve HTTP requests on one keep-alive connection until the client closes it.
+    """
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, _ = request_line.decode().split(' ', 2)
+            headers = {}
+            while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                name, _, value = line.decode().partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+            if method == 'GET' and path == '/metrics':
+                await _respond(writer, '200 OK', batcher.metrics())
+            elif method == 'POST' and path == '/predict':
+                try:
+                    rows, sequence, many = parse_predict_request(json.loads(body))
+                    results = await asyncio.gather(*[batcher.submit(x, sequence) for x in rows])
+                    await _respond(writer, '200 OK', results if many else results[0])
+                except BatcherStopped as e:
+                    await _respond(writer, '503 Service Unavailable', {'error': str(e)})
+                except (KeyError, ValueError, TypeError, RuntimeError) as e:
+                    await _respond(writer, '400 Bad Request', {'error': f"Bad request: {e!r}"})
+            else:
+                await _respond(writer, '404 Not Found', {'error': f"No route for {method} {path}"})
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(kind, weights=None, host='127.0.0.1', port=8765, unix_socket=None, max_batch=256, max_delay_ms=2.0):
+    model = load_surrogate(kind, weights)
+    batcher = MicroBatcher(model, kind, max_batch, max_delay_ms)
+    batcher_task = asyncio.create_task(batcher.run())  # Referenced here: the loop only holds tasks weakly
+    batcher_task.add_done_callback(batcher.stopped)
+
+    def handler(reader, writer):
+        return handle_connection(batcher, reader, writer)
+
+    if unix_socket:
+        server = await asyncio.start_unix_server(handler, path=unix_socket)
+        print(f"Serving {kind} surrogate on unix:{unix_socket}")
+    else:
+        server = await asyncio.start_server(handler, host, port)
+        print(f"Serving {kind} surrogate on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher_task.cancel()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-batching k-eff/EFPD surrogate inference server.")
+    parser.add_argument('--model', choices=['deep', 'hybrid', 'pinn'], default='deep', help="Surrogate to serve")
+    parser.add_argument('--weights', default=None, help="State dict path (default: the trainer's output)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', default=None, help="Serve on this Unix socket instead of TCP")
+    parser.add_argument('--max-batch', type=int, default=256, help="Largest micro-batch")
+    parser.add_argument('--max-delay-ms', type=float, default=2.0, help="Longest wait for a batch to fill")
+    parser.add_argument('--threads', type=int, default=None, help="Intra-op threads for the forward pass")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    asyncio.run(serve(args.model, args.weights, args.host, args.port, args.unix, args.max_batch, args.max_delay_ms))
\ No newline at end of file
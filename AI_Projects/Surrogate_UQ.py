@@ -0,0 +1,187 @@
+import json
+import time
+import argparse
+import numpy as np
+import torch
+from Feature_Store import INPUT_FEATURES
+from Surrogates import load_surrogate, predict
+
+# Monte Carlo uncertainty propagation through a trained surrogate.
+# Input uncertainty is given per feature of the 8-feature input vector, e.g.
+#   {"enrichment_u235": ["normal", 0.045, 0.0005], "fuel_radius_cm": ["uniform", 0.405, 0.415],
+#    "temperature_k": ["normal", 900, 15], "power_mw": 3000}
+# (a bare number holds the feature fixed; features not listed are 0, as in the feature store).
+# Samples are drawn and evaluated in fixed-size chunks, one batched forward pass each, so memory stays flat
+# at any sample count. Sobol indices use the Jansen first-order and total estimators, accumulated chunk by chunk
+# on outputs shifted by the first chunk's mean, so an output offset (k-eff ~ 1) doesn't swamp the variance.
+
+OUTPUT_NAMES = ['k_eff', 'efpd']
+PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+
+def sample_inputs(distributions, n, generator=None):
+    """
+    n input vectors [n, 8] drawn from the per-feature distributions (normal, uniform, lognormal or a constant).
+    """
+    inputs = torch.zeros(n, len(INPUT_FEATURES))
+    for name, spec in distributions.items():
+        column = INPUT_FEATURES.index(name)
+        if isinstance(spec, (int, float)):
+            inputs[:, column] = spec
+            continue
+        kind, a, b = spec
+        if kind == 'normal':
+            inputs[:, column] = a + b * torch.randn(n, generator=generator)
+        elif kind == 'uniform':
+            inputs[:, column] = a + (b - a) * torch.rand(n, generator=generator)
+        elif kind == 'lognormal':
+            inputs[:, column] = torch.exp(a + b * torch.randn(n, generator=generator))
+        else:
+            raise ValueError(f"Invalid distribution for {name}: {kind}")
+    return inputs
+
+def uncertain_features(distributions):
+    return [name for name, spec in distributions.items() if not isinstance(spec, (int, float))]
+
+def propagate(model, kind, distributions, num_samples=1000000, chunk_size=65536, seed=0):
+    """
+    Push num_samples input draws through the surrogate; returns the output samples [n, 2] and summary statistics
+    (mean, std and percentiles of k-eff and EFPD, and throughput).
+    """
+    generator = torch.Generator().manual_seed(seed)
+    outputs = torch.empty(num_samples, len(OUTPUT_NAMES))
+    start = time.perf_counter()
+    for begin in range(0, num_samples, chunk_size):
+        end = min(begin + chunk_size, num_samples)
+        outputs[begin:end] = predict(model, kind, sample_inputs(distributions, end - begin, generator))
+    elapsed = time.perf_counter() - start
+
+    values = outputs.numpy()
+    summary = {'num_samples': num_samples, 'samples_per_sec': num_samples / elapsed if elapsed > 0 else 0.0}
+    for i, name in enumerate(OUTPUT_NAMES):
+        summary[name] = {'mean': float(values[:, i].mean()), 'std': float(values[:, i].std()),
+                         'percentiles': dict(zip(PERCENTILES, np.percentile(values[:, i], PERCENTILES).tolist()))}
+    return outputs, summary
+
+def sobol_indices(model, kind, distributions, base_samples=100000, chunk_size=16384, seed=0):
+    """
+    First-order and total Sobol indices of k-eff and EFPD for every uncertain input.
+    Costs base_samples * (d + 2) surrogate evaluations for d uncertain inputs (A, B and the d mixed matrices).
+    """
+    features = uncertain_features(distributions)
+    columns = [INPUT_FEATURES.index(name) for name in features]
+    generator = torch.Generator().manual_seed(seed)
+    d = len(columns)
+    sums = {'f': torch.zeros(2, dtype=torch.float64), 'f2': torch.zeros(2, dtype=torch.float64),
+            'first': torch.zeros(d, 2, dtype=torch.float64), 'total': torch.zeros(d, 2, dtype=torch.float64)}
+    shift = None
+
+    start = time.perf_counter()
+    for begin in range(0, base_samples, chunk_size):
+        n = min(chunk_size, base_samples - begin)
+        a = sample_inputs(distributions, n, generator)
+        b = sample_inputs(distributions, n, generator)
+        mixed = a.repeat(d, 1).view(d, n, -1)
+        for i, column in enumerate(columns):
+            mixed[i, :, column] = b[:, column]  # A with column i taken from B
+        f = predict(model, kind, torch.cat([a, b, mixed.view(d * n, -1)])).double()
+        if shift is None:
+            shift = f[:2 * n].mean(0)
+        f = f - shift
+        f_a, f_b, f_mixed = f[:n], f[n:2 * n], f[2 * n:].view(d, n, -1)
+        both = f[:2 * n]
+        sums['f'] += both.sum(0)
+        sums['f2'] += (both ** 2).sum(0)
+        sums['first'] += ((f_b - f_mixed) ** 2).sum(1)  # Column i shared with B
+        sums['total'] += ((f_a - f_mixed) ** 2).sum(1)  # Every column but i shared with A
+    elapsed = time.perf_counter() - start
+
+    count = 2 * base_samples
+    variance = sums['f2'] / count - (sums['f'] / count) ** 2
+    first = 1 - sums['first'] / (2 * base_samples) / variance
+    total = sums['total'] / (2 * base_samples) / variance
+    indices = {name: {'first_order': dict(zip(OUTPUT_NAMES, first[i].tolist())),
+                      'total': dict(zip(OUTPUT_NAMES, total[i].tolist()))} for i, name in enumerate(features)}
+    evaluations = base_samples * (d + 2)
+    return indices, {'evaluations': evaluations, 'samples_per_sec': evaluations / elapsed if elapsed > 0 else 0.0}
+
+class AnalyticOutputs(torch.nn.Module):
+    """
+    Stand-in surrogate with known Sobol indices on three U(-pi, pi) inputs, both outputs offset by a constant:
+    k-eff = offset + 0.01 * (x0 + 2 * x1) (additive: first-order = total = 0.2, 0.8, 0)
+    EFPD = offset + Ishigami(x0, x1, x2) with a = 7, b = 0.1.
+    """
+    def __init__(self, offset=1000.0):
+        super().__init__()
+        self.offset = offset
+
+    def forward(self, inputs):
+        x0, x1, x2 = inputs[:, 0].double(), inputs[:, 1].double(), inputs[:, 2].double()
+        k_eff = self.offset + 0.01 * (x0 + 2 * x1)
+        efpd = self.offset + torch.sin(x0) + 7 * torch.sin(x1) ** 2 + 0.1 * x2 ** 4 * torch.sin(x0)
+        return torch.stack([k_eff, efpd], 1)
+
+def check_sobol(base_samples=100000, offset=1000.0, tolerance=0.03, seed=0):
+    """
+    Compare sobol_indices on AnalyticOutputs against the analytic indices; returns the largest error.
+    """
+    features = INPUT_FEATURES[:3]
+    distributions = {name: ['uniform', -np.pi, np.pi] for name in features}
+    b = 0.1
+    variance = 7 ** 2 / 8 + b * np.pi ** 4 / 5 + b ** 2 * np.pi ** 8 / 18 + 0.5
+    v1 = 0.5 * (1 + b * np.pi ** 4 / 5) ** 2
+    v13 = 8 * b ** 2 * np.pi ** 8 / 225
+    expected = {
+        features[0]: {'first_order': {'k_eff': 0.2, 'efpd': v1 / variance}, 'total': {'k_eff': 0.2, 'efpd': (v1 + v13) / variance}},
+        features[1]: {'first_order': {'k_eff': 0.8, 'efpd': 6.125 / variance}, 'total': {'k_eff': 0.8, 'efpd': 6.125 / variance}},
+        features[2]: {'first_order': {'k_eff': 0.0, 'efpd': 0.0}, 'total': {'k_eff': 0.0, 'efpd': v13 / variance}},
+    }
+    indices, _ = sobol_indices(AnalyticOutputs(offset), 'deep', distributions, base_samples, seed=seed)
+    error = max(abs(indices[name][order][output] - value) for name in features
+                for order in expected[name] for output, value in expected[name][order].items())
+    print(f"Sobol check ({base_samples} base samples, output offset {offset}): largest index error {error:.4f}")
+    if error > tolerance:
+        raise AssertionError(f"Sobol indices off by {error:.4f} (> {tolerance}): {indices}")
+    return error
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo uncertainty propagation through a trained surrogate.")
+    parser.add_argument('spec', nargs='?', help="JSON of input distributions per feature")
+    parser.add_argument('--model', choices=['deep', 'hybrid', 'pinn'], default='deep', help="Surrogate to use")
+    parser.add_argument('--weights', default=None, help="State dict path (default: the trainer's output)")
+    parser.add_argument('--samples', type=int, default=1000000, help="Monte Carlo samples")
+    parser.add_argument('--sobol', type=int, default=0, help="Base samples for Sobol indices (0 = skip)")
+    parser.add_argument('--chunk', type=int, default=65536, help="Samples per forward pass")
+    parser.add_argument('--threads', type=int, default=None, help="Intra-op threads")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help="Write the summary (and Sobol indices) to this JSON file")
+    parser.add_argument('--check', action='store_true', help="Check the Sobol estimators on analytic functions and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        check_sobol(args.sobol or 100000, seed=args.seed)
+        check_sobol(args.sobol or 100000, offset=0.0, seed=args.seed)
+        raise SystemExit(0)
+    if args.spec is None:
+        parser.error("spec is required (unless --check)")
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    with open(args.spec, 'r') as f:
+        distributions = json.load(f)
+    model = load_surrogate(args.model, args.weights)
+
+    _, summary = propagate(model, args.model, distributions, args.samples, args.chunk, args.seed)
+    print(f"{args.samples} samples at {summary['samples_per_sec']:.0f} samples/sec")
+    for name in OUTPUT_NAMES:
+        p = summary[name]['percentiles']
+        print(f"{name}: mean {summary[name]['mean']:.5g}, std {summary[name]['std']:.3g}, "
+              f"5-50-95% {p[5]:.5g} / {p[50]:.5g} / {p[95]:.5g}")
+    if args.sobol:
+        summary['sobol'], sobol_stats = sobol_indices(model, args.model, distributions, args.sobol, args.chunk // 4, args.seed)
+        print(f"Sobol indices ({sobol_stats['evaluations']} evaluations at {sobol_stats['samples_per_sec']:.0f}/sec):")
+        for name, idx in summary['sobol'].items():
+            print(f"  {name}: first-order k-eff {idx['first_order']['k_eff']:.3f}, total k-eff {idx['total']['k_eff']:.3f}, "
+                  f"first-order EFPD {idx['first_order']['efpd']:.3f}, total EFPD {idx['total']['efpd']:.3f}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(summary, f, indent=4)
\ No newline at end of file
@@ -0,0 +1,38 @@
+import importlib
+import torch
+
+# Loading and batched evaluation of the trained surrogates (DeepMLP, HybridDeepModel, NuclearPINN).
+# Model classes are imported lazily, so using one surrogate doesn't pull in the other trainers' dependencies.
+
+SURROGATES = {
+    'deep': ('AI_Trainer', 'DeepMLP', "AI_Projects/model.pth"),
+    'hybrid': ('AML', 'HybridDeepModel', "AI_Projects/hybrid_model.pth"),
+    'pinn': ('PINN_ML', 'NuclearPINN', "AI_Projects/pinn_model.pth"),
+}
+SEQ_LEN = 1  # A new design has no burnup history yet: the hybrid model sees one zero step (validated on in AML.hybrid_losses)
+
+def surrogate_class(kind):
+    module_name, class_name, _ = SURROGATES[kind]
+    return getattr(importlib.import_module(module_name), class_name)
+
+def load_surrogate(kind, weights=None, **model_kwargs):
+    """
+    Build a surrogate and load its trained weights (default: the path its trainer saves to), in eval mode.
+    """
+    model = surrogate_class(kind)(**model_kwargs)
+    model.load_state_dict(torch.load(weights or SURROGATES[kind][2], map_location='cpu'))
+    model.eval()
+    return model
+
+def predict(model, kind, inputs, sequences=None):
+    """
+    Batched forward pass: inputs [n, 8] -> [n, 2] (k-eff, EFPD).
+    The hybrid model also takes sequences ([n, steps, 1] or a PackedSequence of k-eff histories);
+    a single zero step is used when none are given.
+    """
+    with torch.inference_mode():
+        if kind == 'hybrid':
+            if sequences is None:
+                sequences = torch.zeros(len(inputs), SEQ_LEN, 1)
+            return model(inputs, sequences)
+        return model(inputs)
\ No newline at end of file
@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import random
+import numpy as np
+import torch
+import torch.optim as optim
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel
+
+# Shared training engine for DeepMLP, HybridDeepModel and NuclearPINN.
+# The whole dataset stays resident as contiguous tensors; each epoch draws one random permutation and
+# slices minibatches out of it with index_select, so there is no DataLoader, collate or per-sample Python work.
+# Optional torch.compile, intra-op thread count and bf16 autocast on CPU; throughput is reported in samples/sec.
+# Validation early stopping, plateau/one-cycle LR schedules and exact checkpoint/resume are built in.
+# Under torchrun (gloo backend, one or several nodes) each rank trains on its own shard of the training split,
+# DistributedDataParallel all-reduces the gradients, and only rank 0 logs and writes checkpoints.
+# Incremental mode warm-starts a saved model on the rows added since it was trained (plus a replay sample of older
+# rows), using the data statistics saved next to the weights; large drift falls back to a full retrain.
+
+def configure_threads(num_threads=None):
+    """
+    Set intra-op threads (default: all cores) and keep inter-op parallelism to one pool.
+    """
+    torch.set_num_threads(num_threads or os.cpu_count())
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # Can only be set before the first parallel op
+    return torch.get_num_threads()
+
+def init_distributed(backend='gloo'):
+    """
+    Join the process group when launched by torchrun (WORLD_SIZE set); returns (rank, world_size), (0, 1) otherwise.
+    Intra-op threads are split evenly between the ranks sharing a node.
+    """
+    if 'WORLD_SIZE' not in os.environ:
+        return 0, 1
+    if not dist.is_initialized():
+        dist.init_process_group(backend)
+        local_ranks = int(os.environ.get('LOCAL_WORLD_SIZE', dist.get_world_size()))
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // local_ranks))
+    return dist.get_rank(), dist.get_world_size()
+
+def distributed_context():
+    if dist.is_available() and dist.is_initialized():
+        return dist.get_rank(), dist.get_world_size()
+    return 0, 1
+
+def shard(tensors, rank, world_size, seed=0):
+    """
+    This rank's equal-sized share of the rows (the same shuffled split on every rank, remainder dropped),
+    so every rank runs the same number of steps per epoch.
+    """
+    if world_size == 1:
+        return tensors
+    per_rank = len(tensors[0]) // world_size
+    order = torch.randperm(len(tensors[0]), generator=torch.Generator().manual_seed(seed))
+    idx = order[rank * per_rank:(rank + 1) * per_rank]
+    return [t.index_select(0, idx) for t in tensors]
+
+def auto_batch_size(num_samples, min_batch=32, max_batch=4096, min_steps=8):
+    """
+    Largest power of two that still gives about min_steps optimizer steps per epoch, within [min_batch, max_batch].
+    """
+    batch = min_batch
+    while batch * 2 <= max_batch and batch * 2 * min_steps <= num_samples:
+        batch *= 2
+    return min(batch, max(num_samples, 1))
+
+class TensorBatches:
+    """
+    Re-iterable minibatches over resident tensors (a drop-in for a shuffled DataLoader).
+    """
+    def __init__(self, tensors, batch_size=None, shuffle=True):
+        self.tensors = [t.contiguous() for t in tensors]
+        self.num_samples = len(self.tensors[0])
+        self.batch_size = batch_size or auto_batch_size(self.num_samples)
+        self.shuffle = shuffle
+
+    def __len__(self):
+        return (self.num_samples + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        order = torch.randperm(self.num_samples) if self.shuffle else torch.arange(self.num_samples)
+        for start in range(0, self.num_samples, self.batch_size):
+            idx = order[start:start + self.batch_size]
+            yield [t.index_select(0, idx) for t in self.tensors]
+
+def rng_state():
+    return {'torch': torch.get_rng_state(), 'numpy': np.random.get_state(), 'python': random.getstate()}
+
+def set_rng_state(state):
+    torch.set_rng_state(state['torch'])
+    np.random.set_state(state['numpy'])
+    random.setstate(state['python'])
+
+def save_checkpoint(path, state):
+    """
+    Write a checkpoint atomically, so a crash mid-save never leaves a truncated file behind.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    torch.save(state, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    return torch.load(path, weights_only=False)  # Holds optimizer and NumPy/Python RNG state, not just tensors
+
+def split_validation(tensors, val_fraction, seed=0):
+    """
+    Fixed random train/validation split (same seed -> same split, so resumed runs validate on the same rows).
+    """
+    num_samples = len(tensors[0])
+    num_val = int(num_samples * val_fraction)
+    if num_val == 0 or num_val == num_samples:
+        return tensors, None
+    order = torch.randperm(num_samples, generator=torch.Generator().manual_seed(seed))
+    val_idx, train_idx = order[:num_val], order[num_val:]
+    return [t.index_select(0, train_idx) for t in tensors], [t.index_select(0, val_idx) for t in tensors]
+
+def evaluate(model, loss_fn, tensors, batch_size=8192):
+    model.eval()
+    total = 0.0
+    with torch.no_grad():
+        for batch in TensorBatches(tensors, batch_size, shuffle=False):
+            total += loss_fn(model, batch).item() * len(batch[0])
+    model.train()
+    return total / len(tensors[0])
+
+def train_model(model, tensors, loss_fn, epochs, lr=0.001, batch_size=None, compile_model=False,
+                bf16=False, num_threads=None, log_every=10, name="Model", val_fraction=0.0, val_loss_fn=None,
+                patience=None, scheduler=None, checkpoint_path=None, checkpoint_every=10):
+    """
+    Train model on resident tensors; loss_fn(model, batch) returns the loss for one batch (a list of tensors).
+    With val_fraction > 0 a held-out split is scored each epoch (val_loss_fn, default loss_fn, without grad);
+    patience stops after that many epochs without improvement and restores the best weights.
+    scheduler: None, 'plateau' (halve LR when the monitored loss stalls) or 'onecycle' (per-step one-cycle LR).
+    checkpoint_path: model, optimizer, scheduler and RNG state are saved every checkpoint_every epochs and
+    an interrupted run resumes from there, reproducing the uninterrupted run. A run that finished its epochs
+    (without early stopping) continues from its last epoch when called again with more epochs.
+    In a process group (see init_distributed) the training split is sharded across ranks; every rank must call this
+    with the same tensors, and checkpoint_path must be on storage all ranks can read.
+    Returns the trained model and a stats dict with samples/sec (summed over ranks).
+    """
+    if num_threads is not None:
+        configure_threads(num_threads)
+    rank, world_size = distributed_context()
+    is_main = rank == 0
+    train_tensors, val_tensors = split_validation(tensors, val_fraction)
+    train_tensors = shard(train_tensors, rank, world_size)
+    val_loss_fn = val_loss_fn or loss_fn
+    batches = TensorBatches(train_tensors, batch_size)
+    step_model = DistributedDataParallel(model) if world_size > 1 else model
+    step_model = torch.compile(step_model) if compile_model else step_model
+    optimizer = optim.Adam(model.parameters(), lr=lr)
+    if scheduler == 'onecycle':
+        lr_scheduler = optim.lr_scheduler.OneCycleLR(optimizer, max_lr=lr * 10, total_steps=epochs * len(batches))
+    elif scheduler == 'plateau':
+        lr_scheduler = optim.lr_scheduler.ReduceLROnPlateau(optimizer, factor=0.5, patience=max((patience or 10) // 3, 2))
+    else:
+        lr_scheduler = None
+
+    start_epoch = 0
+    best_loss = float('inf')
+    best_state = None
+    bad_epochs = 0
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint is not None and checkpoint.get('finished') and (checkpoint.get('early_stopped') or checkpoint['epoch'] + 1 >= epochs):
+        checkpoint = None  # Last run completed; this call trains fresh
+    if checkpoint is not None:
+        model.load_state_dict(checkpoint['model'])
+        optimizer.load_state_dict(checkpoint['optimizer'])
+        set_rng_state(checkpoint['rng'])
+        start_epoch = checkpoint['epoch'] + 1
+        if scheduler == 'onecycle' and epochs > start_epoch and \
+                (checkpoint['finished'] or checkpoint['scheduler']['total_steps'] != lr_scheduler.total_steps):
+            # Extended run: the saved cycle has no steps left for the new epochs, so start a new one over them
+            lr_scheduler = optim.lr_scheduler.OneCycleLR(optimizer, max_lr=lr * 10,
+                                                         total_steps=(epochs - start_epoch) * len(batches))
+        elif lr_scheduler is not None and checkpoint['scheduler'] is not None:
+            lr_scheduler.load_state_dict(checkpoint['scheduler'])
+        best_loss, best_state, bad_epochs = checkpoint['best_loss'], checkpoint['best_state'], checkpoint['bad_epochs']
+        if is_main:
+            print(f"{name}: resuming from epoch {start_epoch} ({checkpoint_path})")
+
+    model.train()
+    samples = 0
+    epoch = start_epoch - 1
+    start = time.perf_counter()
+    for epoch in range(start_epoch, epochs):
+        loss_sum = torch.zeros(())
+        num_batches = 0
+        for batch in batches:
+            optimizer.zero_grad(set_to_none=True)
+            with torch.autocast('cpu', dtype=torch.bfloat16, enabled=bf16):
+                loss = loss_fn(step_model, batch)
+            loss.backward()
+            optimizer.step()
+            if scheduler == 'onecycle':
+                lr_scheduler.step()
+            samples += len(batch[0])
+            loss_sum += loss.detach().float()
+            num_batches += 1
+        train_loss = loss_sum / max(num_batches, 1)  # Epoch mean, not the last minibatch
+        epoch_loss = train_loss.item()
+
+        # Every rank holds the same weights, so the validation loss agrees; the training loss has to be averaged
+        if val_tensors is not None:
+            monitored = evaluate(model, val_loss_fn, val_tensors)
+        elif world_size > 1:
+            dist.all_reduce(train_loss)
+            monitored = train_loss.item() / world_size
+        else:
+            monitored = epoch_loss
+        if scheduler == 'plateau':
+            lr_scheduler.step(monitored)
+        if monitored < best_loss:
+            best_loss, bad_epochs = monitored, 0
+            best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+        else:
+            bad_epochs += 1
+        if is_main and epoch % log_every == 0:
+            val_msg = f", Val Loss: {monitored}" if val_tensors is not None else ""
+            print(f"{name} Epoch {epoch}, Loss: {epoch_loss}{val_msg}")
+
+        stop = patience is not None and bad_epochs >= patience
+        if is_main and checkpoint_path and ((epoch + 1) % checkpoint_every == 0 or stop or epoch == epochs - 1):
+            save_checkpoint(checkpoint_path, {
+                'model': model.state_dict(), 'optimizer': optimizer.state_dict(),
+                'scheduler': lr_scheduler.state_dict() if lr_scheduler is not None else None,
+                'epoch': epoch, 'best_loss': best_loss, 'best_state': best_state, 'bad_epochs': bad_epochs,
+                'rng': rng_state(), 'finished': stop or epoch == epochs - 1, 'early_stopped': stop,
+            })
+        if stop:
+            if is_main:
+                print(f"{name}: early stop at epoch {epoch}, best loss {best_loss}")
+            break
+    if world_size > 1:
+        dist.barrier()  # Nobody moves on (e.g. to resume) before rank 0's last checkpoint is written
+    elapsed = time.perf_counter() - start
+
+    if patience is not None and best_state is not None:
+        model.load_state_dict(best_state)
+    stats = {'samples_per_sec': samples * world_size / elapsed if elapsed > 0 else 0.0, 'batch_size': batches.batch_size,
+             'threads': torch.get_num_threads(), 'seconds': elapsed, 'epochs': epoch + 1, 'best_loss': best_loss,
+             'world_size': world_size}
+    if is_main:
+        ranks_msg = f", {world_size} ranks" if world_size > 1 else ""
+        print(f"{name}: {stats['samples_per_sec']:.0f} samples/sec (batch {stats['batch_size']}, "
+              f"{stats['threads']} threads{ranks_msg})")
+    return model, stats
+
+def stats_path(weights_path):
+    return os.path.splitext(weights_path)[0] + '_stats.json'
+
+def save_data_stats(weights_path, tensors):
+    """
+    Row count and per-column mean/std of the inputs and targets a model was trained on, next to its weights.
+    """
+    if distributed_context()[0] != 0:
+        return
+    stats = {'num_rows': len(tensors[0])}
+    for name, t in zip(['inputs', 'targets'], tensors[:2]):
+        stats[name] = {'mean': t.double().mean(0).tolist(), 'std': t.double().std(0, unbiased=False).tolist()}
+    with open(stats_path(weights_path), 'w') as f:
+        json.dump(stats, f, indent=4)
+
+def load_data_stats(weights_path):
+    if not os.path.exists(weights_path) or not os.path.exists(stats_path(weights_path)):
+        return None
+    with open(stats_path(weights_path), 'r') as f:
+        return json.load(f)
+
+def drift_score(stats, new_tensors):
+    """
+    Largest shift of the new rows' input/target means from the trained-on means, in trained-on standard deviations.
+    A feature that was constant and now varies counts as infinite drift.
+    """
+    score = 0.0
+    for name, t in zip(['inputs', 'targets'], new_tensors[:2]):
+        mean = torch.tensor(stats[name]['mean'])
+        std = torch.tensor(stats[name]['std'])
+        shift = (t.double().mean(0) - mean).abs()
+        z = torch.where(std > 0, shift / std.clamp_min(1e-12), torch.where(shift > 1e-9, float('inf'), 0.0))
+        score = max(score, z.max().item())
+    return score
+
+def incremental_update(model, tensors, loss_fn, weights_path, epochs=20, lr=1e-4, replay_ratio=1.0,
+                       drift_threshold=1.0, name="Model", **train_options):
+    """
+    Warm-start model from weights_path and fine-tune it on the rows appended since it was trained, mixed with
+    a random replay sample of replay_ratio times as many older rows (so it doesn't forget them).
+    Returns the updated model (weights and data stats saved), or None when a full retrain is needed:
+    no saved model/stats yet, or the new rows drifted more than drift_threshold (see drift_score).
+    Relies on the rows of tensors keeping their order as the store grows (the feature store is append-only).
+    """
+    stats = load_data_stats(weights_path)
+    if stats is None:
+        print(f"{name}: no saved model and data statistics, full training.")
+        return None
+    num_old = stats['num_rows']
+    if len(tensors[0]) < num_old:
+        print(f"{name}: dataset shrank since the last training, full training.")
+        return None
+    num_new = len(tensors[0]) - num_old
+    drift = drift_score(stats, [t[num_old:] for t in tensors]) if num_new > 0 else 0.0
+    if drift > drift_threshold:
+        print(f"{name}: drift {drift:.2f} exceeds {drift_threshold}, full retraining.")
+        return None  # model is untouched, so the full retrain starts fresh
+    model.load_state_dict(torch.load(weights_path, map_location='cpu'))
+    if num_new == 0:
+        print(f"{name}: no new rows since the last training.")
+        return model
+
+    replay = torch.randperm(num_old)[:int(replay_ratio * num_new)]
+    idx = torch.cat([torch.arange(num_old, len(tensors[0])), replay])
+    print(f"{name}: fine-tuning on {num_new} new rows + {len(replay)} replayed (drift {drift:.2f})")
+    options = {'val_fraction': 0.1, 'patience': 5, **train_options}
+    model, _ = train_model(model, [t.index_select(0, idx) for t in tensors], loss_fn, epochs, lr=lr,
+                           log_every=max(epochs // 4, 1), name=f"{name} (incremental)", **options)
+    if distributed_context()[0] == 0:
+        torch.save(model.state_dict(), weights_path)
+    save_data_stats(weights_path, tensors)
+    return model
\ No newline at end of file
@@ -1,8 +1,13 @@
-import openmc
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scripts'))
+from cache_OpenMC import OpenMCResultCache
 
 # Assume materials.xml, geometry.xml, and settings.xml are in the current working directory
 # No need to load or parse them manually; OpenMC reads them automatically when run() is called
+# An identical model (same XML, cross sections and OpenMC version) reuses the cached result instead of rerunning
 
-openmc.run()
+result = OpenMCResultCache().run()
 
+print(f"k-eff: {result['k_eff']:.5f} +/- {result['k_eff_uncertainty']:.5f}" + (" (cached)" if result['cached'] else ""))
 print("OpenMC simulation completed using materials.xml, geometry.xml, and settings.xml.")
\ No newline at end of file
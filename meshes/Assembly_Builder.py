@@ -0,0 +1,254 @@
+import gmsh
+import numpy as np
+
+# gmsh helpers shared by the complex mesh generators (OpenMC_Complex.py, Cardinal_Complex.py).
+# In 'fragment' mode an assembly is built from one template per pin type at the origin, replicated with
+# occ.copy + occ.translate, and every volume is resolved by a single occ.fragment: interfaces come out conformal
+# and each region (fuel, clad, moderator, ...) keeps its own volumes for physical groups.
+# The original 'cut' path (one boolean per pin, then one giant cut of the moderator) stays available for timing.
+# Symmetric assemblies can be built as a 1/4, 1/8 or 1/12 sector: only the pins reaching into the wedge are
+# replicated, the wedge clips them in the same fragment, and the cut faces are found by boundary_surfaces.
+# Element sizes are set per region by region_size_fields (fine fuel, coarse moderator and reflector, graded
+# away from interfaces) from the MESH_SIZES table of each generator.
+
+def pins_overlap(cylinders, pitch):
+    """
+    True if pins built from these template cylinders reach into their neighbours at this pitch.
+    """
+    return 2 * max(np.hypot(dx, dy) + r for dx, dy, r in cylinders.values()) > pitch
+
+def claim(pieces):
+    """
+    Per input entity, the fragment pieces not already owned by an earlier one (inputs listed innermost first).
+    """
+    taken = set()
+    owned = []
+    for dim_tags in pieces:
+        owned.append([dt for dt in dim_tags if dt not in taken])
+        taken.update(dim_tags)
+    return owned
+
+def pin_template(cylinders, height, z0=0.0):
+    """
+    One pin at the origin from {region: (dx, dy, radius)} cylinders, innermost first; overlaps go to the earlier
+    region (e.g. the clad keeps the part of a wire wrap inside it). Returns {region: [(3, tag), ...]}.
+    With height None the pin is its 2D cross-section at z0 (disks, [(2, tag), ...]) for extrusion.
+    """
+    names = list(cylinders)
+    if height is None:
+        tags = [(2, gmsh.model.occ.addDisk(dx, dy, z0, r, r)) for dx, dy, r in cylinders.values()]
+    else:
+        tags = [(3, gmsh.model.occ.addCylinder(dx, dy, z0, 0, 0, height, r)) for dx, dy, r in cylinders.values()]
+    pieces = [[t] for t in tags]
+    if len(tags) > 1:
+        _, pieces = gmsh.model.occ.fragment(tags[:1], tags[1:])
+    return dict(zip(names, claim(pieces)))
+
+def replicate(template, positions):
+    """
+    Instances of a template at every (x, y): occ.copy of the template, then occ.translate
+    (the template itself becomes the last instance). Returns {region: [(3, tag), ...]} over all instances.
+    """
+    names = list(template)
+    flat = [dt for name in names for dt in template[name]]
+    regions = {name: [] for name in names}
+    if not positions:
+        gmsh.model.occ.remove(flat, recursive=True)
+        return regions
+    for i, (x, y) in enumerate(positions):
+        instance = flat if i == len(positions) - 1 else gmsh.model.occ.copy(flat)
+        gmsh.model.occ.translate(instance, x, y, 0)
+        start = 0
+        for name in names:
+            regions[name] += instance[start:start + len(template[name])]
+            start += len(template[name])
+    return regions
+
+def fragment_regions(regions, clip=None):
+    """
+    Resolve all regions ([(name, [(dim, tag), ...])], innermost first, enclosing entities last) with one occ.fragment.
+    Returns {name: [tags]}; a region keeps only the pieces no earlier region owns.
+    With clip (e.g. a sector_tool), the clip entities join the same fragment and only the pieces inside them are kept.
+    """
+    inputs = [(name, dt) for name, dim_tags in regions for dt in dim_tags]
+    _, pieces = gmsh.model.occ.fragment([inputs[0][1]], [dt for _, dt in inputs[1:]] + (clip or []))
+    inside = {dt for p in pieces[len(inputs):] for dt in p} if clip else None
+    resolved = {name: [] for name, _ in regions}
+    kept = set()
+    for (name, _), owned in zip(inputs, claim(pieces[:len(inputs)])):
+        owned = [dt for dt in owned if inside is None or dt in inside]
+        resolved[name] += [tag for _, tag in owned]
+        kept.update(owned)
+    if clip:
+        gmsh.model.occ.remove([dt for dt in {dt for p in pieces for dt in p} if dt not in kept], recursive=True)
+    return resolved
+
+def layout_extent(layout):
+    """
+    Radius of the circle around the axis that contains the whole assembly.
+    """
+    if layout['kind'] == 'pins':
+        return layout['half_size'] * np.sqrt(2) + layout['pitch']  # Edge pins reach past the box
+    if layout['kind'] == 'hex_pins':
+        return layout['outer_r'] + layout['pitch']
+    return layout['core_r'] + layout['refl_thick']
+
+def check_sector(layout, sectors):
+    """
+    Raise ValueError unless the pin, guide and channel positions are mirror-symmetric about both planes of the
+    sector (theta = 0 and theta = 2*pi/sectors), i.e. the 1/sectors model reflects back to the full assembly.
+    """
+    if sectors == 1:
+        return
+    if layout['kind'] == 'pins' and sectors not in [4, 8]:
+        raise ValueError(f"A square assembly has 1/4 and 1/8 symmetry, not 1/{sectors}")
+    phi = 2 * np.pi / sectors
+    mirrors = [np.array([[1, 0], [0, -1]]), np.array([[np.cos(2 * phi), np.sin(2 * phi)], [np.sin(2 * phi), -np.cos(2 * phi)]])]
+    for key in ['pin_positions', 'guide_positions', 'channel_positions']:
+        points = np.array(layout.get(key, []), dtype=float).reshape(-1, 2)
+        expected = {(round(x, 4) + 0.0, round(y, 4) + 0.0) for x, y in points}
+        for mirror in mirrors:
+            if {(round(x, 4) + 0.0, round(y, 4) + 0.0) for x, y in points @ mirror.T} != expected:
+                raise ValueError(f"The {key.split('_')[0]} layout is not symmetric under a 1/{sectors} sector")
+    if 'wire_r' in layout:
+        print(f"The wire wraps sit on the +x side of every pin, which the 1/{sectors} sector planes do not mirror; "
+              f"the sector model treats them as symmetric.")
+
+def in_sector(x, y, reach, sectors):
+    """
+    True if the point (x, y) lies within reach of the sector 0 <= theta <= 2*pi/sectors.
+    """
+    phi = 2 * np.pi / sectors
+    if sectors == 1 or np.arctan2(y, x) % (2 * np.pi) <= phi:
+        return True
+    for a in [0, phi]:
+        along = x * np.cos(a) + y * np.sin(a)
+        if (np.hypot(x, y) if along < 0 else abs(x * np.sin(a) - y * np.cos(a))) < reach:
+            return True
+    return False
+
+def sector_layout(layout, sectors):
+    """
+    Copy of a layout keeping only the pins, guides and channels that reach into the 1/sectors wedge
+    (after check_sector).
+    """
+    check_sector(layout, sectors)
+    reach = layout['pitch'] if 'pitch' in layout else layout['channel_r']
+    reduced = dict(layout)
+    for key in ['pin_positions', 'guide_positions', 'channel_positions']:
+        if key in layout:
+            reduced[key] = [(x, y) for x, y in layout[key] if in_sector(x, y, reach, sectors)]
+    return reduced
+
+def sector_tool(sectors, extent, height=None):
+    """
+    Wedge 0 <= theta <= 2*pi/sectors around the z axis reaching past extent: a surface at z = 0, or a volume
+    extruded to height. Used as the fragment_regions clip.
+    """
+    occ = gmsh.model.occ
+    phi = 2 * np.pi / sectors
+    far = 4 * extent  # The triangle's far edge stays outside the assembly for sectors >= 4
+    points = [occ.addPoint(0, 0, 0), occ.addPoint(far, 0, 0), occ.addPoint(far * np.cos(phi), far * np.sin(phi), 0)]
+    lines = [occ.addLine(points[i], points[(i + 1) % 3]) for i in range(3)]
+    wedge = [(2, occ.addPlaneSurface([occ.addCurveLoop(lines)]))]
+    if height is None:
+        return wedge
+    return [dt for dt in occ.extrude(wedge, 0, 0, height) if dt[0] == 3]
+
+def boundary_surfaces(sectors, height, tol=1e-6):
+    """
+    Outer surfaces of the (synchronized) model lying on z = 0 ('bottom'), z = height ('top') and, for a sector,
+    on its two cut planes ('symmetry_0deg' and e.g. 'symmetry_45deg'). Returns {name: [surface tags]}.
+    """
+    phi = 2 * np.pi / sectors
+    planes = {'bottom': ((0, 0, 1), 0.0), 'top': ((0, 0, 1), height)}
+    if sectors > 1:
+        planes['symmetry_0deg'] = ((0, 1, 0), 0.0)
+        planes[f'symmetry_{round(np.degrees(phi))}deg'] = ((-np.sin(phi), np.cos(phi), 0), 0.0)
+    found = {name: [] for name in planes}
+    for _, tag in gmsh.model.getBoundary(gmsh.model.getEntities(3), combined=True, oriented=False):
+        low, high = gmsh.model.getParametrizationBounds(2, abs(tag))
+        normal = gmsh.model.getNormal(abs(tag), [(a + b) / 2 for a, b in zip(low, high)])
+        center = gmsh.model.occ.getCenterOfMass(2, abs(tag))
+        for name, (n, offset) in planes.items():
+            if abs(abs(np.dot(normal, n)) - 1) < tol and abs(np.dot(center, n) - offset) < tol * max(1.0, height):
+                found[name].append(abs(tag))
+                break
+    return found
+
+def add_physical_groups(resolved, prefix='', dim=3):
+    """
+    One named physical group per region (e.g. prefix 'mat:' for DAGMC material assignment, or dim 2 for sidesets).
+    """
+    for name, tags in resolved.items():
+        if tags:
+            gmsh.model.addPhysicalGroup(dim, sorted(set(tags)), name=f"{prefix}{name}")
+
+def region_size(name, sizes):
+    """
+    Mesh size of a region: its own entry, or the entry of its prefix ('salt' covers 'salt_zone_0', ...).
+    """
+    return next((size for key, size in sizes.items() if name == key or name.startswith(key + '_')), None)
+
+def region_size_fields(regions, sizes, grading=None):
+    """
+    Background mesh size from per-region sizes {region: cm}: one Constant field per region (boundary included,
+    so interfaces take the finer side) and, with grading (region, distance), a Threshold growing from that
+    region's size at its interfaces to the coarsest size over distance. Point, curvature and boundary sizes
+    are switched off so the fields alone set the size (the global CharacteristicLengthMin still clamps it).
+    """
+    field = gmsh.model.mesh.field
+    fields = []
+    for name, tags in regions.items():
+        size = region_size(name, sizes)
+        if size is None or not tags:
+            continue
+        f = field.add("Constant")
+        field.setNumbers(f, "VolumesList", sorted(set(tags)))
+        field.setNumber(f, "VIn", size)
+        field.setNumber(f, "IncludeBoundary", 1)
+        fields.append(f)
+    if grading:
+        source, distance = grading
+        volumes = [(3, tag) for name, tags in regions.items() if region_size(name, {source: 0}) is not None for tag in tags]
+        surfaces = sorted({abs(tag) for _, tag in gmsh.model.getBoundary(volumes, combined=False, oriented=False)})
+        d = field.add("Distance")
+        field.setNumbers(d, "SurfacesList", surfaces)
+        t = field.add("Threshold")
+        field.setNumber(t, "InField", d)
+        field.setNumber(t, "SizeMin", sizes[source])
+        field.setNumber(t, "SizeMax", max(sizes.values()))
+        field.setNumber(t, "DistMin", 0)
+        field.setNumber(t, "DistMax", distance)
+        fields.append(t)
+    smallest = field.add("Min")
+    field.setNumbers(smallest, "FieldsList", fields)
+    field.setAsBackgroundMesh(smallest)
+    gmsh.option.setNumber("Mesh.MeshSizeExtendFromBoundary", 0)
+    gmsh.option.setNumber("Mesh.MeshSizeFromPoints", 0)
+    gmsh.option.setNumber("Mesh.MeshSizeFromCurvature", 0)
+
+def mesh_stats():
+    """
+    Volume and 3D element counts of the current model.
+    """
+    _, element_tags, _ = gmsh.model.mesh.getElements(3)
+    return {'volumes': len(gmsh.model.getEntities(3)), 'elements': sum(len(t) for t in element_tags)}
+
+def compare_modes(generate, reactor_types, mesh=False, modes=('cut', 'fragment')):
+    """
+    Run generate(reactor_type, mode=..., mesh=mesh) in each mode and print the timings.
+    """
+    print(f"{'reactor':<8} {'mode':<9} {'geometry s':>10} {'mesh s':>8} {'volumes':>8} {'elements':>10}")
+    rows = []
+    for reactor_type in reactor_types:
+        for mode in modes:
+            try:
+                stats = generate(reactor_type, mode=mode, mesh=mesh)
+                print(f"{reactor_type:<8} {mode:<9} {stats['geometry_s']:>10.2f} {stats.get('mesh_s', 0):>8.2f} "
+                      f"{stats['volumes']:>8} {stats['elements']:>10}", flush=True)
+            except Exception as e:
+                stats = {'error': str(e)}
+                print(f"{reactor_type:<8} {mode:<9} failed: {e}", flush=True)
+            rows.append((reactor_type, mode, stats))
+    return rows
\ No newline at end of file
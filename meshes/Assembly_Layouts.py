@@ -0,0 +1,49 @@
+import numpy as np
+
+# Assembly layouts of the OpenMC (DAGMC) generator, with no gmsh or openmc dependency: pitch, radii and
+# (x, y) pin or channel positions per reactor type. OpenMC_Complex.py meshes them and OpenMC_Lattice.py builds
+# the same assemblies as CSG lattices, which only needs this module and openmc.
+
+REACTOR_TYPES = ['BWR', 'CANDU', 'MSR', 'PWR', 'SFR']
+
+def hex_ring_positions(num_rings, pitch):
+    """
+    Pin centres of a hexagonal bundle: the centre pin, then 6r pins on ring r (corners at angles k*60 degrees,
+    r - 1 pins along each side), 1 + 3n(n + 1) pins for n rings.
+    """
+    positions = [(0.0, 0.0)]
+    for r in range(1, num_rings + 1):
+        corners = [(r * pitch * np.cos(k * np.pi / 3), r * pitch * np.sin(k * np.pi / 3)) for k in range(7)]
+        for k in range(6):
+            (x0, y0), (x1, y1) = corners[k], corners[k + 1]
+            positions += [(x0 + (x1 - x0) * j / r, y0 + (y1 - y0) * j / r) for j in range(r)]
+    return positions
+
+def assembly_layout(reactor_type):
+    """
+    Radii, pitch and (x, y) positions of the pins or channels of one reactor type.
+    """
+    if reactor_type in ['BWR', 'PWR', 'CANDU']:
+        pitch = 1.26 if reactor_type == 'PWR' else 1.25 if reactor_type == 'BWR' else 2.86
+        fuel_r = 0.4096 if reactor_type == 'PWR' else 0.418 if reactor_type == 'BWR' else 0.6122
+        clad_r = fuel_r + 0.05715
+        assembly_size = 17 if reactor_type == 'PWR' else 18 if reactor_type == 'BWR' else 37  # Pins per assembly
+        # 17x17 array with 24 guide tubes (PWR example; simplify for others)
+        positions = [(i * pitch - (assembly_size-1)*pitch/2, j * pitch - (assembly_size-1)*pitch/2) for i in range(assembly_size) for j in range(assembly_size)]
+        guide_tube_pos = [(i * pitch - (assembly_size-1)*pitch/2, j * pitch - (assembly_size-1)*pitch/2) for i in [2,5,8,11,14] for j in [2,5,8,11,14]] + [(8*pitch - (assembly_size-1)*pitch/2, k) for k in [3*pitch - (assembly_size-1)*pitch/2, 13*pitch - (assembly_size-1)*pitch/2]]  # Example guides
+        return {'kind': 'pins', 'pitch': pitch, 'fuel_r': fuel_r, 'clad_r': clad_r, 'assembly_size': assembly_size,
+                'pin_positions': [p for p in positions if p not in guide_tube_pos],
+                'guide_positions': [p for p in positions if p in guide_tube_pos],
+                'half_size': (assembly_size - 1) * pitch / 2 + 0.1}
+    elif reactor_type == 'MSR':
+        # Fuel salt with graphite channels (moderator blocks with holes), hex pattern
+        positions = [(0, 0)] + [(r * 20 * np.cos(i * np.pi / 3), r * 20 * np.sin(i * np.pi / 3)) for r in range(1, 4) for i in range(6)]
+        return {'kind': 'channels', 'core_r': 200, 'channel_r': 10, 'refl_thick': 50, 'channel_positions': positions}
+    elif reactor_type == 'SFR':
+        pitch = 0.78  # Typical SFR pin pitch
+        fuel_r = 0.35
+        num_rings = 6  # 127 pins in hex assembly
+        positions = hex_ring_positions(num_rings, pitch)
+        return {'kind': 'hex_pins', 'pitch': pitch, 'fuel_r': fuel_r, 'clad_r': fuel_r + 0.045, 'num_rings': num_rings,
+                'pin_positions': positions, 'outer_r': num_rings * pitch}
+    raise ValueError(f"Invalid reactor type: {reactor_type}")
\ No newline at end of file
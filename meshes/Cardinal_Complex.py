@@ -1,15 +1,30 @@
 import gmsh
 import os
+import time
+import argparse
 import subprocess
+import numpy as np
+from Assembly_Layouts import hex_ring_positions
+from Assembly_Builder import (pins_overlap, pin_template, replicate, fragment_regions, layout_extent,
+                              sector_layout, sector_tool, boundary_surfaces, region_size_fields, add_physical_groups,
+                              mesh_stats, compare_modes)
 
-def generate_advanced_cardinal_mesh(reactor_type):
-    gmsh.initialize()
-    gmsh.model.add(f"{reactor_type}_advanced")
-    gmsh.option.setNumber("Mesh.Algorithm3D", 1)  # Delaunay
-    gmsh.option.setNumber("Mesh.RecombineAll", 1)  # Hex recombination
-    gmsh.option.setNumber("Mesh.CharacteristicLengthMin", 0.05)
+REACTOR_TYPES = ['BWR', 'CANDU', 'MSR', 'PWR', 'SFR']
+# Element sizes (cm) per region ('salt' covers every salt_zone_*) and the grading: sizes grow from the first
+# region's size at its interfaces to the coarsest size over the given distance. Used unless size_fields=False.
+MESH_SIZES = {
+    'BWR': {'sizes': {'fuel': 0.08, 'clad': 0.1, 'moderator': 0.25}, 'grading': ('fuel', 0.6)},
+    'CANDU': {'sizes': {'fuel': 0.12, 'clad': 0.15, 'moderator': 0.5}, 'grading': ('fuel', 1.0)},
+    'MSR': {'sizes': {'graphite': 3.0, 'salt': 2.0, 'reflector': 8.0}, 'grading': ('salt', 20.0)},
+    'PWR': {'sizes': {'fuel': 0.08, 'clad': 0.1, 'guide': 0.15, 'moderator': 0.25}, 'grading': ('fuel', 0.6)},
+    'SFR': {'sizes': {'fuel': 0.07, 'clad': 0.08, 'wire': 0.08, 'sodium': 0.12}, 'grading': ('clad', 0.3)},
+}
+MODES = ['cut', 'fragment', 'extrude']
 
-    height = 366.0
+def assembly_layout(reactor_type):
+    """
+    Radii, pitch and (x, y) positions of the pins or channels of one reactor type.
+    """
     if reactor_type in ['BWR', 'PWR', 'CANDU']:
         pitch = 1.26 if reactor_type == 'PWR' else 1.25 if reactor_type == 'BWR' else 2.86
         fuel_r = 0.4096 if reactor_type == 'PWR' else 0.418 if reactor_type == 'BWR' else 0.6122
@@ -17,76 +32,208 @@ def generate_advanced_cardinal_mesh(reactor_type):
         assembly_size = 17 if reactor_type == 'PWR' else 18 if reactor_type == 'BWR' else 37
         positions = [(i * pitch - (assembly_size-1)*pitch/2, j * pitch - (assembly_size-1)*pitch/2) for i in range(assembly_size) for j in range(assembly_size)]
         guide_pos = [(i * pitch - (assembly_size-1)*pitch/2, j * pitch - (assembly_size-1)*pitch/2) for i in [2,5,8,11,14] for j in [2,5,8,11,14]] if reactor_type == 'PWR' else []  # Adjust for others
-        fuel_vols = []
-        clad_vols = []
-        guide_vols = []
-        for x, y in positions:
-            if (x, y) in guide_pos:
-                guide_id = gmsh.model.occ.addCylinder(x, y, 0, 0, 0, height, clad_r * 1.2)  # Thimble
-                guide_vols.append(guide_id)
-            else:
-                fuel_id = gmsh.model.occ.addCylinder(x, y, 0, 0, 0, height, fuel_r)
-                clad_id = gmsh.model.occ.addCylinder(x, y, 0, 0, 0, height, clad_r)
-                clad_vol = gmsh.model.occ.cut([(3, clad_id)], [(3, fuel_id)])[0][0][1]
-                fuel_vols.append(fuel_id)
-                clad_vols.append(clad_vol)
-        half_size = (assembly_size - 1) * pitch / 2 + 0.1
-        mod_box = gmsh.model.occ.addBox(-half_size, -half_size, 0, 2*half_size, 2*half_size, height)
-        mod_vol = gmsh.model.occ.cut([(3, mod_box)], [(3, f) for f in fuel_vols] + [(3, c) for c in clad_vols] + [(3, g) for g in guide_vols])[0][0][1]
+        return {'kind': 'pins', 'pitch': pitch, 'fuel_r': fuel_r, 'clad_r': clad_r, 'guide_r': clad_r * 1.2,  # Thimble
+                'assembly_size': assembly_size, 'pin_positions': [p for p in positions if p not in guide_pos],
+                'guide_positions': [p for p in positions if p in guide_pos],
+                'half_size': (assembly_size - 1) * pitch / 2 + 0.1}
     elif reactor_type == 'MSR':
-        core_r = 200
-        num_zones = 5
-        channel_r = 10
-        num_channels = 37
-        refl_thick = 50
-        positions = [(0, 0)] + [(r * 30 * np.cos(i * np.pi / 3), r * 30 * np.sin(i * np.pi / 3)) for r in range(1, 4) for i in range(6 * r)]
-        salt_vols = []
-        channel_vols = []
-        for z in range(num_zones):
-            z_start = z * (height / num_zones)
-            z_end = (z + 1) * (height / num_zones)
-            zone_id = gmsh.model.occ.addCylinder(0, 0, z_start, 0, 0, z_end - z_start, core_r)
-            for x, y in positions:
-                channel_id = gmsh.model.occ.addCylinder(x, y, z_start, 0, 0, z_end - z_start, channel_r)
-                gmsh.model.occ.cut([(3, zone_id)], [(3, channel_id)])
-                channel_vols.append(channel_id)
-            salt_vols.append(zone_id)
-        refl_id = gmsh.model.occ.addCylinder(0, 0, 0, 0, 0, height, core_r + refl_thick)
-        refl_vol = gmsh.model.occ.cut([(3, refl_id)], [(3, s) for s in salt_vols])[0][0][1]
+        positions = hex_ring_positions(3, 30)  # 37 channels on a 30 cm hex pitch
+        return {'kind': 'channels', 'core_r': 200, 'num_zones': 5, 'channel_r': 10, 'refl_thick': 50,
+                'channel_positions': positions}
     elif reactor_type == 'SFR':
         pitch = 0.78
         fuel_r = 0.35
-        clad_r = fuel_r + 0.045
-        wire_r = 0.1  # Wire wrap approx
-        num_rings = 15  # ~331 pins, but use 6 for ~91 to simplify
-        positions = [(0, 0)] + [(r * pitch * np.cos(i * np.pi / 3), r * pitch * np.sin(i * np.pi / 3)) for r in range(1, num_rings + 1) for i in range(6 * r)]
+        num_rings = 15  # 721 pins; 6 rings (127) for a quick mesh
+        positions = hex_ring_positions(num_rings, pitch)
+        return {'kind': 'hex_pins', 'pitch': pitch, 'fuel_r': fuel_r, 'clad_r': fuel_r + 0.045,
+                'wire_r': 0.1,  # Wire wrap approx
+                'num_rings': num_rings, 'pin_positions': positions, 'outer_r': num_rings * pitch}
+    raise ValueError(f"Invalid reactor type: {reactor_type}")
+
+def cut_geometry(layout, height):
+    """
+    Original path: every pin (and every MSR channel in every zone) cut on its own, then one cut of the coolant
+    against all pins. Tools are kept (removeTool=False) so the pins and channels survive the later cuts.
+    """
+    occ = gmsh.model.occ
+    regions = {}
+    if layout['kind'] in ['pins', 'hex_pins']:
         fuel_vols = []
         clad_vols = []
+        guide_vols = []
         wire_vols = []
-        for x, y in positions:
-            fuel_id = gmsh.model.occ.addCylinder(x, y, 0, 0, 0, height, fuel_r)
-            clad_id = gmsh.model.occ.addCylinder(x, y, 0, 0, 0, height, clad_r)
-            clad_vol = gmsh.model.occ.cut([(3, clad_id)], [(3, fuel_id)])[0][0][1]
-            # Helical wire wrap (approx as torus segments; simplified straight for mesh)
-            wire_id = gmsh.model.occ.addCylinder(x + clad_r, y, 0, 0, 0, height, wire_r)
-            wire_vols.append(wire_id)
+        for x, y in layout.get('guide_positions', []):
+            guide_vols.append(occ.addCylinder(x, y, 0, 0, 0, height, layout['guide_r']))
+        for x, y in layout['pin_positions']:
+            fuel_id = occ.addCylinder(x, y, 0, 0, 0, height, layout['fuel_r'])
+            clad_id = occ.addCylinder(x, y, 0, 0, 0, height, layout['clad_r'])
+            clad_vol = occ.cut([(3, clad_id)], [(3, fuel_id)], removeTool=False)[0][0][1]
+            if 'wire_r' in layout:
+                # Helical wire wrap (approx as torus segments; simplified straight for mesh)
+                wire_vols.append(occ.addCylinder(x + layout['clad_r'], y, 0, 0, 0, height, layout['wire_r']))
             fuel_vols.append(fuel_id)
             clad_vols.append(clad_vol)
-        outer_r = num_rings * pitch
-        sodium_id = gmsh.model.occ.addCylinder(0, 0, 0, 0, 0, height, outer_r)
-        sodium_vol = gmsh.model.occ.cut([(3, sodium_id)], [(3, f) for f in fuel_vols] + [(3, c) for c in clad_vols] + [(3, w) for w in wire_vols])[0][0][1]
+        if layout['kind'] == 'pins':
+            half_size = layout['half_size']
+            outer_id = occ.addBox(-half_size, -half_size, 0, 2*half_size, 2*half_size, height)
+        else:
+            outer_id = occ.addCylinder(0, 0, 0, 0, 0, height, layout['outer_r'])
+        tools = [(3, v) for v in fuel_vols + clad_vols + guide_vols + wire_vols]
+        outer_vol = occ.cut([(3, outer_id)], tools, removeTool=False)[0][0][1]
+        regions = {'fuel': fuel_vols, 'clad': clad_vols, 'guide': guide_vols, 'wire': wire_vols,
+                   'moderator' if layout['kind'] == 'pins' else 'sodium': [outer_vol]}
+    elif layout['kind'] == 'channels':
+        zone_height = height / layout['num_zones']
+        channel_vols = []
+        for z in range(layout['num_zones']):
+            z_start = z * zone_height
+            zone_id = occ.addCylinder(0, 0, z_start, 0, 0, zone_height, layout['core_r'])
+            for x, y in layout['channel_positions']:
+                channel_id = occ.addCylinder(x, y, z_start, 0, 0, zone_height, layout['channel_r'])
+                zone_id = occ.cut([(3, zone_id)], [(3, channel_id)], removeTool=False)[0][0][1]
+                channel_vols.append(channel_id)
+            regions[f'salt_zone_{z}'] = [zone_id]
+        refl_id = occ.addCylinder(0, 0, 0, 0, 0, height, layout['core_r'] + layout['refl_thick'])
+        tools = [(3, v[0]) for v in regions.values()] + [(3, c) for c in channel_vols]
+        regions['graphite'] = channel_vols
+        regions['reflector'] = [occ.cut([(3, refl_id)], tools, removeTool=False)[0][0][1]]
+    occ.synchronize()
+    return regions
 
-    gmsh.model.occ.synchronize()
-    gmsh.model.mesh.generate(3)
-    os.makedirs('meshes/cardinal/', exist_ok=True)
-    gmsh.write(f'meshes/cardinal/{reactor_type}_advanced.e')
+def fragment_geometry(layout, height, clip=None):
+    """
+    One template per pin type replicated with occ.copy/translate, all volumes resolved by a single occ.fragment.
+    MSR channels run the full height and are split at the salt zone boundaries by the same fragment.
+    clip (a sector_tool volume) keeps only the symmetry sector.
+    """
+    occ = gmsh.model.occ
+    if layout['kind'] in ['pins', 'hex_pins']:
+        cylinders = {'fuel': (0, 0, layout['fuel_r']), 'clad': (0, 0, layout['clad_r'])}
+        if 'wire_r' in layout:
+            cylinders['wire'] = (layout['clad_r'], 0, layout['wire_r'])
+        if pins_overlap(cylinders, layout['pitch']):
+            print(f"Pins overlap their neighbours at pitch {layout['pitch']} cm; the fragment resolves every overlap, "
+                  f"which is slow for large bundles (--mode cut leaves them overlapping).")
+        pins = replicate(pin_template(cylinders, height), layout['pin_positions'])
+        guides = replicate(pin_template({'guide': (0, 0, layout.get('guide_r', layout['clad_r']))}, height),
+                           layout.get('guide_positions', []))
+        if layout['kind'] == 'pins':
+            half_size = layout['half_size']
+            outer = ('moderator', [(3, occ.addBox(-half_size, -half_size, 0, 2*half_size, 2*half_size, height))])
+        else:
+            outer = ('sodium', [(3, occ.addCylinder(0, 0, 0, 0, 0, height, layout['outer_r']))])
+        regions = fragment_regions([(name, pins[name]) for name in cylinders] + [('guide', guides['guide']), outer], clip)
+    elif layout['kind'] == 'channels':
+        channels = replicate(pin_template({'graphite': (0, 0, layout['channel_r'])}, height), layout['channel_positions'])
+        zone_height = height / layout['num_zones']
+        zones = [(f'salt_zone_{z}', [(3, occ.addCylinder(0, 0, z * zone_height, 0, 0, zone_height, layout['core_r']))])
+                 for z in range(layout['num_zones'])]
+        reflector = [(3, occ.addCylinder(0, 0, 0, 0, 0, height, layout['core_r'] + layout['refl_thick']))]
+        regions = fragment_regions([('graphite', channels['graphite'])] + zones + [('reflector', reflector)], clip)
+    occ.synchronize()
+    return regions
 
-    gmsh.finalize()
+def section_geometry(layout, clip=None):
+    """
+    2D cross-section at z = 0 of the same regions, resolved by one occ.fragment of disk templates (clipped to a
+    sector_tool surface if given). Returns {region: [surface tags]} (MSR salt as one 'salt' region, zoned on extrusion).
+    """
+    occ = gmsh.model.occ
+    if layout['kind'] in ['pins', 'hex_pins']:
+        circles = {'fuel': (0, 0, layout['fuel_r']), 'clad': (0, 0, layout['clad_r'])}
+        if 'wire_r' in layout:
+            circles['wire'] = (layout['clad_r'], 0, layout['wire_r'])
+        pins = replicate(pin_template(circles, None), layout['pin_positions'])
+        guides = replicate(pin_template({'guide': (0, 0, layout.get('guide_r', layout['clad_r']))}, None),
+                           layout.get('guide_positions', []))
+        if layout['kind'] == 'pins':
+            half_size = layout['half_size']
+            outer = ('moderator', [(2, occ.addRectangle(-half_size, -half_size, 0, 2*half_size, 2*half_size))])
+        else:
+            outer = ('sodium', [(2, occ.addDisk(0, 0, 0, layout['outer_r'], layout['outer_r']))])
+        return fragment_regions([(name, pins[name]) for name in circles] + [('guide', guides['guide']), outer], clip)
+    channels = replicate(pin_template({'graphite': (0, 0, layout['channel_r'])}, None), layout['channel_positions'])
+    core = [(2, occ.addDisk(0, 0, 0, layout['core_r'], layout['core_r']))]
+    refl_r = layout['core_r'] + layout['refl_thick']
+    reflector = [(2, occ.addDisk(0, 0, 0, refl_r, refl_r))]
+    return fragment_regions([('graphite', channels['graphite']), ('salt', core), ('reflector', reflector)], clip)
 
+def extrude_geometry(layout, height, layer_dz=5.0, clip=None):
+    """
+    Cross-section extruded along z in layers of about layer_dz (structured, recombined into hexes/prisms when
+    meshed), one extrusion per axial zone so each MSR salt zone is its own volume.
+    """
+    occ = gmsh.model.occ
+    section = section_geometry(layout, clip)
+    names = [name for name, tags in section.items() for _ in tags]
+    surfaces = [(2, tag) for tags in section.values() for tag in tags]
+    num_zones = layout.get('num_zones', 1)
+    zone_height = height / num_zones
+    layers = max(1, int(np.ceil(zone_height / layer_dz)))
+    regions = {}
+    for z in range(num_zones):
+        # Output per input surface: its top surface, the extruded volume, then the lateral surfaces
+        out = occ.extrude(surfaces, 0, 0, zone_height, numElements=[layers], recombine=True)
+        volumes = [i for i, (dim, _) in enumerate(out) if dim == 3]
+        for name, i in zip(names, volumes):
+            regions.setdefault(f'salt_zone_{z}' if name == 'salt' else name, []).append(out[i][1])
+        surfaces = [out[i - 1] for i in volumes]
+    occ.synchronize()
+    return regions
+
+def generate_advanced_cardinal_mesh(reactor_type, mode='fragment', mesh=True, sectors=1, size_fields=True):
+    """
+    Build the assembly ('fragment': template replication and one occ.fragment; 'cut': the original per-pin
+    booleans; 'extrude': the fragmented cross-section extruded in axial layers) with one block per region and
+    'bottom'/'top' sidesets and, with mesh, mesh it and validate it with a heat conduction run.
+    sectors 4, 8 or 12 builds only that symmetry sector, its cut faces as 'symmetry_*' sidesets.
+    size_fields sizes the elements per region from MESH_SIZES (False: the global CharacteristicLengthMin only).
+    Returns the geometry and mesh timings.
+    """
+    if sectors > 1 and mode == 'cut':
+        raise ValueError("Sector meshes are built in fragment or extrude mode")
+    name = f"{reactor_type}_advanced" + (f"_sector{sectors}" if sectors > 1 else '')
+    gmsh.initialize()
+    try:
+        gmsh.model.add(name)
+        gmsh.option.setNumber("Mesh.Algorithm3D", 1)  # Delaunay
+        gmsh.option.setNumber("Mesh.RecombineAll", 1)  # Hex recombination
+        gmsh.option.setNumber("Mesh.CharacteristicLengthMin", 0.05)
+
+        height = 366.0
+        start = time.perf_counter()
+        layout = sector_layout(assembly_layout(reactor_type), sectors)
+        if mode == 'extrude':
+            clip = sector_tool(sectors, layout_extent(layout)) if sectors > 1 else None
+            regions = extrude_geometry(layout, height, clip=clip)
+        elif mode == 'cut':
+            regions = cut_geometry(layout, height)
+        else:
+            clip = sector_tool(sectors, layout_extent(layout), height) if sectors > 1 else None
+            regions = fragment_geometry(layout, height, clip)
+        add_physical_groups(regions)
+        # Symmetry planes are zero-flux sidesets in MOOSE (natural boundary condition for heat conduction)
+        add_physical_groups(boundary_surfaces(sectors, height), dim=2)
+        stats = {'mode': mode, 'sectors': sectors, 'geometry_s': time.perf_counter() - start}
+
+        if mesh:
+            if size_fields:
+                region_size_fields(regions, **MESH_SIZES[reactor_type])
+            start = time.perf_counter()
+            gmsh.model.mesh.generate(3)
+            stats['mesh_s'] = time.perf_counter() - start
+            os.makedirs('meshes/cardinal/', exist_ok=True)
+            gmsh.option.setNumber("Mesh.MshFileVersion", 2.2)  # gmsh has no Exodus writer; MOOSE reads msh 2.2
+            gmsh.write(f'meshes/cardinal/{name}.msh')
+        stats.update(mesh_stats())
+    finally:
+        gmsh.finalize()
+    if not mesh:
+        return stats
     # Advanced validation .i with heat conduction and boundary conditions
     test_i = f'''
 [Mesh]
-  file = meshes/cardinal/{reactor_type}_advanced.e
+  file = meshes/cardinal/{name}.msh
 []
 
 [Variables]
@@ -125,12 +272,33 @@ def generate_advanced_cardinal_mesh(reactor_type):
   exodus = true
 []
 '''
-    test_file = f'meshes/cardinal/{reactor_type}_advanced_test.i'
+    test_file = f'meshes/cardinal/{name}_test.i'
     with open(test_file, 'w') as f:
         f.write(test_i)
     subprocess.run(['cardinal-opt', '-i', test_file])
-    print(f"Advanced mesh for {reactor_type} generated and validated with heat conduction.")
+    sector = f"1/{sectors} sector, " if sectors > 1 else ''
+    print(f"Advanced mesh for {reactor_type} generated and validated with heat conduction "
+          f"({sector}{mode} mode, {stats['geometry_s']:.1f} s geometry, {stats['mesh_s']:.1f} s meshing).")
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate and validate the Cardinal assembly meshes.")
+    parser.add_argument('reactor_types', nargs='*', default=REACTOR_TYPES, help="Reactor types (default: all)")
+    parser.add_argument('--mode', choices=MODES, default='fragment',
+                        help="fragment: pin templates + one occ.fragment; cut: the original per-pin booleans; "
+                             "extrude: 2D cross-section meshed once and extruded in axial layers")
+    parser.add_argument('--compare', action='store_true', help="Time every mode for each reactor type")
+    parser.add_argument('--geometry-only', action='store_true', help="Build the geometry without meshing")
+    parser.add_argument('--sector', type=int, choices=[1, 4, 8, 12], default=1,
+                        help="Build only a 1/4, 1/8 (square lattices) or 1/12 (hex) symmetry sector")
+    parser.add_argument('--uniform', action='store_true', help="Global mesh size only, no per-region size fields")
+    args = parser.parse_args()
 
-# Generate for all
-for rt in ['BWR', 'CANDU', 'MSR', 'PWR', 'SFR']:
-    generate_advanced_cardinal_mesh(rt)
\ No newline at end of file
+    if args.compare:
+        generate = lambda rt, mode, mesh: generate_advanced_cardinal_mesh(rt, mode, mesh, args.sector, not args.uniform)
+        compare_modes(generate, args.reactor_types, mesh=not args.geometry_only,
+                      modes=MODES if args.sector == 1 else ['fragment', 'extrude'])
+    else:
+        for rt in args.reactor_types:
+            generate_advanced_cardinal_mesh(rt, args.mode, mesh=not args.geometry_only, sectors=args.sector,
+                                            size_fields=not args.uniform)
\ No newline at end of file
@@ -1,87 +1,157 @@
 import gmsh
-import openmc
 import os
-import numpy as np
+import time
+import argparse
+from Assembly_Layouts import REACTOR_TYPES, assembly_layout
+from Assembly_Builder import (pins_overlap, pin_template, replicate, fragment_regions, layout_extent,
+                              sector_layout, sector_tool, boundary_surfaces, region_size_fields, add_physical_groups,
+                              mesh_stats, compare_modes)
 
-def generate_advanced_mesh(reactor_type):
-    gmsh.initialize()
-    gmsh.model.add(f"{reactor_type}_advanced")
-    gmsh.option.setNumber("Mesh.Algorithm", 6)  # Frontal-Delaunay for quality
-    gmsh.option.setNumber("Mesh.CharacteristicLengthMin", 0.1)
-    gmsh.option.setNumber("Mesh.Optimize", 1)
+# Element sizes (cm) per region and the grading: sizes grow from the first region's size at its interfaces to the
+# coarsest size over the given distance. DAGMC tracks on the surface facets, so the volumes can stay coarse.
+MESH_SIZES = {
+    'BWR': {'sizes': {'fuel': 0.15, 'clad': 0.2, 'guide': 0.2, 'moderator': 0.4}, 'grading': ('fuel', 0.8)},
+    'CANDU': {'sizes': {'fuel': 0.2, 'clad': 0.25, 'guide': 0.25, 'moderator': 0.6}, 'grading': ('fuel', 1.0)},
+    'MSR': {'sizes': {'graphite': 3.0, 'salt': 4.0, 'reflector': 10.0}, 'grading': ('salt', 20.0)},
+    'PWR': {'sizes': {'fuel': 0.15, 'clad': 0.2, 'guide': 0.2, 'moderator': 0.4}, 'grading': ('fuel', 0.8)},
+    'SFR': {'sizes': {'fuel': 0.1, 'clad': 0.12, 'sodium': 0.15}, 'grading': ('clad', 0.3)},
+}
 
-    height = 366.0  # Typical active core height cm
-    if reactor_type in ['BWR', 'PWR', 'CANDU']:
-        pitch = 1.26 if reactor_type == 'PWR' else 1.25 if reactor_type == 'BWR' else 2.86
-        fuel_r = 0.4096 if reactor_type == 'PWR' else 0.418 if reactor_type == 'BWR' else 0.6122
-        clad_r = fuel_r + 0.05715
-        assembly_size = 17 if reactor_type == 'PWR' else 18 if reactor_type == 'BWR' else 37  # Pins per assembly
-        # 17x17 array with 24 guide tubes (PWR example; simplify for others)
-        positions = [(i * pitch - (assembly_size-1)*pitch/2, j * pitch - (assembly_size-1)*pitch/2) for i in range(assembly_size) for j in range(assembly_size)]
-        guide_tube_pos = [(i * pitch - (assembly_size-1)*pitch/2, j * pitch - (assembly_size-1)*pitch/2) for i in [2,5,8,11,14] for j in [2,5,8,11,14]] + [(8*pitch - (assembly_size-1)*pitch/2, k) for k in [3*pitch - (assembly_size-1)*pitch/2, 13*pitch - (assembly_size-1)*pitch/2]]  # Example guides
+def cut_geometry(layout, height):
+    """
+    Original path: every pin built and cut on its own, then one cut of the moderator against all pins.
+    Tools are kept (removeTool=False) so the pins survive the moderator cut.
+    """
+    occ = gmsh.model.occ
+    regions = {}
+    if layout['kind'] in ['pins', 'hex_pins']:
         fuel_vols = []
         clad_vols = []
         guide_vols = []
-        for x, y in positions:
-            if (x, y) in guide_tube_pos:
-                guide_id = gmsh.model.occ.addCylinder(x, y, 0, 0, 0, height, clad_r)  # Guide tube (empty)
-                guide_vols.append(guide_id)
-            else:
-                fuel_id = gmsh.model.occ.addCylinder(x, y, 0, 0, 0, height, fuel_r)
-                clad_id = gmsh.model.occ.addCylinder(x, y, 0, 0, 0, height, clad_r)
-                clad_vol = gmsh.model.occ.cut([(3, clad_id)], [(3, fuel_id)])[0][0][1]
-                fuel_vols.append(fuel_id)
-                clad_vols.append(clad_vol)
-        # Moderator: assembly box minus pins
-        half_size = (assembly_size - 1) * pitch / 2 + 0.1
-        mod_box = gmsh.model.occ.addBox(-half_size, -half_size, 0, 2*half_size, 2*half_size, height)
-        mod_vol = gmsh.model.occ.cut([(3, mod_box)], [(3, f) for f in fuel_vols] + [(3, c) for c in clad_vols] + [(3, g) for g in guide_vols])[0][0][1]
-    elif reactor_type == 'MSR':
-        core_r = 200  # Larger core
-        channel_r = 10
-        num_channels = 37  # Hex pattern
-        refl_thick = 50
-        # Fuel salt with graphite channels (moderator blocks with holes)
-        positions = [(0, 0)] + [(r * 20 * np.cos(i * np.pi / 3), r * 20 * np.sin(i * np.pi / 3)) for r in range(1, 4) for i in range(6)]
-        channel_vols = []
-        for x, y in positions:
-            channel_id = gmsh.model.occ.addCylinder(x, y, 0, 0, 0, height, channel_r)  # Graphite channel
-            channel_vols.append(channel_id)
-        core_id = gmsh.model.occ.addCylinder(0, 0, 0, 0, 0, height, core_r)
-        salt_vol = gmsh.model.occ.cut([(3, core_id)], [(3, c) for c in channel_vols])[0][0][1]
-        # Reflector
-        refl_id = gmsh.model.occ.addCylinder(0, 0, 0, 0, 0, height, core_r + refl_thick)
-        refl_vol = gmsh.model.occ.cut([(3, refl_id)], [(3, salt_vol)])[0][0][1]
-    elif reactor_type == 'SFR':
-        pitch = 0.78  # Typical SFR pin pitch
-        fuel_r = 0.35
-        clad_r = fuel_r + 0.045
-        num_rings = 6  # ~217 pins in hex assembly
-        positions = [(0, 0)] + [(r * pitch * np.cos(i * np.pi / 3), r * pitch * np.sin(i * np.pi / 3)) for r in range(1, num_rings + 1) for i in range(6 * r)]
-        fuel_vols = []
-        clad_vols = []
-        for x, y in positions:
-            fuel_id = gmsh.model.occ.addCylinder(x, y, 0, 0, 0, height, fuel_r)
-            clad_id = gmsh.model.occ.addCylinder(x, y, 0, 0, 0, height, clad_r)
-            clad_vol = gmsh.model.occ.cut([(3, clad_id)], [(3, fuel_id)])[0][0][1]
+        for x, y in layout.get('guide_positions', []):
+            guide_vols.append(occ.addCylinder(x, y, 0, 0, 0, height, layout['clad_r']))  # Guide tube (empty)
+        for x, y in layout['pin_positions']:
+            fuel_id = occ.addCylinder(x, y, 0, 0, 0, height, layout['fuel_r'])
+            clad_id = occ.addCylinder(x, y, 0, 0, 0, height, layout['clad_r'])
+            clad_vol = occ.cut([(3, clad_id)], [(3, fuel_id)], removeTool=False)[0][0][1]
             fuel_vols.append(fuel_id)
             clad_vols.append(clad_vol)
-        # Sodium: hex prism enclosing assembly
-        outer_r = num_rings * pitch
-        sodium_id = gmsh.model.occ.addCylinder(0, 0, 0, 0, 0, height, outer_r)  # Approx cylinder for hex
-        sodium_vol = gmsh.model.occ.cut([(3, sodium_id)], [(3, f) for f in fuel_vols] + [(3, c) for c in clad_vols])[0][0][1]
+        if layout['kind'] == 'pins':
+            # Moderator: assembly box minus pins
+            half_size = layout['half_size']
+            outer_id = occ.addBox(-half_size, -half_size, 0, 2*half_size, 2*half_size, height)
+        else:
+            outer_id = occ.addCylinder(0, 0, 0, 0, 0, height, layout['outer_r'])  # Sodium: approx cylinder for hex
+        outer_vol = occ.cut([(3, outer_id)], [(3, v) for v in fuel_vols + clad_vols + guide_vols], removeTool=False)[0][0][1]
+        regions = {'fuel': fuel_vols, 'clad': clad_vols, 'guide': guide_vols,
+                   'moderator' if layout['kind'] == 'pins' else 'sodium': [outer_vol]}
+    elif layout['kind'] == 'channels':
+        channel_vols = [occ.addCylinder(x, y, 0, 0, 0, height, layout['channel_r']) for x, y in layout['channel_positions']]
+        core_id = occ.addCylinder(0, 0, 0, 0, 0, height, layout['core_r'])
+        salt_vol = occ.cut([(3, core_id)], [(3, c) for c in channel_vols], removeTool=False)[0][0][1]
+        refl_id = occ.addCylinder(0, 0, 0, 0, 0, height, layout['core_r'] + layout['refl_thick'])
+        refl_vol = occ.cut([(3, refl_id)], [(3, salt_vol)] + [(3, c) for c in channel_vols], removeTool=False)[0][0][1]
+        regions = {'graphite': channel_vols, 'salt': [salt_vol], 'reflector': [refl_vol]}
+    occ.synchronize()
+    return regions
+
+def fragment_geometry(layout, height, clip=None):
+    """
+    One template per pin type replicated with occ.copy/translate, all volumes resolved by a single occ.fragment.
+    clip (a sector_tool volume) keeps only the symmetry sector.
+    """
+    occ = gmsh.model.occ
+    if layout['kind'] in ['pins', 'hex_pins']:
+        cylinders = {'fuel': (0, 0, layout['fuel_r']), 'clad': (0, 0, layout['clad_r'])}
+        if pins_overlap(cylinders, layout['pitch']):
+            print(f"Pins overlap their neighbours at pitch {layout['pitch']} cm; the fragment resolves every overlap, "
+                  f"which is slow for large bundles (--mode cut leaves them overlapping).")
+        pins = replicate(pin_template(cylinders, height), layout['pin_positions'])
+        guides = replicate(pin_template({'guide': (0, 0, layout['clad_r'])}, height), layout.get('guide_positions', []))
+        if layout['kind'] == 'pins':
+            half_size = layout['half_size']
+            outer = ('moderator', [(3, occ.addBox(-half_size, -half_size, 0, 2*half_size, 2*half_size, height))])
+        else:
+            outer = ('sodium', [(3, occ.addCylinder(0, 0, 0, 0, 0, height, layout['outer_r']))])
+        regions = fragment_regions([('fuel', pins['fuel']), ('clad', pins['clad']), ('guide', guides['guide']), outer], clip)
+    elif layout['kind'] == 'channels':
+        channels = replicate(pin_template({'graphite': (0, 0, layout['channel_r'])}, height), layout['channel_positions'])
+        core = [(3, occ.addCylinder(0, 0, 0, 0, 0, height, layout['core_r']))]
+        reflector = [(3, occ.addCylinder(0, 0, 0, 0, 0, height, layout['core_r'] + layout['refl_thick']))]
+        regions = fragment_regions([('graphite', channels['graphite']), ('salt', core), ('reflector', reflector)], clip)
+    occ.synchronize()
+    return regions
+
+def generate_advanced_mesh(reactor_type, mode='fragment', mesh=True, sectors=1, size_fields=True):
+    """
+    Build the assembly ('fragment': template replication and one occ.fragment; 'cut': the original per-pin
+    booleans), tag each region as a DAGMC material group and, with mesh, mesh it and convert it to DAGMC.
+    sectors 4, 8 or 12 builds only that symmetry sector, its cut faces tagged as DAGMC reflecting boundaries.
+    size_fields sizes the elements per region from MESH_SIZES (False: the global CharacteristicLengthMin only).
+    Returns the geometry and mesh timings.
+    """
+    if sectors > 1 and mode == 'cut':
+        raise ValueError("Sector meshes are built in fragment mode")
+    name = f"{reactor_type}_advanced" + (f"_sector{sectors}" if sectors > 1 else '')
+    gmsh.initialize()
+    try:
+        gmsh.model.add(name)
+        gmsh.option.setNumber("Mesh.Algorithm", 6)  # Frontal-Delaunay for quality
+        gmsh.option.setNumber("Mesh.CharacteristicLengthMin", 0.1)
+        gmsh.option.setNumber("Mesh.Optimize", 1)
+
+        height = 366.0  # Typical active core height cm
+        start = time.perf_counter()
+        layout = sector_layout(assembly_layout(reactor_type), sectors)
+        if mode == 'cut':
+            regions = cut_geometry(layout, height)
+        else:
+            clip = sector_tool(sectors, layout_extent(layout), height) if sectors > 1 else None
+            regions = fragment_geometry(layout, height, clip)
+        add_physical_groups(regions, prefix='mat:')
+        if sectors > 1:
+            # Particles reaching a cut plane are mirrored back, standing in for the rest of the assembly
+            symmetry = [tag for plane, tags in boundary_surfaces(sectors, height).items() if plane.startswith('symmetry') for tag in tags]
+            gmsh.model.addPhysicalGroup(2, symmetry, name='boundary:Reflecting')
+        stats = {'mode': mode, 'sectors': sectors, 'geometry_s': time.perf_counter() - start}
 
-    gmsh.model.occ.synchronize()
-    gmsh.model.mesh.generate(3)
-    os.makedirs('meshes/openmc/', exist_ok=True)
-    gmsh.write(f'meshes/openmc/{reactor_type}_advanced.msh')
+        if mesh:
+            if size_fields:
+                region_size_fields(regions, **MESH_SIZES[reactor_type])
+            start = time.perf_counter()
+            gmsh.model.mesh.generate(3)
+            stats['mesh_s'] = time.perf_counter() - start
+            os.makedirs('meshes/openmc/', exist_ok=True)
+            gmsh.write(f'meshes/openmc/{name}.msh')
+        stats.update(mesh_stats())
+    finally:
+        gmsh.finalize()
 
-    gmsh.finalize()
+    if mesh:
+        # Convert to DAGMC HDF5 (run mbconvert or make_dagmc_h5m; assume tool available)
+        os.system(f'mbconvert meshes/openmc/{name}.msh meshes/openmc/{name}.h5')
+        sector = f"1/{sectors} sector, " if sectors > 1 else ''
+        print(f"Advanced DAGMC mesh for {reactor_type} generated ({sector}{mode} mode, {stats['geometry_s']:.1f} s geometry, "
+              f"{stats['mesh_s']:.1f} s meshing).")
+    return stats
 
-    # Convert to DAGMC HDF5 (run mbconvert or make_dagmc_h5m; assume tool available)
-    os.system(f'mbconvert meshes/openmc/{reactor_type}_advanced.msh meshes/openmc/{reactor_type}_advanced.h5')
-    print(f"Advanced DAGMC mesh for {reactor_type} generated.")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the DAGMC assembly meshes for OpenMC.")
+    parser.add_argument('reactor_types', nargs='*', default=REACTOR_TYPES, help="Reactor types (default: all)")
+    parser.add_argument('--mode', choices=['fragment', 'cut'], default='fragment',
+                        help="fragment: pin templates + one occ.fragment; cut: the original per-pin booleans")
+    parser.add_argument('--compare', action='store_true', help="Time both modes for each reactor type")
+    parser.add_argument('--geometry-only', action='store_true', help="Build the geometry without meshing")
+    parser.add_argument('--sector', type=int, choices=[1, 4, 8, 12], default=1,
+                        help="Build only a 1/4, 1/8 (square lattices) or 1/12 (hex) symmetry sector")
+    parser.add_argument('--uniform', action='store_true', help="Global mesh size only, no per-region size fields")
+    args = parser.parse_args()
 
-# Generate for all
-for rt in ['BWR', 'CANDU', 'MSR', 'PWR', 'SFR']:
-    generate_advanced_mesh(rt)
\ No newline at end of file
+    if args.compare:
+        generate = lambda rt, mode, mesh: generate_advanced_mesh(rt, mode, mesh, args.sector, not args.uniform)
+        compare_modes(generate, args.reactor_types, mesh=not args.geometry_only,
+                      modes=['cut', 'fragment'] if args.sector == 1 else ['fragment'])
+    else:
+        for rt in args.reactor_types:
+            generate_advanced_mesh(rt, args.mode, mesh=not args.geometry_only, sectors=args.sector,
+                                   size_fields=not args.uniform)
\ No newline at end of file
@@ -0,0 +1,236 @@
+import os
+import time
+import argparse
+import h5py
+import openmc
+from Assembly_Layouts import REACTOR_TYPES, assembly_layout, hex_ring_positions
+
+# Native OpenMC (CSG) versions of the assemblies meshed by OpenMC_Complex.py, built from the same assembly_layout:
+# same pitch, radii, guide tube layout and ring counts. BWR/PWR/CANDU become an openmc.RectLattice of pin
+# universes, SFR and the MSR graphite channels an openmc.HexLattice ('x' orientation, like hex_ring_positions).
+# Materials are named after the DAGMC 'mat:' groups, so the CSG and DAGMC models share them and
+# benchmark_tracking compares the tracking rate of both on the same materials and source.
+
+HEIGHT = 366.0  # Active core height cm, as in OpenMC_Complex.generate_advanced_mesh
+
+def lattice_materials(reactor_type):
+    """
+    Materials of one reactor type by region name (fuel, clad, guide, moderator / sodium / graphite, salt, reflector).
+    """
+    materials = {}
+    if reactor_type == 'MSR':
+        salt = openmc.Material(name='salt')
+        salt.add_nuclide('Li7', 2.0, 'ao')
+        salt.add_element('Be', 1.0, 'ao')
+        salt.add_element('F', 4.0, 'ao')
+        salt.add_nuclide('U235', 0.02, 'ao')
+        salt.add_nuclide('U238', 0.08, 'ao')
+        salt.set_density('g/cm3', 1.95)
+        salt.add_s_alpha_beta('c_FLiBe')
+        materials['salt'] = salt
+        for name in ['graphite', 'reflector']:
+            graphite = openmc.Material(name=name)
+            graphite.add_element('C', 1.0)
+            graphite.set_density('g/cm3', 1.9)
+            graphite.add_s_alpha_beta('c_Graphite')
+            materials[name] = graphite
+        return materials
+
+    fuel = openmc.Material(name='fuel')
+    enrichment = 0.0071 if reactor_type == 'CANDU' else 0.2 if reactor_type == 'SFR' else 0.045
+    fuel.add_nuclide('U235', enrichment)
+    fuel.add_nuclide('U238', 1 - enrichment)
+    fuel.add_element('O', 2.0)
+    fuel.set_density('g/cm3', 10.5)
+    materials['fuel'] = fuel
+    if reactor_type == 'SFR':
+        clad = openmc.Material(name='clad')
+        clad.add_element('Fe', 0.7)
+        clad.add_element('Cr', 0.2)
+        clad.add_element('Ni', 0.1)
+        clad.set_density('g/cm3', 7.8)
+        sodium = openmc.Material(name='sodium')
+        sodium.add_element('Na', 1.0)
+        sodium.set_density('g/cm3', 0.85)
+        materials.update({'clad': clad, 'sodium': sodium})
+        return materials
+
+    clad = openmc.Material(name='clad')
+    clad.add_element('Zr', 1.0)
+    clad.set_density('g/cm3', 6.55)
+    materials['clad'] = clad
+    for name in ['moderator', 'guide']:  # Guide tubes are water-filled
+        water = openmc.Material(name=name)
+        if reactor_type == 'CANDU':
+            water.add_nuclide('H2', 2.0)
+            water.add_element('O', 1.0)
+            water.set_density('g/cm3', 1.1)
+            water.add_s_alpha_beta('c_D_in_D2O')
+        else:
+            water.add_element('H', 2.0)
+            water.add_element('O', 1.0)
+            water.set_density('g/cm3', 0.74 if reactor_type == 'BWR' else 1.0)
+            water.add_s_alpha_beta('c_H_in_H2O')
+        materials[name] = water
+    return materials
+
+def pin_universe(materials, radii, outer):
+    """
+    Universe of concentric cylinders [(region, radius), ...] (innermost first) in the outer region's material.
+    """
+    cells = []
+    inner = None
+    for name, r in radii:
+        cyl = openmc.ZCylinder(r=r)
+        cells.append(openmc.Cell(fill=materials[name], region=-cyl if inner is None else +inner & -cyl))
+        inner = cyl
+    cells.append(openmc.Cell(fill=materials[outer], region=+inner))
+    return openmc.Universe(cells=cells)
+
+def hex_lattice_universes(num_rings, pitch, universe_at):
+    """
+    HexLattice universes ('x' orientation): rings from the outermost in, each starting at the +x corner and going
+    clockwise, i.e. the counter-clockwise rings of hex_ring_positions reversed after their first element.
+    universe_at(x, y) picks the universe of each element.
+    """
+    positions = hex_ring_positions(num_rings, pitch)
+    rings = []
+    for r in range(num_rings, 0, -1):
+        ring = positions[1 + 3 * r * (r - 1):1 + 3 * r * (r + 1)]
+        rings.append([universe_at(x, y) for x, y in ring[:1] + ring[:0:-1]])
+    rings.append([universe_at(0.0, 0.0)])
+    return rings
+
+def transport_settings(height, particles=10000, batches=20, inactive=5):
+    settings = openmc.Settings()
+    settings.run_mode = 'eigenvalue'
+    settings.particles = particles
+    settings.batches = batches
+    settings.inactive = inactive
+    settings.source = openmc.IndependentSource(space=openmc.stats.Point((0, 0, height / 2)))
+    return settings
+
+def position_key(x, y):
+    return (round(x, 6), round(y, 6))
+
+def build_lattice_model(reactor_type, height=HEIGHT):
+    """
+    CSG model of one assembly: RectLattice of pin and guide tube universes (BWR, PWR, CANDU) or HexLattice of
+    pins (SFR) and graphite channels (MSR), axially bounded at 0 and height with vacuum boundaries.
+    """
+    layout = assembly_layout(reactor_type)
+    materials = lattice_materials(reactor_type)
+    bottom = openmc.ZPlane(z0=0.0, boundary_type='vacuum')
+    top = openmc.ZPlane(z0=height, boundary_type='vacuum')
+
+    if layout['kind'] == 'pins':
+        n, pitch = layout['assembly_size'], layout['pitch']
+        pin = pin_universe(materials, [('fuel', layout['fuel_r']), ('clad', layout['clad_r'])], 'moderator')
+        guide = pin_universe(materials, [('guide', layout['clad_r'])], 'moderator')
+        guides = {position_key(x, y) for x, y in layout['guide_positions']}
+        lattice = openmc.RectLattice()
+        lattice.pitch = (pitch, pitch)
+        lattice.lower_left = (-n * pitch / 2, -n * pitch / 2)
+        # Rows run from the top (largest y) down; element (i, j) sits at layout position i*pitch - c, j*pitch - c
+        c = (n - 1) * pitch / 2
+        lattice.universes = [[guide if position_key(i * pitch - c, j * pitch - c) in guides else pin for i in range(n)]
+                             for j in range(n - 1, -1, -1)]
+        # Same moderator box as the DAGMC model (edge pins are clipped where they reach past it)
+        half_size = layout['half_size']
+        box = openmc.model.RectangularPrism(2 * half_size, 2 * half_size, boundary_type='vacuum')
+        root_cells = [openmc.Cell(fill=lattice, region=-box & +bottom & -top)]
+    elif layout['kind'] == 'hex_pins':
+        pin = pin_universe(materials, [('fuel', layout['fuel_r']), ('clad', layout['clad_r'])], 'sodium')
+        lattice = openmc.HexLattice()
+        lattice.orientation = 'x'
+        lattice.center = (0.0, 0.0)
+        lattice.pitch = [layout['pitch']]
+        lattice.outer = openmc.Universe(cells=[openmc.Cell(fill=materials['sodium'])])
+        lattice.universes = hex_lattice_universes(layout['num_rings'], layout['pitch'], lambda x, y: pin)
+        outer_cyl = openmc.ZCylinder(r=layout['outer_r'], boundary_type='vacuum')
+        root_cells = [openmc.Cell(fill=lattice, region=-outer_cyl & +bottom & -top)]
+    else:
+        # MSR channels sit on the corners of hex rings at 20 cm spacing; the other lattice elements are salt
+        channel = pin_universe(materials, [('graphite', layout['channel_r'])], 'salt')
+        salt = openmc.Universe(cells=[openmc.Cell(fill=materials['salt'])])
+        channels = {position_key(x, y) for x, y in layout['channel_positions']}
+        spacing = max(abs(x) for x, _ in layout['channel_positions']) / 3
+        lattice = openmc.HexLattice()
+        lattice.orientation = 'x'
+        lattice.center = (0.0, 0.0)
+        lattice.pitch = [spacing]
+        lattice.outer = salt
+        lattice.universes = hex_lattice_universes(3, spacing, lambda x, y: channel if position_key(x, y) in channels else salt)
+        core_cyl = openmc.ZCylinder(r=layout['core_r'])
+        refl_cyl = openmc.ZCylinder(r=layout['core_r'] + layout['refl_thick'], boundary_type='vacuum')
+        root_cells = [openmc.Cell(fill=lattice, region=-core_cyl & +bottom & -top),
+                      openmc.Cell(fill=materials['reflector'], region=+core_cyl & -refl_cyl & +bottom & -top)]
+
+    geometry = openmc.Geometry(openmc.Universe(cells=root_cells))
+    return openmc.model.Model(geometry, openmc.Materials(materials.values()), transport_settings(height))
+
+def build_dagmc_model(reactor_type, height=HEIGHT):
+    """
+    The same assembly from the DAGMC file of OpenMC_Complex.generate_advanced_mesh (generated if missing),
+    with the lattice materials matched to its 'mat:' groups by name.
+    """
+    dagmc_file = f'meshes/openmc/{reactor_type}_advanced.h5'
+    if not os.path.exists(dagmc_file):
+        from OpenMC_Complex import generate_advanced_mesh  # Needs gmsh; the CSG models don't
+        generate_advanced_mesh(reactor_type)
+    dagmc = openmc.DAGMCUniverse(os.path.abspath(dagmc_file), auto_geom_ids=True)
+    geometry = openmc.Geometry(dagmc.bounded_universe())
+    materials = openmc.Materials(lattice_materials(reactor_type).values())
+    return openmc.model.Model(geometry, materials, transport_settings(height))
+
+def tracking_rate(model, work_dir):
+    """
+    Run the model in work_dir and return its active-batch tracking rate (particles/sec) from the statepoint.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    statepoint = model.run(cwd=work_dir, output=False)
+    with h5py.File(os.path.join(work_dir, os.path.basename(statepoint)), 'r') as f:
+        active_s = f['runtime']['active batches'][()]
+        active = f['n_batches'][()] - f['n_inactive'][()]
+        return f['n_particles'][()] * active / active_s if active_s > 0 else 0.0
+
+def benchmark_tracking(reactor_types, particles=10000, batches=20, inactive=5, work_dir='meshes/openmc/benchmark'):
+    """
+    Tracking rate of the CSG lattice model against the DAGMC model of each reactor type, same settings for both.
+    """
+    print(f"{'reactor':<8} {'CSG p/s':>12} {'DAGMC p/s':>12} {'speedup':>8}")
+    rows = []
+    for reactor_type in reactor_types:
+        rates = {}
+        for kind, build in [('csg', build_lattice_model), ('dagmc', build_dagmc_model)]:
+            model = build(reactor_type)
+            model.settings.particles, model.settings.batches, model.settings.inactive = particles, batches, inactive
+            try:
+                rates[kind] = tracking_rate(model, os.path.join(work_dir, reactor_type, kind))
+            except Exception as e:
+                print(f"{reactor_type} {kind} run failed: {e}")
+                rates[kind] = None
+        speedup = rates['csg'] / rates['dagmc'] if rates['csg'] and rates['dagmc'] else None
+        print(f"{reactor_type:<8} {rates['csg'] or 0:>12.0f} {rates['dagmc'] or 0:>12.0f} "
+              f"{speedup if speedup else 0:>7.1f}x", flush=True)
+        rows.append((reactor_type, rates, speedup))
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build native OpenMC lattice models of the assemblies (CSG instead of DAGMC).")
+    parser.add_argument('reactor_types', nargs='*', default=REACTOR_TYPES, help="Reactor types (default: all)")
+    parser.add_argument('--benchmark', action='store_true', help="Compare tracking rates against the DAGMC models")
+    parser.add_argument('--particles', type=int, default=10000)
+    parser.add_argument('--batches', type=int, default=20)
+    parser.add_argument('--inactive', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_tracking(args.reactor_types, args.particles, args.batches, args.inactive)
+    else:
+        for rt in args.reactor_types:
+            start = time.perf_counter()
+            out_dir = f'meshes/openmc/lattice/{rt}'
+            os.makedirs(out_dir, exist_ok=True)
+            build_lattice_model(rt).export_to_xml(out_dir)
+            print(f"Lattice model for {rt} written to {out_dir} ({time.perf_counter() - start:.2f} s).")
\ No newline at end of file
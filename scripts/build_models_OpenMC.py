@@ -1,7 +1,12 @@
 import openmc
+import openmc.deplete
 import os
+import math
 
-def generate_and_run_openmc_model(reactor_type, u235_fraction, dimension, temperature, power):
+def build_openmc_model(reactor_type, u235_fraction, dimension, temperature, power):
+    """
+    The openmc.model.Model for one design; the fuel material comes first in model.materials.
+    """
     if reactor_type == 'MSR':
         # Density for FLiBe
         density_kgm3 = 2415.6 - 0.49072 * temperature
@@ -154,21 +159,66 @@ def generate_and_run_openmc_model(reactor_type, u235_fraction, dimension, temper
     settings.particles = 5000
     settings.source = openmc.IndependentSource(space=openmc.stats.Point((0, 0, 0)))
 
-    # Export
-    materials.export_to_xml()
-    geometry.export_to_xml()
-    settings.export_to_xml()
+    return openmc.model.Model(geometry, materials, settings)
+
+def generate_and_run_openmc_model(reactor_type, u235_fraction, dimension, temperature, power,
+                                  work_dir='.', threads=None, output=True, cache=None):
+    """
+    Build the model, export its XML into work_dir and run OpenMC there.
+    With an OpenMCResultCache, an identical model reuses the stored result instead of rerunning.
+    Returns the path of the final statepoint file.
+    """
+    model = build_openmc_model(reactor_type, u235_fraction, dimension, temperature, power)
+
+    # Export into the run's own directory so concurrent cases don't overwrite each other
+    os.makedirs(work_dir, exist_ok=True)
+    model.materials.export_to_xml(os.path.join(work_dir, 'materials.xml'))
+    model.geometry.export_to_xml(os.path.join(work_dir, 'geometry.xml'))
+    model.settings.export_to_xml(os.path.join(work_dir, 'settings.xml'))
 
     # Run
-    openmc.run()
+    if cache is not None:
+        return cache.run(work_dir, threads=threads, output=output)['statepoint']
+    openmc.run(threads=threads, output=output, cwd=work_dir)
+    return os.path.join(work_dir, f'statepoint.{model.settings.batches}.h5')
+
+def run_openmc_depletion(reactor_type, u235_fraction, dimension, temperature, power, timesteps_d,
+                         work_dir='.', chain_file=None, power_density=None, threads=None):
+    """
+    Deplete the design over timesteps_d (days per step) with openmc.deplete and write depletion_results.h5
+    (k-eff and nuclide inventories at every step) into work_dir.
+    The models are 2D, so the fuel volume is per cm of height and power (MW) is the power of that slice;
+    power_density (W/g heavy metal) can be given instead. The chain file defaults to openmc.config['chain_file'].
+    Returns the path of the results file.
+    """
+    model = build_openmc_model(reactor_type, u235_fraction, dimension, temperature, power)
+    fuel = model.materials[0]
+    fuel.depletable = True
+    fuel.volume = math.pi * dimension**2  # cm3 per cm of height
+    if threads is not None:
+        os.environ['OMP_NUM_THREADS'] = str(threads)  # Read when openmc.lib initializes in-process
+    if chain_file is not None:
+        chain_file = os.path.abspath(chain_file)  # Resolved before changing into work_dir
+    normalization = {'power_density': power_density} if power_density is not None else {'power': power * 1e6}
+    os.makedirs(work_dir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(work_dir)  # openmc.deplete writes its results and intermediate files to the working directory
+    try:
+        operator = openmc.deplete.CoupledOperator(model, chain_file)
+        integrator = openmc.deplete.PredictorIntegrator(operator, timesteps_d, timestep_units='d', **normalization)
+        integrator.integrate()
+    finally:
+        os.chdir(cwd)
+    return os.path.join(work_dir, 'depletion_results.h5')
 
 # Main script
-print("Available reactor types: MSR, Heatpipe, HTGR, SmallPWR")
-reactor_type = input("Enter reactor type: ").strip().upper()
-u235_fraction = float(input("Enter U-235 fraction (0-1): "))
-dimension = float(input("Enter main dimension (e.g., fuel radius in cm): "))
-temperature = float(input("Enter temperature (K): "))
-power = float(input("Enter power (MW): "))
-
-generate_and_run_openmc_model(reactor_type, u235_fraction, dimension, temperature, power)
-print("OpenMC simulation completed.")
\ No newline at end of file
+if __name__ == "__main__":
+    print("Available reactor types: MSR, Heatpipe, HTGR, SmallPWR")
+    reactor_type = input("Enter reactor type: ").strip().upper()
+    u235_fraction = float(input("Enter U-235 fraction (0-1): "))
+    dimension = float(input("Enter main dimension (e.g., fuel radius in cm): "))
+    temperature = float(input("Enter temperature (K): "))
+    power = float(input("Enter power (MW): "))
+
+    generate_and_run_openmc_model(reactor_type, u235_fraction, dimension, temperature, power)
+    print("OpenMC simulation completed.")
\ No newline at end of file
@@ -0,0 +1,135 @@
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import hashlib
+import xml.etree.ElementTree as ET
+import numpy as np
+import openmc
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'AI_Projects'))
+from Statepoint_Ingest import read_statepoint
+
+# Content-addressed cache of OpenMC eigenvalue results.
+# Key = sha256 over the canonicalized model XML, the cross-section library and the OpenMC version,
+# so a rerun of an identical model returns the stored k-eff/tallies instead of transporting again.
+# Entries (result.json, tallies.npz, statepoint.h5) are evicted least-recently-used under a disk budget.
+
+DEFAULT_CACHE_DIR = os.environ.get('OPENMC_RESULT_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'openmc_results'))
+DEFAULT_MAX_GB = float(os.environ.get('OPENMC_RESULT_CACHE_GB', 20))
+MODEL_FILES = ['model.xml', 'materials.xml', 'geometry.xml', 'settings.xml', 'tallies.xml']  # plots.xml doesn't change results
+
+class OpenMCResultCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_gb=DEFAULT_MAX_GB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_gb * 1024**3)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, work_dir='.'):
+        """
+        Canonical hash of the model in work_dir; attribute order, comments and whitespace don't matter.
+        """
+        h = hashlib.sha256()
+        for name in MODEL_FILES:
+            path = os.path.join(work_dir, name)
+            if os.path.exists(path):
+                h.update(name.encode())
+                h.update(ET.canonicalize(from_file=path, strip_text=True).encode())
+        xs_path = self._cross_sections(work_dir)
+        h.update(str(xs_path).encode())
+        if xs_path and os.path.exists(xs_path):
+            h.update(ET.canonicalize(from_file=xs_path, strip_text=True).encode())
+        h.update(openmc.__version__.encode())
+        return h.hexdigest()
+
+    def _cross_sections(self, work_dir):
+        materials_file = os.path.join(work_dir, 'materials.xml')
+        if os.path.exists(materials_file):
+            node = ET.parse(materials_file).getroot().find('cross_sections')
+            if node is not None and node.text:
+                return os.path.abspath(os.path.join(work_dir, node.text.strip()))
+        return openmc.config.get('cross_sections') or os.environ.get('OPENMC_CROSS_SECTIONS')
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key):
+        """
+        Stored result for key (and mark it recently used), or None on a miss.
+        """
+        entry = self._entry_dir(key)
+        result_file = os.path.join(entry, 'result.json')
+        if not os.path.exists(result_file):
+            return None
+        os.utime(result_file)  # LRU timestamp
+        with open(result_file, 'r') as f:
+            result = json.load(f)
+        with np.load(os.path.join(entry, 'tallies.npz')) as npz:
+            result['tallies'] = {tid: (npz[f'{tid}_mean'], npz[f'{tid}_std']) for tid in result['tally_ids']}
+        result['statepoint'] = os.path.join(entry, 'statepoint.h5')
+        return result
+
+    def put(self, key, statepoint_file):
+        """
+        Store a finished run; written to a temp dir and renamed so concurrent writers never see partial entries.
+        """
+        statepoint = read_statepoint(statepoint_file, tally_ids=None)
+        k_eff, k_eff_unc, tallies = statepoint['k_eff'], statepoint['k_eff_uncertainty'], statepoint['tallies']
+        entry = self._entry_dir(key)
+        tmp = f'{entry}.tmp{os.getpid()}'
+        os.makedirs(tmp, exist_ok=True)
+        shutil.copy2(statepoint_file, os.path.join(tmp, 'statepoint.h5'))
+        arrays = {}
+        for tid, (mean, std) in tallies.items():
+            arrays[f'{tid}_mean'] = mean
+            arrays[f'{tid}_std'] = std
+        np.savez(os.path.join(tmp, 'tallies.npz'), **arrays)
+        with open(os.path.join(tmp, 'result.json'), 'w') as f:
+            json.dump({'k_eff': k_eff, 'k_eff_uncertainty': k_eff_unc, 'tally_ids': list(tallies),
+                       'openmc_version': openmc.__version__, 'created': time.time()}, f, indent=4)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)  # Another process stored the same model first
+        result = self.get(key)
+        self.evict()
+        return result
+
+    def evict(self):
+        """
+        Drop least-recently-used entries until the cache fits the disk budget.
+        """
+        entries = []
+        total = 0
+        for result_file in glob.glob(os.path.join(self.cache_dir, '*', '*', 'result.json')):
+            entry = os.path.dirname(result_file)
+            size = sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+            entries.append((os.path.getmtime(result_file), size, entry))
+            total += size
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def run(self, work_dir='.', **run_kwargs):
+        """
+        openmc.run() for the model in work_dir unless an identical model is cached.
+        The statepoint ends up in work_dir either way; result['cached'] tells which path was taken.
+        """
+        key = self.key(work_dir)
+        result = self.get(key)
+        if result is not None:
+            local = os.path.join(work_dir, 'statepoint.cached.h5')
+            shutil.copy2(result['statepoint'], local)
+            result['statepoint'] = local
+            result['cached'] = True
+            return result
+
+        openmc.run(cwd=work_dir, **run_kwargs)
+        statepoint = max(glob.glob(os.path.join(work_dir, 'statepoint.*.h5')), key=os.path.getmtime)
+        result = self.put(key, statepoint)
+        result['statepoint'] = statepoint
+        result['cached'] = False
+        return result
\ No newline at end of file
@@ -0,0 +1,191 @@
+import os
+import sys
+import csv
+import json
+import argparse
+import numpy as np
+import torch
+import torch.nn as nn
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'AI_Projects'))
+from Feature_Store import FeatureStore, feature_vector
+from Statepoint_Ingest import ingest_statepoints
+from Surrogates import SURROGATES, load_surrogate
+from Ensemble import EnsembleSurrogate, load_ensemble, save_ensemble
+from Train_Engine import train_model
+from sweep_OpenMC import PARAM_NAMES, case_params, load_sweep_points, run_sweep
+from cache_OpenMC import OpenMCResultCache
+
+# Surrogate pre-screening for OpenMC sweeps.
+# Every candidate is scored by a trained DeepMLP/NuclearPINN first (mean and spread over MC-dropout passes,
+# or over the members of a deep ensemble, see AI_Projects/Ensemble.py).
+# Only points whose k-eff (or EFPD) band reaches the constraint boundary, or whose spread is too wide to trust,
+# go to transport; the rest are recorded as screened. Transported results are ingested into the feature store
+# and the surrogate is fine-tuned on them before the remaining points are re-scored, round by round.
+
+SCREEN_FIELDS = ['case_id'] + PARAM_NAMES + ['k_eff_pred', 'k_eff_std', 'efpd_pred', 'efpd_std', 'decision', 'round']
+
+def surrogate_scores(model, inputs, mc_samples=32):
+    """
+    Mean and std [n, 2] of the surrogate's (k-eff, EFPD) over mc_samples passes with dropout left on.
+    Models without dropout get a single pass and zero spread; an ensemble gives its members' mean and std instead.
+    """
+    if isinstance(model, EnsembleSurrogate):
+        mean, var = model(inputs)
+        return mean.numpy(), var.sqrt().numpy()
+    has_dropout = any(isinstance(m, nn.Dropout) for m in model.modules())
+    model.train(has_dropout)
+    with torch.no_grad():
+        preds = torch.stack([model(inputs) for _ in range(mc_samples if has_dropout else 1)])
+    model.eval()
+    return preds.mean(0).numpy(), preds.std(0, unbiased=False).numpy()
+
+def screen_points(mean, std, k_target=1.0, k_margin=0.02, efpd_min=None, efpd_margin=0.0, z=2.0, max_k_std=None):
+    """
+    Which points need transport, and a priority (lower = more ambiguous).
+    A point is ambiguous when its k-eff band mean +/- z*std comes within k_margin of k_target,
+    or (with efpd_min) its EFPD band comes within efpd_margin of efpd_min. max_k_std flags any point
+    whose k-eff spread is wider than that, wherever its mean lies.
+    """
+    eps = 1e-12
+    k_gap = np.abs(mean[:, 0] - k_target) - k_margin
+    priority = k_gap / (std[:, 0] + eps)  # Distance to the boundary in standard deviations
+    needs_transport = k_gap < z * std[:, 0]
+    if efpd_min is not None:
+        efpd_gap = np.abs(mean[:, 1] - efpd_min) - efpd_margin
+        needs_transport |= efpd_gap < z * std[:, 1]
+        priority = np.minimum(priority, efpd_gap / (std[:, 1] + eps))
+    if max_k_std is not None:
+        wide = std[:, 0] > max_k_std
+        needs_transport |= wide
+        priority[wide] = np.minimum(priority[wide], 0)
+    return needs_transport, priority
+
+def fine_tune(model, kind, store=None, epochs=20, lr=1e-4):
+    """
+    Continue training the loaded surrogate on the (grown) feature store, starting from its current weights.
+    """
+    store = store if store is not None else FeatureStore()
+    inputs, outputs = store.to_tensors()
+    if len(inputs) < 2:
+        print("Insufficient data for fine-tuning. Need at least 2 entries.")
+        return model
+    if kind == 'pinn':
+        # Physics residual on collocation points, validation on the data fit only (as in PINN_ML.train_pinn)
+        from PINN_ML import pinn_losses
+        loss_fn, val_loss_fn = pinn_losses(model, inputs)
+    else:
+        criterion = nn.MSELoss()
+        val_loss_fn = None
+
+        def loss_fn(model, batch):
+            batch_inputs, batch_outputs = batch
+            return criterion(model(batch_inputs), batch_outputs)
+
+    model, _ = train_model(model, (inputs, outputs), loss_fn, epochs=epochs, lr=lr, val_fraction=0.1, val_loss_fn=val_loss_fn,
+                           patience=5, log_every=max(epochs // 4, 1), name=f"Fine-tune {kind}")
+    model.eval()
+    return model
+
+def write_screening(path, points, mean, std, decisions, rounds):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SCREEN_FIELDS)
+        writer.writeheader()
+        for i, point in enumerate(points):
+            writer.writerow({'case_id': i, **point, 'k_eff_pred': mean[i, 0], 'k_eff_std': std[i, 0],
+                             'efpd_pred': mean[i, 1], 'efpd_std': std[i, 1], 'decision': decisions[i], 'round': rounds[i]})
+
+def screened_sweep(points, sweep_dir, kind='deep', weights=None, default_params=None, max_rounds=5, batch=None,
+                   fine_tune_epochs=20, mc_samples=32, omp_threads=1, max_workers=None, cache=None, ensemble=None,
+                   **criteria):
+    """
+    Screen points with the surrogate, run transport only for ambiguous ones (at most batch per round,
+    most ambiguous first), then ingest and fine-tune before re-screening what is left.
+    criteria go to screen_points (k_target, k_margin, efpd_min, efpd_margin, z, max_k_std).
+    ensemble: path of a saved deep ensemble to screen with instead of the single model at weights.
+    The production weights (and ensemble) are never overwritten: the fine-tuned copy is saved in sweep_dir and
+    picked up instead when the same sweep is run again.
+    Writes screening.csv with the final prediction and decision for every point; returns the transported case ids.
+    """
+    weights = weights or SURROGATES[kind][2]
+    screening_weights = os.path.join(sweep_dir, f"screening_{'ensemble_' if ensemble else ''}{kind}.pth")
+    if os.path.exists(screening_weights):
+        print(f"Screening with the surrogate fine-tuned by the last run of this sweep ({screening_weights})")
+        if ensemble:
+            ensemble = screening_weights
+        else:
+            weights = screening_weights
+    model = load_ensemble(kind, ensemble) if ensemble else load_surrogate(kind, weights)
+    inputs = torch.tensor([feature_vector({**(default_params or {}), **case_params(p)}) for p in points], dtype=torch.float32)
+    remaining = np.arange(len(points))
+    decisions = ['screened'] * len(points)
+    rounds = [''] * len(points)
+    transported = []
+
+    for round_id in range(max_rounds):
+        mean, std = surrogate_scores(model, inputs[remaining], mc_samples)
+        needs_transport, priority = screen_points(mean, std, **criteria)
+        if not needs_transport.any():
+            break
+        order = np.argsort(priority[needs_transport], kind='stable')
+        chosen = remaining[needs_transport][order][:batch]
+        print(f"Round {round_id}: {needs_transport.sum()} of {len(remaining)} remaining points are ambiguous, "
+              f"running {len(chosen)}")
+
+        run_sweep([points[i] for i in chosen], sweep_dir, omp_threads, max_workers, cache, case_ids=chosen.tolist())
+        for i in chosen:
+            decisions[i], rounds[i] = 'transport', round_id
+        transported.extend(chosen.tolist())
+        remaining = np.setdiff1d(remaining, chosen)
+
+        if ingest_statepoints(sweep_dir, default_params) > 0 and fine_tune_epochs > 0:
+            if ensemble:
+                for member in model.members:
+                    fine_tune(member, kind, epochs=fine_tune_epochs)
+                model.restack()
+                save_ensemble(model, kind, screening_weights)
+            else:
+                model = fine_tune(model, kind, epochs=fine_tune_epochs)
+                torch.save(model.state_dict(), screening_weights)
+        if len(remaining) == 0:
+            break
+
+    mean, std = surrogate_scores(model, inputs, mc_samples)
+    os.makedirs(sweep_dir, exist_ok=True)
+    write_screening(os.path.join(sweep_dir, 'screening.csv'), points, mean, std, decisions, rounds)
+    print(f"Screening: {len(transported)} of {len(points)} points sent to transport, "
+          f"{len(points) - len(transported)} screened out by the surrogate.")
+    return transported
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenMC sweep that runs transport only where the surrogate is unsure.")
+    parser.add_argument('spec', help="Sweep spec JSON file (as for sweep_OpenMC.py)")
+    parser.add_argument('--out', default=None, help="Sweep directory (default: sweeps/<spec name>)")
+    parser.add_argument('--model', choices=['deep', 'pinn'], default='deep', help="Screening surrogate")
+    parser.add_argument('--weights', default=None, help="Surrogate state dict (not modified; the fine-tuned copy goes in the sweep directory)")
+    parser.add_argument('--ensemble', default=None, help="Screen with this saved deep ensemble (see AI_Projects/Ensemble.py)")
+    parser.add_argument('--params', default=None, help="JSON of default run parameters (e.g. burnup_target_gwd_t)")
+    parser.add_argument('--k-target', type=float, default=1.0, help="Criticality boundary")
+    parser.add_argument('--k-margin', type=float, default=0.02, help="Band around the boundary that always needs transport")
+    parser.add_argument('--efpd-min', type=float, default=None, help="Minimum EFPD constraint")
+    parser.add_argument('--efpd-margin', type=float, default=0.0, help="Band around the EFPD constraint")
+    parser.add_argument('--z', type=float, default=2.0, help="Prediction band width in standard deviations")
+    parser.add_argument('--max-std', type=float, default=None, help="Always run points with a wider k-eff spread")
+    parser.add_argument('--mc-samples', type=int, default=32, help="MC-dropout passes per scoring")
+    parser.add_argument('--batch', type=int, default=None, help="Transport runs per round (default: all ambiguous)")
+    parser.add_argument('--rounds', type=int, default=5, help="Screen/run/retrain rounds")
+    parser.add_argument('--fine-tune-epochs', type=int, default=20, help="Epochs of fine-tuning per round (0 = off)")
+    parser.add_argument('--threads', type=int, default=1, help="OpenMP threads per case")
+    parser.add_argument('--workers', type=int, default=None, help="Concurrent cases (default: cores // threads)")
+    parser.add_argument('--no-cache', action='store_true', help="Always run transport, ignoring cached results")
+    args = parser.parse_args()
+
+    default_params = {}
+    if args.params:
+        with open(args.params, 'r') as f:
+            default_params = json.load(f)
+    sweep_dir = args.out or os.path.join('sweeps', os.path.splitext(os.path.basename(args.spec))[0])
+    screened_sweep(load_sweep_points(args.spec), sweep_dir, args.model, args.weights, default_params,
+                   args.rounds, args.batch, args.fine_tune_epochs, args.mc_samples, args.threads, args.workers,
+                   None if args.no_cache else OpenMCResultCache(), args.ensemble,
+                   k_target=args.k_target, k_margin=args.k_margin, efpd_min=args.efpd_min,
+                   efpd_margin=args.efpd_margin, z=args.z, max_k_std=args.max_std)
\ No newline at end of file
@@ -0,0 +1,200 @@
+import os
+import csv
+import json
+import time
+import argparse
+import sys
+import itertools
+import numpy as np
+import h5py
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from build_models_OpenMC import generate_and_run_openmc_model, run_openmc_depletion
+from cache_OpenMC import OpenMCResultCache
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'AI_Projects'))
+from Statepoint_Ingest import read_statepoint
+
+# Non-interactive parameter sweeps for generate_and_run_openmc_model.
+# Each case runs in its own work directory (sweeps/<name>/case_00000/...) so XML never collides,
+# on a process pool sized so that workers * OpenMP threads fills the node.
+# Spec file (JSON), one of:
+#   {"mode": "manifest", "points": [{"reactor_type": "MSR", "u235_fraction": 0.05, ...}, ...]}
+#   {"mode": "manifest", "file": "points.csv"}
+#   {"mode": "grid", "reactor_type": ["SmallPWR"], "u235_fraction": [0.03, 0.05], "dimension": [0.41], ...}
+#   {"mode": "lhs", "samples": 500, "seed": 0, "reactor_type": "SmallPWR",
+#    "u235_fraction": [0.02, 0.2], "dimension": [0.4], "temperature": [293, 900], "power": [1, 50]}
+# Any spec may add "depletion": {"timesteps_d": [30, 30, ...], "chain_file": ..., "power_density": ...} to deplete
+# every case with openmc.deplete instead (depletion_results.h5 per case, see AI_Projects/Depletion_Ingest.py).
+
+PARAM_NAMES = ['reactor_type', 'u235_fraction', 'dimension', 'temperature', 'power']
+SUMMARY_FIELDS = ['case_id'] + PARAM_NAMES + ['k_eff', 'k_eff_uncertainty', 'status', 'wall_time_s', 'work_dir']
+
+def _as_point(values):
+    point = {'reactor_type': str(values['reactor_type'])}
+    for name in PARAM_NAMES[1:]:
+        point[name] = float(values[name])
+    return point
+
+def manifest_points(spec):
+    """
+    Points listed explicitly, either inline or in a CSV/JSON file.
+    """
+    if 'points' in spec:
+        return [_as_point(p) for p in spec['points']]
+    with open(spec['file'], 'r') as f:
+        if spec['file'].endswith('.json'):
+            return [_as_point(p) for p in json.load(f)]
+        return [_as_point(row) for row in csv.DictReader(f)]
+
+def grid_points(spec):
+    """
+    Full factorial grid over the listed values of each parameter.
+    """
+    axes = [spec[name] if isinstance(spec[name], list) else [spec[name]] for name in PARAM_NAMES]
+    return [_as_point(dict(zip(PARAM_NAMES, combo))) for combo in itertools.product(*axes)]
+
+def lhs_points(spec):
+    """
+    Latin-hypercube sample: [lo, hi] ranges are stratified, single values are held fixed.
+    Reactor types (one or a list) are cycled over the samples. Without a 'seed' every load draws a new design,
+    which can't be resumed (see run_sweep).
+    """
+    n = int(spec['samples'])
+    rng = np.random.default_rng(spec.get('seed'))
+    columns = {}
+    for name in PARAM_NAMES[1:]:
+        bounds = spec[name] if isinstance(spec[name], list) else [spec[name]]
+        if len(bounds) == 1:
+            columns[name] = np.full(n, float(bounds[0]))
+        else:
+            lo, hi = float(bounds[0]), float(bounds[1])
+            strata = (rng.permutation(n) + rng.random(n)) / n  # One sample per stratum
+            columns[name] = lo + strata * (hi - lo)
+    reactor_types = spec['reactor_type'] if isinstance(spec['reactor_type'], list) else [spec['reactor_type']]
+    return [_as_point({'reactor_type': reactor_types[i % len(reactor_types)],
+                       **{name: columns[name][i] for name in columns}}) for i in range(n)]
+
+def load_sweep_points(spec_file):
+    with open(spec_file, 'r') as f:
+        spec = json.load(f)
+    mode = spec.get('mode', 'manifest')
+    if mode == 'manifest':
+        return manifest_points(spec)
+    elif mode == 'grid':
+        return grid_points(spec)
+    elif mode == 'lhs':
+        return lhs_points(spec)
+    raise ValueError(f"Invalid sweep mode: {mode}")
+
+def read_depletion_keff(results_file):
+    """
+    Beginning-of-life k-eff and its uncertainty from a depletion_results.h5.
+    """
+    with h5py.File(results_file, 'r') as f:
+        eigenvalues = f['eigenvalues'][0, 0]
+    return float(eigenvalues[0]), float(eigenvalues[1])
+
+def case_params(point):
+    """
+    A sweep point in the feature-store naming (AI_Projects/Feature_Store.py).
+    """
+    return {'reactor_type': point['reactor_type'], 'enrichment_u235': point['u235_fraction'],
+            'fuel_radius_cm': point['dimension'], 'temperature_k': point['temperature'], 'power_mw': point['power']}
+
+def write_case_params(work_dir, point):
+    """
+    params.json next to the run, so AI_Projects/Statepoint_Ingest.py can label it.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    with open(os.path.join(work_dir, 'params.json'), 'w') as f:
+        json.dump(case_params(point), f, indent=4)
+
+def run_case(case_id, point, sweep_dir, threads, cache=None, depletion=None):
+    """
+    Run one sweep point in its own directory; failures are reported in the row, not raised.
+    With depletion options the case is depleted (not cached) and k-eff is the beginning-of-life value.
+    """
+    work_dir = os.path.join(sweep_dir, f'case_{case_id:05d}')
+    row = {'case_id': case_id, **point, 'k_eff': '', 'k_eff_uncertainty': '', 'work_dir': work_dir}
+    start = time.time()
+    try:
+        write_case_params(work_dir, point)
+        if depletion is not None:
+            results_file = run_openmc_depletion(point['reactor_type'], point['u235_fraction'], point['dimension'],
+                                                point['temperature'], point['power'], work_dir=work_dir,
+                                                threads=threads, **depletion)
+            row['k_eff'], row['k_eff_uncertainty'] = read_depletion_keff(results_file)
+        else:
+            statepoint = generate_and_run_openmc_model(point['reactor_type'], point['u235_fraction'], point['dimension'],
+                                                       point['temperature'], point['power'],
+                                                       work_dir=work_dir, threads=threads, output=False, cache=cache)
+            sp = read_statepoint(statepoint)
+            row['k_eff'], row['k_eff_uncertainty'] = sp['k_eff'], sp['k_eff_uncertainty']
+        row['status'] = 'ok'
+    except Exception as e:
+        row['status'] = f'failed: {e}'
+    row['wall_time_s'] = round(time.time() - start, 2)
+    return row
+
+def completed_cases(summary_file):
+    """
+    Point of every case marked ok in summary.csv, by case id.
+    """
+    if not os.path.exists(summary_file):
+        return {}
+    with open(summary_file, 'r') as f:
+        return {int(row['case_id']): _as_point(row) for row in csv.DictReader(f) if row['status'] == 'ok'}
+
+def run_sweep(points, sweep_dir, omp_threads=1, max_workers=None, cache=None, case_ids=None, depletion=None):
+    """
+    Run every point on a process pool and append one summary row per finished case.
+    case_ids numbers the points (default 0..n-1), so a subset of a larger sweep keeps its original case numbers.
+    Cases already marked ok in summary.csv are skipped, so an interrupted sweep can be restarted; a case id whose
+    recorded point differs (a changed spec, or an LHS spec without a seed) is refused rather than mixed in.
+    Repeated or overlapping points are served from the result cache when one is given.
+    depletion: openmc.deplete options for run_openmc_depletion (timesteps_d, chain_file, power_density).
+    """
+    os.makedirs(sweep_dir, exist_ok=True)
+    summary_file = os.path.join(sweep_dir, 'summary.csv')
+    done = completed_cases(summary_file)
+    cases = list(zip(case_ids or range(len(points)), points))
+    changed = [i for i, p in cases if i in done and done[i] != _as_point(p)]
+    if changed:
+        raise ValueError(f"{summary_file} has different points for cases {changed[:5]}{'...' if len(changed) > 5 else ''}: "
+                         f"the spec changed since the sweep started (an LHS spec needs a fixed 'seed' to resume). "
+                         f"Use a new sweep directory.")
+    pending = [(i, p) for i, p in cases if i not in done]
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 1) // omp_threads)
+    print(f"Sweep: {len(pending)} of {len(points)} cases pending, {max_workers} workers x {omp_threads} OpenMP threads")
+
+    write_header = not os.path.exists(summary_file)
+    with open(summary_file, 'a', newline='') as f, ProcessPoolExecutor(max_workers=max_workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        if write_header:
+            writer.writeheader()
+        futures = [pool.submit(run_case, i, p, sweep_dir, omp_threads, cache, depletion) for i, p in pending]
+        for n_done, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            writer.writerow(row)
+            f.flush()  # Keep the summary current if the sweep is interrupted
+            print(f"[{n_done}/{len(pending)}] case {row['case_id']}: k-eff {row['k_eff']} ({row['status']})")
+    return summary_file
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an OpenMC parameter sweep from a manifest, grid or LHS spec.")
+    parser.add_argument('spec', help="Sweep spec JSON file")
+    parser.add_argument('--out', default=None, help="Sweep directory (default: sweeps/<spec name>)")
+    parser.add_argument('--threads', type=int, default=1, help="OpenMP threads per case")
+    parser.add_argument('--workers', type=int, default=None, help="Concurrent cases (default: cores // threads)")
+    parser.add_argument('--no-cache', action='store_true', help="Always run transport, ignoring cached results")
+    parser.add_argument('--cache-gb', type=float, default=None, help="Result cache disk budget in GB")
+    args = parser.parse_args()
+
+    sweep_dir = args.out or os.path.join('sweeps', os.path.splitext(os.path.basename(args.spec))[0])
+    cache = None
+    if not args.no_cache:
+        cache = OpenMCResultCache() if args.cache_gb is None else OpenMCResultCache(max_gb=args.cache_gb)
+    with open(args.spec, 'r') as f:
+        depletion = json.load(f).get('depletion')
+    summary = run_sweep(load_sweep_points(args.spec), sweep_dir, args.threads, args.workers, cache, depletion=depletion)
+    print(f"Sweep completed. Summary written to {summary}.")
\ No newline at end of file